@@ -0,0 +1,83 @@
+"""
+Admin-only endpoints, enabled by FORMI_ADMIN_TOKEN.
+
+Every request must carry the token in an X-Admin-Token header.
+"""
+
+from typing import Dict, Optional
+import hmac
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from app import config
+from app.faq_misses import FAQ_MISSES
+from app.memory import TRACEMALLOC, resident_set_bytes, subsystem_sizes
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)], include_in_schema=False)
+
+@router.get("/memory")
+def get_memory(request: Request) -> Dict:
+    """Estimated bytes held by each subsystem, plus process and tracemalloc totals"""
+    start = time.perf_counter()
+    subsystems = subsystem_sizes(request.app.state.chat_handler)
+    return {
+        "subsystems": subsystems,
+        "subsystems_total": sum(subsystems.values()),
+        "resident_set_bytes": resident_set_bytes(),
+        "tracemalloc": TRACEMALLOC.status(),
+        "accounting_ms": (time.perf_counter() - start) * 1000
+    }
+
+@router.post("/memory/tracemalloc/start")
+def start_tracemalloc(frames: int = Query(1, ge=1, le=50)) -> Dict:
+    """Start tracing allocations, keeping `frames` frames per traceback"""
+    TRACEMALLOC.start(frames)
+    return TRACEMALLOC.status()
+
+@router.post("/memory/tracemalloc/stop")
+def stop_tracemalloc() -> Dict:
+    """Stop tracing allocations and discard all snapshots"""
+    TRACEMALLOC.stop()
+    return TRACEMALLOC.status()
+
+@router.post("/memory/tracemalloc/snapshots")
+def take_tracemalloc_snapshot() -> Dict:
+    """Take a snapshot to diff against later"""
+    try:
+        snapshot_id = TRACEMALLOC.take()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"snapshot_id": snapshot_id, **TRACEMALLOC.status()}
+
+@router.get("/memory/tracemalloc/diff")
+def diff_tracemalloc_snapshots(
+    base: int,
+    current: Optional[int] = None,
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(20, ge=1, le=500)
+) -> Dict:
+    """Largest allocation changes since snapshot `base`, up to `current` or now"""
+    try:
+        if current is None:
+            current = TRACEMALLOC.take()
+        stats = TRACEMALLOC.diff(base, current, group_by, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e.args[0]} not found")
+    return {"base": base, "current": current, "group_by": group_by, "stats": stats}
+
+@router.get("/faq/misses")
+def get_faq_misses(k: int = Query(20, ge=1, le=1000)) -> Dict:
+    """The k questions most often left without an FAQ answer, with estimated counts"""
+    return FAQ_MISSES.report(k)
+
+@router.get("/faq/misses/sketch")
+def get_faq_miss_sketch() -> Dict:
+    """This worker's whole miss tracker, for merging with other workers'"""
+    return FAQ_MISSES.to_dict()
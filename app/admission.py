@@ -0,0 +1,194 @@
+"""
+Admission control for chat turns in BBQ Nation Chatbot.
+
+Without it a traffic spike queues every request inside the worker until all
+of them time out. Each chat turn now has to be admitted first:
+
+- Per-client rate: a token bucket per client refills at FORMI_CLIENT_RATE
+  turns per second up to FORMI_CLIENT_BURST; a client with no token left is
+  answered 429 straight away.
+- Concurrency: at most FORMI_ADMISSION_CONCURRENCY turns run at once, on
+  worker threads, so the event loop stays free to answer or reject new
+  requests while turns run. ChatHandler runs the turns of one conversation
+  one at a time.
+- Queue depth: further turns wait in a queue of FORMI_ADMISSION_QUEUE_SIZE.
+  When it is full, or a turn has waited FORMI_ADMISSION_QUEUE_TIMEOUT
+  seconds, the request is answered 503.
+
+Conversations already booking (reservation through confirmation) are
+admitted ahead of everything else, and the last FORMI_ADMISSION_PRIORITY_SHARE
+of the queue is kept for them, so new sessions are shed first. Every 429 and
+503 carries a Retry-After header.
+
+Setting FORMI_ADMISSION_CONCURRENCY=0 turns queueing off and runs turns on
+the event loop as before; the per-client rate still applies if set.
+"""
+
+from typing import Callable, Deque, Dict, List, TypeVar
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+import asyncio
+import math
+import time
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+from starlette.concurrency import run_in_threadpool
+from app import config, metrics
+from app.profiling import profiled
+from app.services.chat_handler import ChatHandler, UserMessage
+
+T = TypeVar("T")
+
+# Templates of a booking in progress; their turns are admitted first
+PRIORITY_TEMPLATES = {"reservation", "time_slot_verification", "modification", "confirmation"}
+
+def is_priority(chat_handler: ChatHandler, message: UserMessage) -> bool:
+    if not message.conversation_id:
+        return False
+    conversation = chat_handler.conversations.get(message.conversation_id)
+    return conversation is not None and conversation["current_template"] in PRIORITY_TEMPLATES
+
+def client_id(request: HTTPConnection) -> str:
+    """The client a request or WebSocket counts against, from FORMI_CLIENT_ID_HEADER or the peer address"""
+    if config.CLIENT_ID_HEADER:
+        value = request.headers.get(config.CLIENT_ID_HEADER)
+        if value:
+            # X-Forwarded-For style lists name the original client first
+            return value.split(",", 1)[0].strip()
+    return request.client.host if request.client else ""
+
+class AdmissionController:
+    """Token buckets, a concurrency limit and a two-level wait queue; used from the event loop only"""
+
+    def __init__(self, concurrency: int, queue_size: int, queue_timeout: float,
+                 priority_share: float, client_rate: float, client_burst: float,
+                 max_clients: int = 100000):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        # New sessions may only fill the queue up to this depth
+        self.normal_queue_size = int(queue_size * (1 - priority_share))
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.running = 0
+        self._waiters: Dict[bool, Deque[asyncio.Future]] = {True: deque(), False: deque()}
+        # client -> [tokens, last refill time], least recently seen first
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Moving average of turn seconds, for Retry-After estimates
+        self._turn_seconds = 0.05
+
+    def queued(self) -> int:
+        return len(self._waiters[True]) + len(self._waiters[False])
+
+    def state(self) -> Dict[tuple, float]:
+        return {
+            ("running",): self.running,
+            ("queued_priority",): len(self._waiters[True]),
+            ("queued_normal",): len(self._waiters[False])
+        }
+
+    def _reject(self, status_code: int, reason: str, detail: str, retry_after: float) -> HTTPException:
+        metrics.ADMISSION_REJECTIONS.inc((reason,))
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    def _retry_after(self) -> float:
+        """Seconds until the current queue has drained, by the recent turn time"""
+        return (self.queued() + 1) * self._turn_seconds / max(1, self.concurrency)
+
+    def _take_token(self, client: str) -> float:
+        """Spend one of the client's tokens; returns 0, or the seconds until one is available"""
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.client_burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.client_burst, bucket[0] + (now - bucket[1]) * self.client_rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return (1 - bucket[0]) / self.client_rate
+        bucket[0] -= 1
+        return 0
+
+    async def acquire(self, client: str, priority: bool) -> None:
+        if self.client_rate > 0:
+            wait = self._take_token(client)
+            if wait:
+                raise self._reject(429, "rate_limited", "Too many requests", wait)
+        if not self.concurrency:
+            return
+        if self.running < self.concurrency and not self.queued():
+            self.running += 1
+            return
+
+        depth = self.queue_size if priority else self.normal_queue_size
+        if self.queued() >= depth:
+            raise self._reject(503, "queue_full", "Server is busy", self._retry_after())
+
+        waiters = self._waiters[priority]
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        try:
+            # release() hands its slot over by resolving the future
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiters, future)
+            raise self._reject(503, "queue_timeout", "Server is busy", self._retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._discard(waiters, future)
+            raise
+
+    @staticmethod
+    def _discard(waiters: Deque[asyncio.Future], future: asyncio.Future) -> None:
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        if not self.concurrency:
+            return
+        for waiters in (self._waiters[True], self._waiters[False]):
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def admit(self, client: str, priority: bool = False):
+        await self.acquire(client, priority)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._turn_seconds += 0.2 * (time.perf_counter() - start - self._turn_seconds)
+            self.release()
+
+    async def run(self, client: str, priority: bool, func: Callable[..., T], *args) -> T:
+        """Run func(*args) once admitted, on a worker thread when concurrency is limited"""
+        async with self.admit(client, priority):
+            if not self.concurrency:
+                return func(*args)
+            return await run_in_threadpool(profiled, func, *args)
+
+ADMISSION = AdmissionController(
+    concurrency=config.ADMISSION_CONCURRENCY,
+    queue_size=config.ADMISSION_QUEUE_SIZE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+    priority_share=config.ADMISSION_PRIORITY_SHARE,
+    client_rate=config.CLIENT_RATE,
+    client_burst=config.CLIENT_BURST
+)
+metrics.ADMISSION_TURNS.set_function(ADMISSION.state)
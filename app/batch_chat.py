@@ -0,0 +1,77 @@
+"""
+Batched chat turns for BBQ Nation Chatbot.
+
+Messaging gateways collect inbound messages for many conversations and post
+them together to /chat/batch. Messages are grouped by conversation_id, and
+each group runs its turns one after another in the order they were sent,
+while different groups run concurrently on a few worker threads, the lanes.
+Each lane is admitted like a /chat turn, so a batch holds as many admission
+slots as it has lanes running; the batch is rejected only if no lane is
+admitted. Messages
+without a conversation_id each start a new conversation and form a group of
+their own. Responses come back in the order of the request.
+
+A failed turn is reported in its own slot as a BatchError, and the rest of
+the batch still runs, just as if each message had been posted to /chat.
+Each response is encoded on its worker thread, and retried messages are
+answered from the idempotency cache like on /chat.
+"""
+
+from typing import Dict, Hashable, List, Optional, Union
+from collections import deque
+import asyncio
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from app import config
+from app.admission import ADMISSION
+from app.idempotency import handle_message_encoded
+from app.profiling import profiled
+from app.services.chat_handler import ChatHandler, ChatResponse, UserMessage
+
+class BatchError(BaseModel):
+    error: str
+    conversation_id: Optional[str] = None
+
+BatchResult = Union[ChatResponse, BatchError]
+
+def group_by_conversation(messages: List[UserMessage]) -> List[List[int]]:
+    """Message indexes per conversation, in input order"""
+    groups: Dict[Hashable, List[int]] = {}
+    for index, message in enumerate(messages):
+        # New conversations never share a group, even with each other
+        key = message.conversation_id if message.conversation_id else (None, index)
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+async def handle_batch(chat_handler: ChatHandler, messages: List[UserMessage], client: str) -> bytes:
+    """Handle a batch and return the encoded JSON array of its results"""
+    results: List[bytes] = [b""] * len(messages)
+    pending = deque(group_by_conversation(messages))
+
+    def run_groups() -> None:
+        # Each lane takes whole conversations until none are left
+        while True:
+            try:
+                indexes = pending.popleft()
+            except IndexError:
+                return
+            for index in indexes:
+                message = messages[index]
+                try:
+                    results[index] = handle_message_encoded(chat_handler, message, client)
+                except Exception as e:
+                    error = BatchError(error=str(e), conversation_id=message.conversation_id)
+                    results[index] = error.model_dump_json().encode("utf-8")
+
+    async def run_lane() -> None:
+        async with ADMISSION.admit(client):
+            await run_in_threadpool(profiled, run_groups)
+
+    lanes = min(len(pending), config.CHAT_BATCH_CONCURRENCY)
+    outcomes = await asyncio.gather(*(run_lane() for _ in range(lanes)), return_exceptions=True)
+    errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    # A lane that was not admitted is fine as long as another lane took its groups
+    if errors and (pending or not all(isinstance(error, HTTPException) for error in errors)):
+        raise errors[0]
+    return b"[" + b",".join(results) + b"]"
@@ -0,0 +1,95 @@
+"""
+Runtime settings for BBQ Nation Chatbot, read from the environment
+"""
+
+import os
+
+# Knowledge store backend: "memory" keeps everything in Python objects,
+# "sqlite" queries the database written by scripts/process_knowledge_base.py
+KNOWLEDGE_BACKEND = os.environ.get("FORMI_KNOWLEDGE_BACKEND", "memory")
+KNOWLEDGE_DB_PATH = os.environ.get("FORMI_KNOWLEDGE_DB", "data/processed/knowledge.db")
+
+# Live sessions are saved here on graceful shutdown and restored on startup;
+# unset disables snapshots
+SESSION_SNAPSHOT_PATH = os.environ.get("FORMI_SESSION_SNAPSHOT") or None
+
+# Token for admin-only features such as on-demand request profiling;
+# unset disables them
+ADMIN_TOKEN = os.environ.get("FORMI_ADMIN_TOKEN") or None
+
+# Request profiling: a fraction of requests to profile, an optional latency
+# threshold below which profiles are discarded, and where profiles are saved
+PROFILE_SAMPLE_RATE = float(os.environ["FORMI_PROFILE_SAMPLE_RATE"]) if os.environ.get("FORMI_PROFILE_SAMPLE_RATE") else None
+PROFILE_SLOW_MS = float(os.environ["FORMI_PROFILE_SLOW_MS"]) if os.environ.get("FORMI_PROFILE_SLOW_MS") else None
+PROFILE_INTERVAL_MS = float(os.environ.get("FORMI_PROFILE_INTERVAL_MS", "1"))
+PROFILE_DIR = os.environ.get("FORMI_PROFILE_DIR", "data/profiles")
+
+# Trace spans are appended to this JSON lines file; unset disables tracing.
+# Spans beyond the queue size are dropped rather than blocking requests
+TRACE_PATH = os.environ.get("FORMI_TRACE_PATH") or None
+TRACE_QUEUE_SIZE = int(os.environ.get("FORMI_TRACE_QUEUE_SIZE", "10000"))
+
+# Encode API responses with precompiled pydantic serializers instead of
+# FastAPI's generic validate-and-encode path
+FAST_RESPONSES = os.environ.get("FORMI_FAST_RESPONSES", "1") != "0"
+
+# WebSocket chat: connections accepted per worker, seconds to wait for a
+# client to read a response, seconds without a message before closing an
+# idle socket (0 keeps idle sockets open), and the longest message accepted
+WS_MAX_CONNECTIONS = int(os.environ.get("FORMI_WS_MAX_CONNECTIONS", "10000"))
+WS_SEND_TIMEOUT = float(os.environ.get("FORMI_WS_SEND_TIMEOUT", "10"))
+WS_IDLE_TIMEOUT = float(os.environ.get("FORMI_WS_IDLE_TIMEOUT", "0"))
+WS_MAX_MESSAGE_CHARS = int(os.environ.get("FORMI_WS_MAX_MESSAGE_CHARS", "4096"))
+
+# /chat/batch: most messages accepted per request, and worker threads that
+# run different conversations of a batch concurrently
+CHAT_BATCH_MAX_MESSAGES = int(os.environ.get("FORMI_CHAT_BATCH_MAX_MESSAGES", "1000"))
+CHAT_BATCH_CONCURRENCY = int(os.environ.get("FORMI_CHAT_BATCH_CONCURRENCY", "8"))
+
+# Responses to messages with a client message_id are kept this many seconds
+# to answer retries without rerunning the turn (0 disables), up to a bound
+IDEMPOTENCY_TTL = float(os.environ.get("FORMI_IDEMPOTENCY_TTL", "300"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("FORMI_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+# Admission control for chat turns: turns run at once on worker threads
+# (0 runs them on the event loop without queueing), turns that may wait and
+# for how many seconds, and the share of the queue kept for conversations
+# already booking
+ADMISSION_CONCURRENCY = int(os.environ.get("FORMI_ADMISSION_CONCURRENCY", "4"))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("FORMI_ADMISSION_QUEUE_SIZE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("FORMI_ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_PRIORITY_SHARE = float(os.environ.get("FORMI_ADMISSION_PRIORITY_SHARE", "0.25"))
+
+# Per-client token bucket: turns per second (0 disables) and burst size.
+# Clients are told apart by this header if set (e.g. X-Forwarded-For behind
+# a proxy), otherwise by peer address
+CLIENT_RATE = float(os.environ.get("FORMI_CLIENT_RATE", "0"))
+CLIENT_BURST = float(os.environ.get("FORMI_CLIENT_BURST", "20"))
+CLIENT_ID_HEADER = os.environ.get("FORMI_CLIENT_ID_HEADER") or None
+
+# Dispatcher mode (run.py --dispatch): virtual nodes per worker on the hash
+# ring, seconds to wait for a worker's response, and seconds to wait for
+# every worker to become ready at startup
+DISPATCH_VNODES = int(os.environ.get("FORMI_DISPATCH_VNODES", "160"))
+DISPATCH_TIMEOUT = float(os.environ.get("FORMI_DISPATCH_TIMEOUT", "30"))
+DISPATCH_STARTUP_TIMEOUT = float(os.environ.get("FORMI_DISPATCH_STARTUP_TIMEOUT", "120"))
+# Set by run.py in the dispatcher's worker processes, where the dispatcher
+# assigns conversation ids, so an id a worker has not seen starts a new conversation
+DISPATCH_WORKER = False
+
+# Conversation logs: every turn is appended as JSON lines to a file per
+# process in this directory (unset disables logging). Files are rotated at
+# the size or age limit and gzip-compressed; turns beyond the queue size are
+# dropped rather than slowing requests
+CONVERSATION_LOG_DIR = os.environ.get("FORMI_CONVERSATION_LOG_DIR") or None
+CONVERSATION_LOG_QUEUE_SIZE = int(os.environ.get("FORMI_CONVERSATION_LOG_QUEUE_SIZE", "10000"))
+CONVERSATION_LOG_MAX_BYTES = int(os.environ.get("FORMI_CONVERSATION_LOG_MAX_BYTES", str(64 * 2**20)))
+CONVERSATION_LOG_MAX_AGE = float(os.environ.get("FORMI_CONVERSATION_LOG_MAX_AGE", "3600"))
+CONVERSATION_LOG_COMPRESS = os.environ.get("FORMI_CONVERSATION_LOG_COMPRESS", "1") != "0"
+
+# Unanswered FAQ questions: count-min sketch columns and rows, and questions
+# kept as top-K candidates. Memory stays at about 8 * width * depth bytes
+# plus the candidates, however many misses are seen
+FAQ_MISS_SKETCH_WIDTH = int(os.environ.get("FORMI_FAQ_MISS_SKETCH_WIDTH", "2048"))
+FAQ_MISS_SKETCH_DEPTH = int(os.environ.get("FORMI_FAQ_MISS_SKETCH_DEPTH", "4"))
+FAQ_MISS_CANDIDATES = int(os.environ.get("FORMI_FAQ_MISS_CANDIDATES", "100"))
@@ -0,0 +1,164 @@
+"""
+Conversation logs for post-conversation analysis in BBQ Nation Chatbot.
+
+Every chat turn is written as one JSON line, in the same schema as the
+transcripts benchmarks/replay_transcripts.py replays, plus timing:
+
+    {"conversation_id": "conv_1", "message": "Hi", "response": "Welcome ...",
+     "template": "initial", "next_template": "city_collection",
+     "latency_ms": 0.41, "timestamp": 1760000000.123456}
+
+Requests only put the record on a bounded in-memory queue. A background
+thread writes it out in batches, so request latency never depends on the
+disk. If the writer falls behind and the queue fills up, records are dropped
+and counted in formi_conversation_log_records_total{result="dropped"}.
+
+Each process appends to its own conversations.<pid>.jsonl in
+FORMI_CONVERSATION_LOG_DIR. When that file reaches
+FORMI_CONVERSATION_LOG_MAX_BYTES or FORMI_CONVERSATION_LOG_MAX_AGE seconds,
+it is renamed to conversations.<pid>.<time>.jsonl and gzip-compressed. Only
+rotated files are complete, so analysis jobs read the *.jsonl.gz files.
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from app import config, metrics
+
+class ConversationLogWriter:
+    """Buffers turn records and writes, rotates and compresses them from a background thread"""
+
+    def __init__(self, directory: str, max_queue: int = 10000, batch_size: int = 512,
+                 flush_interval: float = 1.0, max_bytes: int = 64 * 2**20,
+                 max_age: float = 3600, compress: bool = True):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.path = os.path.join(directory, f"conversations.{os.getpid()}.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="conversation-log", daemon=True)
+        self._thread.start()
+
+    def record(self, turn: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(turn)
+        except queue.Full:
+            metrics.CONVERSATION_LOG_RECORDS.inc(("dropped",))
+
+    def _rotate(self, path: str) -> None:
+        """Move a finished file aside, compressed if enabled"""
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+            return
+        # Rotation times sort in order, so analysis can read a process's files in sequence
+        base = path[:-len(".jsonl")] + "." + datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        rotated = base + ".jsonl"
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated = f"{base}-{suffix}.jsonl"
+            suffix += 1
+        os.replace(path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as source, gzip.open(rotated + ".gz", "wb", compresslevel=6) as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+
+    def _rotate_orphans(self) -> None:
+        """Rotate files left behind by processes that exited without closing their log"""
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if len(parts) != 3 or parts[0] != "conversations" or parts[2] != "jsonl" or not parts[1].isdigit():
+                continue
+            try:
+                os.kill(int(parts[1]), 0)
+            except ProcessLookupError:
+                try:
+                    self._rotate(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    # Another worker starting at the same time got to it first
+                    pass
+            except PermissionError:
+                pass
+
+    def _run(self) -> None:
+        self._rotate_orphans()
+        f = open(self.path, "ab", buffering=0)
+        opened = time.time()
+        while True:
+            batch: List[Dict] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                item = ...
+            if batch:
+                f.write("".join(json.dumps(turn, default=str) + "\n" for turn in batch).encode("utf-8"))
+                metrics.CONVERSATION_LOG_RECORDS.inc(("written",), len(batch))
+            if item is None:
+                f.close()
+                self._rotate(self.path)
+                return
+            if f.tell() >= self.max_bytes or (f.tell() and time.time() - opened >= self.max_age):
+                f.close()
+                self._rotate(self.path)
+                f = open(self.path, "ab", buffering=0)
+                opened = time.time()
+
+    def close(self) -> None:
+        """Write out everything queued so far, rotate the last file and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+_writer_instance: Optional[ConversationLogWriter] = None
+_writer_lock = threading.Lock()
+
+def _writer() -> ConversationLogWriter:
+    global _writer_instance
+    if _writer_instance is None:
+        with _writer_lock:
+            if _writer_instance is None:
+                _writer_instance = ConversationLogWriter(
+                    config.CONVERSATION_LOG_DIR,
+                    max_queue=config.CONVERSATION_LOG_QUEUE_SIZE,
+                    max_bytes=config.CONVERSATION_LOG_MAX_BYTES,
+                    max_age=config.CONVERSATION_LOG_MAX_AGE,
+                    compress=config.CONVERSATION_LOG_COMPRESS
+                )
+    return _writer_instance
+
+def log_turn(conversation_id: str, message: str, response: str, template: str,
+             next_template: str, latency_seconds: float) -> None:
+    """Queue one turn for the conversation log; does nothing when logging is off"""
+    if config.CONVERSATION_LOG_DIR is None:
+        return
+    _writer().record({
+        "conversation_id": conversation_id,
+        "message": message,
+        "response": response,
+        "template": template,
+        "next_template": next_template,
+        "latency_ms": round(latency_seconds * 1000, 3),
+        "timestamp": round(time.time(), 6)
+    })
+
+def shutdown() -> None:
+    """Flush and stop the writer, if logging was used"""
+    global _writer_instance
+    with _writer_lock:
+        if _writer_instance is not None:
+            _writer_instance.close()
+            _writer_instance = None
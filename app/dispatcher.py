@@ -0,0 +1,319 @@
+"""
+Local dispatcher for multi-worker deployments of BBQ Nation Chatbot.
+
+Sessions live in the memory of the worker that created them, so every turn
+of a conversation has to reach that same worker. In dispatcher mode
+(`run.py --dispatch --workers N`) a single front process accepts all HTTP
+traffic and forwards it to N worker processes listening on local Unix
+sockets:
+
+- /chat and /chat/stream go to the worker that owns the request's
+  conversation_id on a consistent hash ring, so adding a worker moves only
+  about 1/N of the sessions. New conversations are given an id by the
+  dispatcher first, so their very first turn already lands on their owner.
+- /chat/batch is split into one sub-batch per worker, sent concurrently, and
+  the results are put back in request order.
+- /health/live and /health/ready are answered by the dispatcher itself;
+  ready means every worker is ready.
+- /metrics concatenates every worker's metrics with a worker label, so one
+  scrape covers all traffic; sum without (worker) gives the totals.
+- /admin/memory reports each worker's memory under its name.
+- /admin/faq/misses merges every worker's FAQ miss tracker, so the top
+  unanswered questions cover all traffic.
+- Everything else holds no session state and is spread round-robin. A
+  ?worker=worker-N query parameter sends the request to that worker instead,
+  for per-process admin endpoints such as /admin/memory/tracemalloc.
+
+The original client is passed on in the X-Formi-Client header, which the
+workers use for admission control. WebSocket chat is not forwarded; clients
+that need it connect to a single-process server.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import itertools
+import json
+import secrets
+import httpx
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from app import config, metrics
+from app.admission import client_id
+from app.faq_misses import FAQMissTracker
+from app.hash_ring import HashRing
+
+# Header the dispatcher sets to the original client, replacing any sent by the client
+CLIENT_HEADER = "x-formi-client"
+
+# Hop-by-hop headers that must not be forwarded either way
+_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-connection", "transfer-encoding", "te", "trailer", "upgrade"
+}
+# Request headers the dispatcher sets itself
+_REQUEST_HEADERS = _HOP_HEADERS | {"host", "content-length", CLIENT_HEADER}
+
+_ROUTED_PATHS = {"/chat", "/chat/stream"}
+
+def new_conversation_id(client: str, message_id: Optional[str] = None) -> str:
+    """An id for a new conversation, unique across workers.
+
+    Retries of a new conversation's first message carry the same message_id,
+    so they are given the same id and reach the same worker's idempotency cache.
+    Message ids are only unique per client, so the client is part of the hash.
+    """
+    if message_id:
+        key = f"{client}\0{message_id}".encode("utf-8")
+        return "conv_" + hashlib.blake2b(key, digest_size=8).hexdigest()
+    return "conv_" + secrets.token_hex(8)
+
+def _assign_conversation(message, client: str) -> Optional[str]:
+    """The message's conversation id, assigning one to a new conversation"""
+    if not isinstance(message, dict):
+        return None
+    if not message.get("conversation_id"):
+        message_id = message.get("message_id")
+        message["conversation_id"] = new_conversation_id(client, message_id if isinstance(message_id, str) else None)
+    return str(message["conversation_id"])
+
+class Dispatcher:
+    """ASGI app forwarding requests to worker processes by conversation"""
+
+    def __init__(self, sockets: Dict[str, str]):
+        self.sockets = sockets
+        self.ring = HashRing(sockets, vnodes=config.DISPATCH_VNODES)
+        self._round_robin = itertools.cycle(sockets)
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _open_clients(self) -> None:
+        timeout = httpx.Timeout(config.DISPATCH_TIMEOUT, connect=5.0)
+        for name, path in self.sockets.items():
+            self.clients[name] = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=path),
+                base_url="http://worker",
+                timeout=timeout
+            )
+
+    async def _close_clients(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+
+    async def _worker_ready(self, name: str) -> bool:
+        try:
+            response = await self.clients[name].get("/health/ready")
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+    async def wait_until_ready(self, timeout: float) -> None:
+        """Wait for every worker to report ready, so no request is forwarded too early"""
+        deadline = asyncio.get_running_loop().time() + timeout
+        pending = set(self.sockets)
+        while pending:
+            names = sorted(pending)
+            ready = await asyncio.gather(*(self._worker_ready(name) for name in names))
+            pending = {name for name, is_ready in zip(names, ready) if not is_ready}
+            if not pending:
+                return
+            if asyncio.get_running_loop().time() > deadline:
+                raise RuntimeError(f"Workers not ready after {timeout:.0f}s: {', '.join(sorted(pending))}")
+            await asyncio.sleep(0.2)
+
+    def _forward_headers(self, request: Request) -> List[Tuple[str, str]]:
+        headers = [(key, value) for key, value in request.headers.items() if key not in _REQUEST_HEADERS]
+        headers.append((CLIENT_HEADER, client_id(request)))
+        return headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008, "reason": "Not served in dispatcher mode"})
+            return
+
+        request = Request(scope, receive)
+        path = scope["path"]
+        if path == "/health/live":
+            response = JSONResponse({"status": "alive"})
+        elif path == "/health/ready":
+            response = await self._health_ready()
+        elif request.method == "POST" and path == "/chat/batch":
+            response = await self._dispatch_batch(request)
+        elif request.method == "GET" and path == "/metrics":
+            response = await self._metrics(request)
+        elif request.method == "GET" and path == "/admin/memory":
+            response = await self._memory(request)
+        elif request.method == "GET" and path == "/admin/faq/misses":
+            response = await self._faq_misses(request)
+        else:
+            response = None
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        body = await request.body()
+        if request.method == "POST" and path in _ROUTED_PATHS:
+            worker, body = self._route_message(body, client_id(request))
+        elif request.query_params.get("worker") in self.clients:
+            worker = request.query_params["worker"]
+        else:
+            worker = next(self._round_robin)
+        await self._proxy(request, worker, body, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._open_clients()
+                try:
+                    await self.wait_until_ready(config.DISPATCH_STARTUP_TIMEOUT)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._close_clients()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _health_ready(self) -> Response:
+        ready = await asyncio.gather(*(self._worker_ready(name) for name in self.sockets))
+        workers = {name: "ready" if is_ready else "not ready" for name, is_ready in zip(self.sockets, ready)}
+        if not all(ready):
+            return JSONResponse(status_code=503, content={"status": "not ready", "workers": workers})
+        return JSONResponse({"status": "ready", "workers": workers})
+
+    async def _fan_out(self, request: Request, path: str) -> Tuple[Dict[str, httpx.Response], Optional[Response]]:
+        """Every worker's response to GET path, or the error response to send instead"""
+        headers = self._forward_headers(request)
+        names = list(self.clients)
+        try:
+            upstreams = await asyncio.gather(*(self.clients[name].get(path, headers=headers) for name in names))
+        except httpx.HTTPError as e:
+            return {}, JSONResponse(status_code=502, content={"detail": f"Worker unavailable: {e}"})
+        for upstream in upstreams:
+            # Workers check the admin token, so their 403 or 404 is passed on as is
+            if upstream.status_code != 200:
+                error = Response(upstream.content, status_code=upstream.status_code,
+                                 media_type=upstream.headers.get("content-type"))
+                return {}, error
+        return dict(zip(names, upstreams)), None
+
+    async def _metrics(self, request: Request) -> Response:
+        """Every worker's metrics, labelled with the worker's name"""
+        upstreams, error = await self._fan_out(request, "/metrics")
+        if error is not None:
+            return error
+        text = metrics.label_expositions({name: upstream.text for name, upstream in upstreams.items()}, "worker")
+        return Response(text, media_type=metrics.CONTENT_TYPE)
+
+    async def _memory(self, request: Request) -> Response:
+        """Every worker's memory report, by worker name"""
+        upstreams, error = await self._fan_out(request, "/admin/memory")
+        if error is not None:
+            return error
+        return JSONResponse({"workers": {name: upstream.json() for name, upstream in upstreams.items()}})
+
+    async def _faq_misses(self, request: Request) -> Response:
+        """Top unanswered FAQ questions across all workers"""
+        try:
+            k = int(request.query_params.get("k", "20"))
+        except ValueError:
+            k = 0
+        if not 1 <= k <= 1000:
+            return JSONResponse(status_code=422, content={"detail": "k must be between 1 and 1000"})
+        upstreams, error = await self._fan_out(request, "/admin/faq/misses/sketch")
+        if error is not None:
+            return error
+        merged = FAQMissTracker.merged(upstream.json() for upstream in upstreams.values())
+        return JSONResponse({**merged.report(k), "workers": len(upstreams)})
+
+    def _route_message(self, body: bytes, client: str) -> Tuple[str, bytes]:
+        """The worker owning the message's conversation, and the body with its id filled in"""
+        try:
+            message = json.loads(body)
+        except ValueError:
+            # Let a worker reject it with its usual validation error
+            return next(self._round_robin), body
+        conversation_id = _assign_conversation(message, client)
+        if conversation_id is None:
+            return next(self._round_robin), body
+        return self.ring.node_for(conversation_id), json.dumps(message).encode("utf-8")
+
+    async def _proxy(self, request: Request, worker: str, body: bytes, send) -> None:
+        client = self.clients[worker]
+        upstream_request = client.build_request(
+            request.method,
+            request.url.path,
+            params=request.url.query,
+            headers=self._forward_headers(request),
+            content=body
+        )
+        try:
+            upstream = await client.send(upstream_request, stream=True)
+        except httpx.HTTPError as e:
+            response = JSONResponse(status_code=502, content={"detail": f"{worker} unavailable: {e}"})
+            await response(request.scope, request.receive, send)
+            return
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": upstream.status_code,
+                "headers": [
+                    (key, value) for key, value in upstream.headers.raw
+                    if key.decode("latin-1").lower() not in _HOP_HEADERS
+                ]
+            })
+            # Pass chunks on as they arrive, so /chat/stream events are not held back
+            async for chunk in upstream.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await upstream.aclose()
+
+    async def _dispatch_batch(self, request: Request) -> Response:
+        try:
+            messages = json.loads(await request.body())
+        except ValueError:
+            messages = None
+        if not isinstance(messages, list):
+            return JSONResponse(status_code=422, content={"detail": "Expected a list of messages"})
+        if len(messages) > config.CHAT_BATCH_MAX_MESSAGES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"At most {config.CHAT_BATCH_MAX_MESSAGES} messages per batch"}
+            )
+
+        client = client_id(request)
+        groups: Dict[str, List[int]] = {}
+        for index, message in enumerate(messages):
+            conversation_id = _assign_conversation(message, client)
+            worker = self.ring.node_for(conversation_id) if conversation_id else next(self._round_robin)
+            groups.setdefault(worker, []).append(index)
+
+        headers = self._forward_headers(request)
+        results: List = [None] * len(messages)
+
+        async def send_group(worker: str, indexes: List[int]) -> None:
+            try:
+                upstream = await self.clients[worker].post(
+                    "/chat/batch",
+                    headers=headers,
+                    content=json.dumps([messages[index] for index in indexes]).encode("utf-8")
+                )
+                if upstream.status_code != 200:
+                    raise ValueError(f"{worker} answered {upstream.status_code}: {upstream.text}")
+                for index, result in zip(indexes, upstream.json()):
+                    results[index] = result
+            except (httpx.HTTPError, ValueError) as e:
+                for index in indexes:
+                    message = messages[index]
+                    results[index] = {
+                        "error": str(e),
+                        "conversation_id": message.get("conversation_id") if isinstance(message, dict) else None
+                    }
+
+        await asyncio.gather(*(send_group(worker, indexes) for worker, indexes in groups.items()))
+        return Response(json.dumps(results).encode("utf-8"), media_type="application/json")
@@ -0,0 +1,164 @@
+"""
+Tracking of unanswered FAQ questions in BBQ Nation Chatbot.
+
+Every question the FAQ search has no answer for (the FAQ template's
+no_faq_found case) is normalized and counted, in memory that does not grow
+with traffic:
+
+- A count-min sketch of FORMI_FAQ_MISS_SKETCH_DEPTH rows of
+  FORMI_FAQ_MISS_SKETCH_WIDTH counters estimates how often any question
+  was missed. Estimates never undercount, and overcount by at most
+  e/width of all misses with probability 1 - e^-depth.
+- A heavy-hitters table keeps the FORMI_FAQ_MISS_CANDIDATES questions with
+  the highest estimates seen so far; a new question replaces the lowest one
+  once its estimate is higher.
+
+Sketches built with the same width and depth add up counter by counter, so
+trackers from several workers merge into one that is as accurate as if a
+single process had seen every miss. The dispatcher does this for
+GET /admin/faq/misses, using each worker's GET /admin/faq/misses/sketch.
+Under gunicorn (run.py --workers without --dispatch) nothing merges them:
+each worker reports only the misses it counted itself.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+import hashlib
+import math
+import re
+import threading
+from app import config
+
+# Longest normalized question kept, so a candidate's memory is bounded too
+MAX_QUERY_CHARS = 200
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace, so trivial variants count as one"""
+    query = _SPACE.sub(" ", _NON_WORD.sub(" ", query.lower())).strip()
+    return query[:MAX_QUERY_CHARS].rstrip()
+
+class FAQMissTracker:
+    """Count-min sketch plus heavy-hitters table over normalized questions"""
+
+    def __init__(self, width: int = 2048, depth: int = 4, candidates: int = 100):
+        self.width = width
+        self.depth = depth
+        self.candidates = candidates
+        self.total = 0
+        self._rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+        # question -> estimated misses, for the questions most likely in the top K
+        self._heavy: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _columns(self, query: str) -> List[int]:
+        # Two 64-bit hashes give every row its own column (Kirsch-Mitzenmacher)
+        digest = hashlib.blake2b(query.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def _estimate(self, columns: List[int]) -> int:
+        return min(row[column] for row, column in zip(self._rows, columns))
+
+    def _offer(self, query: str, estimate: int) -> None:
+        """Keep query in the heavy-hitters table if its estimate earns a place"""
+        if query in self._heavy or len(self._heavy) < self.candidates:
+            self._heavy[query] = estimate
+            return
+        lowest = min(self._heavy, key=self._heavy.get)
+        if estimate > self._heavy[lowest]:
+            del self._heavy[lowest]
+            self._heavy[query] = estimate
+
+    def record(self, query: str, count: int = 1) -> None:
+        query = normalize_query(query)
+        if not query:
+            return
+        columns = self._columns(query)
+        with self._lock:
+            for row, column in zip(self._rows, columns):
+                row[column] += count
+            self.total += count
+            self._offer(query, self._estimate(columns))
+
+    def estimate(self, query: str) -> int:
+        """Estimated misses of a question; never lower than the true count"""
+        columns = self._columns(normalize_query(query))
+        with self._lock:
+            return self._estimate(columns)
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """The k most missed questions with their estimated counts, most missed first"""
+        with self._lock:
+            # Counters keep growing from colliding questions, so estimates are read afresh
+            estimates = [(query, self._estimate(self._columns(query))) for query in self._heavy]
+        return sorted(estimates, key=lambda item: (-item[1], item[0]))[:k]
+
+    def merge(self, other: "FAQMissTracker") -> None:
+        """Add another tracker's misses to this one"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Only sketches of the same width and depth can be merged")
+        with self._lock:
+            for row, other_row in zip(self._rows, other._rows):
+                for column, value in enumerate(other_row):
+                    if value:
+                        row[column] += value
+            self.total += other.total
+            # Candidates from either side are re-estimated against the merged counters
+            for query in set(self._heavy) | set(other._heavy):
+                self._heavy.pop(query, None)
+                self._offer(query, self._estimate(self._columns(query)))
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "width": self.width,
+                "depth": self.depth,
+                "candidates": self.candidates,
+                "total": self.total,
+                "rows": [row.tolist() for row in self._rows],
+                "heavy_hitters": list(self._heavy)
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FAQMissTracker":
+        tracker = cls(data["width"], data["depth"], data["candidates"])
+        if len(data["rows"]) != tracker.depth or any(len(row) != tracker.width for row in data["rows"]):
+            raise ValueError("Sketch rows do not match its width and depth")
+        tracker._rows = [array("q", row) for row in data["rows"]]
+        tracker.total = data["total"]
+        for query in data["heavy_hitters"]:
+            tracker._offer(query, tracker._estimate(tracker._columns(query)))
+        return tracker
+
+    @classmethod
+    def merged(cls, sketches: Iterable[Dict]) -> "FAQMissTracker":
+        """One tracker holding the misses of every to_dict() sketch given"""
+        result: Optional[FAQMissTracker] = None
+        for data in sketches:
+            tracker = cls.from_dict(data)
+            if result is None:
+                result = tracker
+            else:
+                result.merge(tracker)
+        return result if result is not None else new_tracker()
+
+    def report(self, k: int) -> Dict:
+        return {
+            "total_misses": self.total,
+            "top": [{"query": query, "estimated_count": count} for query, count in self.top(k)],
+            # Any estimate may be this much above the true count
+            "error_bound": round(self.total * math.e / self.width, 2)
+        }
+
+def new_tracker() -> FAQMissTracker:
+    return FAQMissTracker(
+        width=config.FAQ_MISS_SKETCH_WIDTH,
+        depth=config.FAQ_MISS_SKETCH_DEPTH,
+        candidates=config.FAQ_MISS_CANDIDATES
+    )
+
+FAQ_MISSES = new_tracker()
@@ -0,0 +1,51 @@
+"""
+Consistent hash ring for routing conversations to worker processes.
+
+Every node is placed on a 64-bit ring at many pseudo-random points (virtual
+nodes), and a key belongs to the node owning the first point at or after the
+key's hash. Adding a node to an N-node ring moves only about 1/(N+1) of the
+keys, all of them to the new node; removing one moves only its own keys.
+Points depend only on node names, so every process that builds a ring from
+the same names routes keys the same way.
+"""
+
+from typing import Iterable, List, Tuple
+import bisect
+import hashlib
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def _rebuild(self, ring: List[Tuple[int, str]]) -> None:
+        ring.sort()
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        ring = list(zip(self._points, self._owners))
+        ring.extend((_hash(f"{node}#{replica}"), node) for replica in range(self.vnodes))
+        self._rebuild(ring)
+
+    def remove(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self._rebuild([entry for entry in zip(self._points, self._owners) if entry[1] != node])
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect_left(self._points, _hash(key))
+        return self._owners[index % len(self._points)]
@@ -0,0 +1,127 @@
+"""
+Idempotent chat turns for BBQ Nation Chatbot.
+
+Mobile clients retry /chat when a request times out. A message that carries a
+client-chosen message_id is answered once: its encoded response is kept for
+FORMI_IDEMPOTENCY_TTL seconds, and a retry with the same conversation_id and
+message_id gets those bytes back without running the turn again, so history
+and conversation state advance only once. A retry that arrives while the
+first attempt is still running waits for it instead of running the turn too.
+
+Message ids are only unique per client, so a message that starts a new
+conversation is keyed by the client (see app.admission.client_id) and its
+message_id; otherwise two users whose apps both send message_id "1" would
+be handed each other's conversation.
+
+The cache holds at most FORMI_IDEMPOTENCY_MAX_ENTRIES responses. Every entry
+lives for the same TTL, so insertion order is expiry order and eviction only
+ever looks at the oldest entries.
+"""
+
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+from app import config, metrics
+from app.serialization import CHAT_RESPONSE
+from app.services.chat_handler import ChatHandler, UserMessage
+
+# ("conversation", conversation_id, message_id), or ("client", client, message_id)
+# for a message that starts a new conversation
+CacheKey = Tuple[str, str, str]
+
+class ResponseCache:
+    """Bounded TTL cache of encoded responses, and the turns still running for them"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, bytes]]" = OrderedDict()
+        self._pending: Dict[CacheKey, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: CacheKey) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, body = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        return body
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def claim(self, key: CacheKey) -> Tuple[Optional[bytes], Optional[threading.Event]]:
+        """The cached body, or the event of the turn already running for key.
+
+        When neither exists the caller now runs the turn and must call
+        finish(key, ...) once it is done, even if it failed.
+        """
+        with self._lock:
+            body = self._get(key)
+            if body is not None:
+                return body, None
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = threading.Event()
+            return None, pending
+
+    def finish(self, key: CacheKey, body: Optional[bytes]) -> None:
+        """Store the body of a claimed turn, or none if it failed, and wake its waiters"""
+        if body is not None:
+            self.put(key, body)
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    def put(self, key: CacheKey, body: bytes) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, body)
+            self._entries.move_to_end(key)
+            while self._entries:
+                oldest_expires, _ = next(iter(self._entries.values()))
+                if oldest_expires > now and len(self._entries) <= self.max_entries:
+                    break
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+RESPONSES = ResponseCache(config.IDEMPOTENCY_MAX_ENTRIES, config.IDEMPOTENCY_TTL)
+
+def cache_key(message: UserMessage, client: str) -> Optional[CacheKey]:
+    if not message.message_id or not config.IDEMPOTENCY_TTL:
+        return None
+    if message.conversation_id:
+        return ("conversation", message.conversation_id, message.message_id)
+    return ("client", client, message.message_id)
+
+def handle_message_encoded(chat_handler: ChatHandler, message: UserMessage, client: str) -> bytes:
+    """Run a turn and return its encoded ChatResponse, answering retries from the cache"""
+    key = cache_key(message, client)
+    if key is None:
+        return CHAT_RESPONSE.dump_json(chat_handler.handle_message(message))
+    while True:
+        body, pending = RESPONSES.claim(key)
+        if pending is None:
+            break
+        # The same message is being handled right now; take its response, or
+        # run the turn here if that attempt failed
+        pending.wait()
+    metrics.record_cache("idempotency", body is not None)
+    if body is not None:
+        return body
+    try:
+        body = CHAT_RESPONSE.dump_json(chat_handler.handle_message(message))
+    finally:
+        RESPONSES.finish(key, body)
+    return body
@@ -1,13 +1,59 @@
-from fastapi import FastAPI, HTTPException, Query, Path
-from app.services.menu_processor import MenuProcessor
-from app.services.faq_processor import FAQProcessor
-from app.services.chat_handler import ChatHandler, UserMessage, ChatResponse
-from app.models.menu import MenuItem, SpiceLevel, Menu
-from app.models.faq import FAQ
+from contextlib import asynccontextmanager
+import os
+from time import perf_counter
+from fastapi import FastAPI, HTTPException, Query, Path, Request, Depends, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+from app import admin, config, conversation_log, metrics, serialization, tracing
+from app.profiling import ProfilingMiddleware
+from app.services.knowledge_store import get_knowledge_store
+from app.services.session_snapshot import save_snapshot, load_snapshot
+from app.services.chat_handler import ChatHandler, UserMessage, ChatResponse, STATE_DATA_FIELDS
 from app.models.knowledge_base import PhoneContact, OutletInfo
+from app.startup_profile import startup_step
+from app.serialization import FastJSONResponse, fast_response, sse_event
+from app.warmup import warm_up
+from app.websocket_chat import serve_chat_socket
+from app.batch_chat import BatchResult, handle_batch
+from app.idempotency import handle_message_encoded
+from app.admission import ADMISSION, client_id, is_priority
 from typing import List, Optional, Dict
 from datetime import datetime, time
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared knowledge store once and inject it into every service"""
+    app.state.ready = False
+    with startup_step("KnowledgeStore"):
+        knowledge_store = get_knowledge_store()
+    with startup_step("ChatHandler"):
+        chat_handler = ChatHandler(knowledge_store)
+    if config.SESSION_SNAPSHOT_PATH and os.path.exists(config.SESSION_SNAPSHOT_PATH):
+        with startup_step("Session snapshot restore"):
+            chat_handler.restore_sessions(load_snapshot(config.SESSION_SNAPSHOT_PATH))
+    app.state.knowledge_store = knowledge_store
+    app.state.chat_handler = chat_handler
+    metrics.LIVE_SESSIONS.set_function(chat_handler.session_count)
+    metrics.CONVERSATION_MESSAGES.set_function(chat_handler.history_message_count)
+    warm_up(knowledge_store)
+    app.state.ready = True
+    yield
+    # Fail readiness first so load balancers stop routing here while we drain
+    app.state.ready = False
+    if config.SESSION_SNAPSHOT_PATH:
+        saved = save_snapshot(
+            config.SESSION_SNAPSHOT_PATH,
+            chat_handler.conversations,
+            chat_handler.prompt_handler.conversation_state,
+            chat_handler.restored_sessions
+        )
+        print(f"Saved {saved} sessions to {config.SESSION_SNAPSHOT_PATH}")
+    tracing.shutdown()
+    conversation_log.shutdown()
+
+def get_chat_handler(request: Request) -> ChatHandler:
+    return request.app.state.chat_handler
+
 app = FastAPI(
     title="BBQ Nation Interactive Menu API",
     description="""
@@ -25,13 +71,13 @@ app = FastAPI(
     """,
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
-# Initialize services
-menu_processor = MenuProcessor()
-faq_processor = FAQProcessor()
-chat_handler = ChatHandler()
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -51,64 +97,83 @@ async def root():
         ]
     }
 
-@app.get("/cities")
-async def get_cities() -> List[str]:
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready(request: Request):
+    """Readiness: services are built and warmed up, and the worker is not shutting down"""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "not ready"})
+    return {"status": "ready", "knowledge_version": request.app.state.knowledge_store.version}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """Prometheus metrics"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/cities", response_model=List[str])
+async def get_cities(chat_handler: ChatHandler = Depends(get_chat_handler)):
     """Get list of available cities"""
-    return chat_handler.knowledge_processor.get_available_cities()
+    return fast_response(chat_handler.knowledge_processor.get_available_cities(), serialization.STRING_LIST)
 
-@app.get("/locations/{city}")
-async def get_locations(city: str) -> List[str]:
+@app.get("/locations/{city}", response_model=List[str])
+async def get_locations(city: str, chat_handler: ChatHandler = Depends(get_chat_handler)):
     """Get locations for a specific city"""
     locations = chat_handler.knowledge_processor.get_locations_in_city(city)
     if not locations:
         raise HTTPException(status_code=404, detail=f"City '{city}' not found")
-    return locations
+    return fast_response(locations, serialization.STRING_LIST)
 
-@app.get("/outlet/{city}/{location}")
-async def get_outlet_info(city: str, location: str) -> OutletInfo:
+@app.get("/outlet/{city}/{location}", response_model=OutletInfo)
+async def get_outlet_info(city: str, location: str, chat_handler: ChatHandler = Depends(get_chat_handler)):
     """Get detailed information about a specific outlet"""
-    outlet = chat_handler.knowledge_processor.knowledge_base.outlets.get(city, {}).get(location)
+    outlet = chat_handler.knowledge_processor.get_outlet(city, location)
     if not outlet:
         raise HTTPException(
             status_code=404,
             detail=f"Outlet not found in {location}, {city}"
         )
-    return outlet
+    return fast_response(outlet, serialization.OUTLET_INFO)
 
-@app.get("/menu/categories")
-async def get_menu_categories() -> Dict[str, List[str]]:
+@app.get("/menu/categories", response_model=Dict[str, List[str]])
+async def get_menu_categories(chat_handler: ChatHandler = Depends(get_chat_handler)):
     """Get all menu categories"""
-    return chat_handler.knowledge_processor.menu_categories
+    return fast_response(chat_handler.knowledge_processor.menu_categories, serialization.STRING_LIST_MAP)
 
-@app.get("/menu/items/{category}")
+@app.get("/menu/items/{category}", response_model=List[str])
 async def get_menu_items(
     category: str,
     dietary: Optional[str] = None,
-    spice_level: Optional[str] = None
-) -> List[Dict]:
+    spice_level: Optional[str] = None,
+    chat_handler: ChatHandler = Depends(get_chat_handler)
+):
     """Get menu items with optional filters"""
-    items = chat_handler.knowledge_processor.knowledge_base.menu_items.get(category, [])
+    items = chat_handler.knowledge_processor.get_menu_items_in_category(category)
     if not items:
         raise HTTPException(status_code=404, detail=f"Category '{category}' not found")
-    return items
+    return fast_response(items, serialization.STRING_LIST)
 
-@app.get("/contact/{city}/{location}")
-async def get_contact_info(city: str, location: str) -> PhoneContact:
+@app.get("/contact/{city}/{location}", response_model=PhoneContact)
+async def get_contact_info(city: str, location: str, chat_handler: ChatHandler = Depends(get_chat_handler)):
     """Get contact information for a specific outlet"""
-    contact = chat_handler.knowledge_processor.knowledge_base.phone_contacts.get(city, {}).get(location)
+    contact = chat_handler.knowledge_processor.get_phone_contact(city, location)
     if not contact:
         raise HTTPException(
             status_code=404,
             detail=f"Contact information not found for {location}, {city}"
         )
-    return contact
+    return fast_response(contact, serialization.PHONE_CONTACT)
 
-@app.get("/time-slots/{city}/{location}")
+@app.get("/time-slots/{city}/{location}", response_model=List[str])
 async def get_available_slots(
     city: str,
     location: str,
-    date: Optional[str] = None
-) -> List[str]:
+    date: Optional[str] = None,
+    chat_handler: ChatHandler = Depends(get_chat_handler)
+):
     """Get available time slots for a specific outlet"""
     slots = chat_handler.knowledge_processor.get_available_time_slots(location)
     if not slots:
@@ -116,10 +181,10 @@ async def get_available_slots(
             status_code=404,
             detail=f"No time slots available for {location}, {city}"
         )
-    return slots
+    return fast_response(slots, serialization.STRING_LIST)
 
-@app.post("/chat")
-async def chat(message: UserMessage) -> ChatResponse:
+@app.post("/chat", response_model=ChatResponse)
+async def chat(message: UserMessage, request: Request, chat_handler: ChatHandler = Depends(get_chat_handler)):
     """
     Chat endpoint that handles user messages and returns appropriate responses
     
@@ -131,8 +196,97 @@ async def chat(message: UserMessage) -> ChatResponse:
     Available cities:
     - Bangalore (Indiranagar, JP Nagar)
     - New Delhi (Connaught Place, Vasant Kunj)
+    
+    A message with a message_id is handled once; retries of it get the
+    first response back. Under overload the request may be answered 429 or
+    503 with Retry-After (see app/admission.py).
+    """
+    with tracing.span("POST /chat", conversation_id=message.conversation_id) as span:
+        client, priority = client_id(request), is_priority(chat_handler, message)
+        try:
+            if message.message_id:
+                return FastJSONResponse(
+                    await ADMISSION.run(client, priority, handle_message_encoded, chat_handler, message, client)
+                )
+            response = await ADMISSION.run(client, priority, chat_handler.handle_message, message)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        span.set("conversation_id", response.conversation_id)
+        return fast_response(response, serialization.CHAT_RESPONSE)
+
+@app.post("/chat/batch", response_model=List[BatchResult])
+async def chat_batch(messages: List[UserMessage], request: Request,
+                     chat_handler: ChatHandler = Depends(get_chat_handler)):
     """
-    try:
-        return chat_handler.handle_message(message)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+    Handle many user messages, across any number of conversations, in one request
+    
+    Messages of the same conversation are handled in the order given, and
+    different conversations are handled concurrently. Responses are returned
+    in the order of the request; a message that fails gets an error entry
+    in its place instead of failing the batch. Each of the batch's worker
+    lanes is admitted as one turn; the batch is answered 429 or 503 only
+    if none of them is admitted.
+    """
+    if len(messages) > config.CHAT_BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {config.CHAT_BATCH_MAX_MESSAGES} messages per batch"
+        )
+    with tracing.span("POST /chat/batch", messages=len(messages)):
+        body = await handle_batch(chat_handler, messages, client_id(request))
+    return FastJSONResponse(body)
+
+@app.post("/chat/stream")
+async def chat_stream(message: UserMessage, request: Request,
+                      chat_handler: ChatHandler = Depends(get_chat_handler)):
+    """
+    Streaming variant of /chat over Server-Sent Events
+    
+    Events, in order:
+    - `response`: the reply text, conversation id and requires_* flags, sent as
+      soon as the turn has run
+    - one event per state data field, named after the ChatResponse field
+      (`available_cities`, `available_locations`, `menu_items`,
+      `available_time_slots`), sent as each is looked up
+    - `done`, or `error` if a lookup failed
+    """
+    with tracing.span("POST /chat/stream", conversation_id=message.conversation_id) as span:
+        started = perf_counter()
+        try:
+            response, current_template, collected_data = await ADMISSION.run(
+                client_id(request), is_priority(chat_handler, message), chat_handler.start_turn, message
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        span.set("conversation_id", response.conversation_id)
+        
+    async def events():
+        yield sse_event("response", serialization.CHAT_RESPONSE.dump_json(response, exclude=STATE_DATA_FIELDS))
+        try:
+            with tracing.span("POST /chat/stream data", conversation_id=response.conversation_id,
+                              template=current_template):
+                # Lookups run on worker threads, so slow ones don't hold up the event loop
+                async for field, value in iterate_in_threadpool(
+                    chat_handler.state_data(current_template, collected_data)
+                ):
+                    yield sse_event(field, value)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", {})
+        chat_handler.log_turn(message.message, response, current_template, started)
+        
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """Chat over a WebSocket bound to one conversation; see app/websocket_chat.py"""
+    await serve_chat_socket(websocket, websocket.app.state.chat_handler)
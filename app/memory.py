@@ -0,0 +1,169 @@
+"""
+Memory accounting for BBQ Nation Chatbot.
+
+Subsystem sizes are estimated by walking the objects each subsystem holds
+and summing sys.getsizeof. An object reachable from more than one place is
+counted once, by the first subsystem that reaches it. Classes, modules,
+functions and enum members are shared by the whole process, so they are
+never counted.
+
+tracemalloc snapshots can be taken and diffed on demand to find what grows
+between two points in time.
+"""
+
+from enum import Enum
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Dict, List, Optional, Set
+import itertools
+import os
+import sys
+import threading
+import tracemalloc
+from app import faq_misses, idempotency
+
+_SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, Enum)
+
+def _slot_names(cls: type) -> List[str]:
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return [name for name in names if name not in ("__dict__", "__weakref__")]
+
+def deep_sizeof(*objects: Any, seen: Optional[Set[int]] = None) -> int:
+    """Estimated bytes held by the objects and everything they reference"""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = list(objects)
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SHARED_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+
+        if isinstance(item, (str, bytes, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for name in _slot_names(type(item)):
+                value = getattr(item, name, None)
+                if value is not None:
+                    stack.append(value)
+    return total
+
+def subsystem_sizes(chat_handler) -> Dict[str, int]:
+    """Estimated bytes held by each subsystem of a running ChatHandler"""
+    store = chat_handler.knowledge_store
+    knowledge_processor = store.knowledge_processor
+    knowledge_base = knowledge_processor.knowledge_base
+    seen: Set[int] = set()
+
+    # Histories are sized first so the conversations figure excludes them
+    conversations = list(chat_handler.conversations.values())
+    return {
+        "history": deep_sizeof(*[conversation["history"] for conversation in conversations], seen=seen),
+        "conversations": deep_sizeof(
+            chat_handler.conversations,
+            chat_handler.prompt_handler.conversation_state,
+            chat_handler.restored_sessions,
+            seen=seen
+        ),
+        # Instance attributes only: the SQLite FAQ processor's faqs property
+        # would load every row
+        "faq_index": deep_sizeof(vars(store.faq_processor), seen=seen),
+        "menu_cache": deep_sizeof(
+            vars(store.menu_processor),
+            knowledge_base.menu_items,
+            knowledge_processor.menu_categories,
+            seen=seen
+        ),
+        "outlet_data": deep_sizeof(
+            knowledge_processor.cities,
+            knowledge_processor.outlets,
+            knowledge_processor.phone_contacts,
+            seen=seen
+        ),
+        "idempotency_cache": deep_sizeof(idempotency.RESPONSES, seen=seen),
+        "faq_misses": deep_sizeof(faq_misses.FAQ_MISSES, seen=seen)
+    }
+
+def resident_set_bytes() -> Optional[int]:
+    """Current resident set size of this process, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return None
+
+class TracemallocSnapshots:
+    """On-demand tracemalloc snapshots, keeping the most recent few"""
+
+    def __init__(self, max_snapshots: int = 10):
+        self.max_snapshots = max_snapshots
+        self.snapshots: Dict[int, tracemalloc.Snapshot] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+    def take(self) -> int:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self.snapshots[snapshot_id] = snapshot
+            while len(self.snapshots) > self.max_snapshots:
+                del self.snapshots[min(self.snapshots)]
+        return snapshot_id
+
+    def get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        with self._lock:
+            snapshot = self.snapshots.get(snapshot_id)
+        if snapshot is None:
+            raise KeyError(snapshot_id)
+        return snapshot
+
+    def diff(self, base_id: int, current_id: int, group_by: str = "lineno",
+             limit: int = 20) -> List[Dict]:
+        """Largest allocation changes from one snapshot to another"""
+        stats = self.get(current_id).compare_to(self.get(base_id), group_by)
+        return [
+            {
+                "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count
+            }
+            for stat in stats[:limit]
+        ]
+
+    def status(self) -> Dict:
+        traced, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_ids = sorted(self.snapshots)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": traced,
+            "peak_bytes": peak,
+            "snapshots": snapshot_ids
+        }
+
+TRACEMALLOC = TracemallocSnapshots()
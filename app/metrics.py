@@ -0,0 +1,316 @@
+"""
+Prometheus-style metrics for BBQ Nation Chatbot.
+
+Every metric keeps one shard per thread. Updates only touch the calling
+thread's shard, so they never take a lock; the shards are summed when
+/metrics is scraped. When a thread exits, its shard is folded into the
+metric's retired total, so short-lived worker threads do not leave shards
+behind.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+import threading
+import time
+import weakref
+
+Labels = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _ShardOwner:
+    """Held only by a thread's local storage, so it is freed when the thread exits"""
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: Dict):
+        self.shard = shard
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Dict] = []
+        # Totals of the shards of threads that have exited
+        self._retired: Dict = {}
+        REGISTRY.register(self)
+
+    def _shard(self) -> Dict:
+        try:
+            return self._local.owner.shard
+        except AttributeError:
+            shard: Dict = {}
+            owner = self._local.owner = _ShardOwner(shard)
+            weakref.finalize(owner, self._retire, shard)
+            # Only the first update from each thread takes the lock
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _retire(self, shard: Dict) -> None:
+        """Fold the shard of a thread that has exited into the retired totals"""
+        with self._lock:
+            self._shards = [live for live in self._shards if live is not shard]
+            self._merge(self._retired, shard)
+
+    def _merge(self, totals: Dict, shard: Dict) -> None:
+        raise NotImplementedError
+
+    def _snapshot_shards(self) -> List[Dict]:
+        with self._lock:
+            return [dict(self._retired)] + [dict(shard) for shard in self._shards]
+
+    def values(self) -> Dict:
+        totals: Dict = {}
+        for shard in self._snapshot_shards():
+            self._merge(totals, shard)
+        return totals
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ] + self._render_samples()
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def _merge(self, totals: Dict[Labels, float], shard: Dict[Labels, float]) -> None:
+        for labels, value in shard.items():
+            totals[labels] = totals.get(labels, 0.0) + value
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.values().items())
+        ]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # [per-bucket counts with a final +Inf bucket, sum of observations]
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def time(self, labels: Labels = ()) -> "_Timer":
+        """Context manager that observes the duration of its block"""
+        return _Timer(self, labels)
+
+    def _merge(self, totals: Dict[Labels, Tuple[List[int], float]], shard: Dict) -> None:
+        for labels, (counts, total) in shard.items():
+            merged_counts, merged_total = totals.get(labels, ([0] * len(counts), 0.0))
+            totals[labels] = ([a + b for a, b in zip(merged_counts, counts)], merged_total + total)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+class GaugeFunc(_Metric):
+    """Gauge whose value is read from a callback when metrics are scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 callback: Callable[[], Union[float, Dict[Labels, float]]] = None,
+                 label_names: Sequence[str] = ()):
+        self.callback = callback
+        super().__init__(name, documentation, label_names)
+
+    def set_function(self, callback: Callable[[], Union[float, Dict[Labels, float]]]) -> None:
+        self.callback = callback
+
+    def _render_samples(self) -> List[str]:
+        if self.callback is None:
+            return []
+        value = self.callback()
+        samples = value if isinstance(value, dict) else {(): value}
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(sample)}"
+            for labels, sample in sorted(samples.items())
+        ]
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def label_expositions(expositions: Dict[str, str], label: str) -> str:
+    """Several processes' /metrics output as one, each sample labelled with its process.
+
+    Samples of a metric are kept together under a single HELP and TYPE line,
+    as the text format requires.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for source, text in expositions.items():
+        extra = f'{label}="{_escape(source)}"'
+        family = ""
+        for line in text.splitlines():
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    family_headers = headers.setdefault(family, [])
+                    if len(family_headers) < 2:
+                        family_headers.append(line)
+                    samples.setdefault(family, [])
+                continue
+            if not line:
+                continue
+            # The metric name ends at its label set or at the space before the value
+            end = min(index for index in (line.find("{"), line.find(" "), len(line)) if index >= 0)
+            if line[end:end + 1] == "{":
+                line = f"{line[:end + 1]}{extra},{line[end + 1:]}"
+            else:
+                line = f"{line[:end]}{{{extra}}}{line[end:]}"
+            samples.setdefault(family, []).append(line)
+    lines = []
+    for family, family_samples in samples.items():
+        lines.extend(headers.get(family, []))
+        lines.extend(family_samples)
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = Counter(
+    "formi_http_requests_total", "HTTP requests by route, method and status code",
+    ("route", "method", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "formi_http_request_duration_seconds", "HTTP request latency by route and method",
+    ("route", "method")
+)
+CHAT_TURN_SECONDS = Histogram(
+    "formi_chat_turn_duration_seconds", "Latency of one chat turn by template state",
+    ("template",)
+)
+TOOL_CALL_SECONDS = Histogram(
+    "formi_tool_call_duration_seconds", "Latency of knowledge tool calls by tool",
+    ("tool",)
+)
+CACHE_REQUESTS = Counter(
+    "formi_cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result")
+)
+LIVE_SESSIONS = GaugeFunc(
+    "formi_live_sessions", "Conversations held in memory, including restored ones"
+)
+CONVERSATION_MESSAGES = GaugeFunc(
+    "formi_conversation_history_messages", "Messages held in conversation histories"
+)
+WEBSOCKET_CONNECTIONS = GaugeFunc(
+    "formi_websocket_connections", "Open WebSocket chat connections"
+)
+CONVERSATION_LOG_RECORDS = Counter(
+    "formi_conversation_log_records_total", "Chat turns written to or dropped from the conversation log",
+    ("result",)
+)
+ADMISSION_TURNS = GaugeFunc(
+    "formi_admission_turns", "Chat turns running or waiting for admission, by state",
+    label_names=("state",)
+)
+ADMISSION_REJECTIONS = Counter(
+    "formi_admission_rejections_total", "Chat requests refused by admission control, by reason",
+    ("reason",)
+)
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template, never by raw path, to bound cardinality
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, (route_path, method))
+            HTTP_REQUESTS.inc((route_path, method, status[0]))
@@ -0,0 +1,142 @@
+"""
+Compact records for the menu and outlet data held in memory while serving.
+
+Pydantic models carry an instance __dict__, a fields-set record and
+per-instance copies of every string. These records use __slots__ instead.
+Repeated strings such as categories, sub-categories and ingredients are
+interned, list fields are stored as tuples, and identical dietary flags
+share a single record. Records are validated when they are built and turned
+back into the pydantic API models only at the response boundary.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+import sys
+from app.models.knowledge_base import OutletInfo, PhoneContact
+from app.models.menu import CookingMethod, DietaryInfo, MenuItem, SpiceLevel
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+def _intern_all(values: List[str]) -> Tuple[str, ...]:
+    return tuple(sys.intern(value) for value in values)
+
+class DietaryRecord:
+    __slots__ = ("is_veg", "is_jain", "is_halal", "contains_egg",
+                 "contains_dairy", "contains_nuts", "gluten_free")
+
+    # One shared record per distinct combination of flags
+    _shared: Dict[Tuple[bool, ...], "DietaryRecord"] = {}
+
+    def __init__(self, *flags: bool):
+        for name, flag in zip(self.__slots__, flags):
+            setattr(self, name, flag)
+
+    @classmethod
+    def of(cls, info: Union[DietaryInfo, Dict]) -> "DietaryRecord":
+        if not isinstance(info, DietaryInfo):
+            info = DietaryInfo(**info)
+        flags = tuple(getattr(info, name) for name in cls.__slots__)
+        record = cls._shared.get(flags)
+        if record is None:
+            record = cls._shared[flags] = cls(*flags)
+        return record
+
+    def to_model(self) -> DietaryInfo:
+        return DietaryInfo.model_construct(**{name: getattr(self, name) for name in self.__slots__})
+
+class MenuItemRecord:
+    __slots__ = ("name", "category", "sub_category", "description", "price",
+                 "spice_level", "cooking_method", "dietary_info", "preparation_time",
+                 "chef_special", "ingredients", "accompaniments", "customization_options")
+
+    @classmethod
+    def from_dict(cls, category: str, data: Dict) -> "MenuItemRecord":
+        """Build a record from a MenuProcessor item entry, validating its fields"""
+        record = cls()
+        record.name = str(data["name"])
+        record.category = sys.intern(category)
+        record.sub_category = sys.intern(data["sub_category"])
+        record.description = data.get("description")
+        record.price = float(data["price"])
+        record.spice_level = SpiceLevel(data["spice_level"])
+        record.cooking_method = CookingMethod(data["cooking_method"])
+        record.dietary_info = DietaryRecord.of(data["dietary_info"])
+        record.preparation_time = int(data["preparation_time"])
+        record.chef_special = bool(data.get("chef_special", False))
+        record.ingredients = _intern_all(data["ingredients"])
+        record.accompaniments = _intern_all(data.get("accompaniments", ()))
+        options = data.get("customization_options")
+        record.customization_options = {
+            sys.intern(key): _intern_all(values) for key, values in options.items()
+        } if options else None
+        return record
+
+    def to_dict(self) -> Dict:
+        """The item as a MenuProcessor item entry"""
+        data = {name: getattr(self, name) for name in self.__slots__ if name != "category"}
+        data["dietary_info"] = self.dietary_info.to_model()
+        data["ingredients"] = list(self.ingredients)
+        data["accompaniments"] = list(self.accompaniments)
+        data["customization_options"] = {
+            key: list(values) for key, values in self.customization_options.items()
+        } if self.customization_options else {}
+        return data
+
+    def to_model(self) -> MenuItem:
+        data = self.to_dict()
+        data["category"] = self.category
+        return MenuItem.model_construct(**data)
+
+class PhoneContactRecord:
+    __slots__ = ("outlet_name", "city", "primary_number", "secondary_number",
+                 "booking_number", "support_number")
+
+    @classmethod
+    def from_model(cls, contact: PhoneContact) -> "PhoneContactRecord":
+        record = cls()
+        record.outlet_name = sys.intern(contact.outlet_name)
+        record.city = sys.intern(contact.city)
+        record.primary_number = contact.primary_number
+        record.secondary_number = contact.secondary_number
+        record.booking_number = contact.booking_number
+        record.support_number = contact.support_number
+        return record
+
+    def to_model(self) -> PhoneContact:
+        return PhoneContact.model_construct(**{name: getattr(self, name) for name in self.__slots__})
+
+class OutletRecord:
+    __slots__ = ("name", "city", "address", "facilities", "timings",
+                 "complimentary_drinks", "private_dining", "phone_contact")
+
+    @classmethod
+    def from_model(cls, outlet: OutletInfo,
+                   phone_contact: Optional[PhoneContactRecord] = None) -> "OutletRecord":
+        """Build a record from a validated OutletInfo, sharing phone_contact if given"""
+        record = cls()
+        record.name = sys.intern(outlet.name)
+        record.city = sys.intern(outlet.city)
+        record.address = outlet.address
+        record.facilities = {sys.intern(key): value for key, value in outlet.facilities.items()}
+        record.timings = {
+            sys.intern(meal): {sys.intern(key): _intern(value) for key, value in times.items()}
+            for meal, times in outlet.timings.items()
+        }
+        record.complimentary_drinks = outlet.complimentary_drinks
+        record.private_dining = outlet.private_dining
+        if phone_contact is None and outlet.phone_contact is not None:
+            phone_contact = PhoneContactRecord.from_model(outlet.phone_contact)
+        record.phone_contact = phone_contact
+        return record
+
+    def to_model(self) -> OutletInfo:
+        return OutletInfo.model_construct(**{
+            "name": self.name,
+            "city": self.city,
+            "address": self.address,
+            "facilities": dict(self.facilities),
+            "timings": {meal: dict(times) for meal, times in self.timings.items()},
+            "complimentary_drinks": self.complimentary_drinks,
+            "private_dining": self.private_dining,
+            "phone_contact": self.phone_contact.to_model() if self.phone_contact else None
+        })
@@ -0,0 +1,187 @@
+"""
+On-demand sampling profiler for individual requests.
+
+A request is profiled when it carries the admin token in an X-Profile header
+or a ?profile= query parameter, or when it is picked by the configured
+sampling rate. While any request is being profiled, one background thread
+samples every thread's stack at a fixed interval. A sample is attributed
+to a request when the request's own middleware frame is on that stack, so
+concurrent requests on the event loop do not pollute each other's profiles.
+Work a request hands to a worker thread is wrapped in profiled(), which
+registers the thread's own frame for the request's profile.
+
+Profiles are written in the folded-stack format read by flamegraph.pl and
+speedscope. In slow-request capture mode, profiles of requests faster than
+the threshold are discarded.
+"""
+
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from app import config
+
+T = TypeVar("T")
+
+class RequestProfile:
+    __slots__ = ("profile_id", "route", "samples", "started_at")
+
+    def __init__(self, profile_id: str, route: str):
+        self.profile_id = profile_id
+        self.route = route
+        self.samples: Dict[str, int] = {}
+        self.started_at = time.time()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+_CWD = os.getcwd()
+_labels: Dict[object, str] = {}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_CWD):
+            filename = os.path.relpath(filename, _CWD)
+        label = _labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+    return label
+
+class SamplingProfiler:
+    """Samples thread stacks while at least one request is being profiled"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, frame, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active[id(frame)] = (frame, profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, frame) -> None:
+        with self._lock:
+            self._active.pop(id(frame), None)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = dict(self._active)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(frame, active)
+            time.sleep(self.interval)
+
+    def _sample(self, frame, active: Dict[int, tuple]) -> None:
+        stack = []
+        while frame is not None:
+            entry = active.get(id(frame))
+            if entry is not None and entry[0] is frame:
+                profile = entry[1]
+                folded = ";".join(reversed(stack)) or "<request>"
+                profile.samples[folded] = profile.samples.get(folded, 0) + 1
+                return
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+
+# The profiler and profile of the request being handled, copied into worker threads
+_current_profile: ContextVar[Optional[Tuple[SamplingProfiler, RequestProfile]]] = ContextVar(
+    "current_profile", default=None
+)
+
+def profiled(func: Callable[..., T], *args) -> T:
+    """Call func(*args) on a worker thread, sampling it into the current request's profile"""
+    current = _current_profile.get()
+    if current is None:
+        return func(*args)
+    profiler, profile = current
+    frame = sys._getframe()
+    profiler.start(frame, profile)
+    try:
+        return func(*args)
+    finally:
+        profiler.stop(frame)
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests on demand or by sampling"""
+
+    def __init__(self, app):
+        self.app = app
+        self.profiler = SamplingProfiler(config.PROFILE_INTERVAL_MS / 1000)
+        self.slow_ms = config.PROFILE_SLOW_MS
+        # Slow-request capture profiles every request unless a rate is given
+        if config.PROFILE_SAMPLE_RATE is not None:
+            self.sample_rate = config.PROFILE_SAMPLE_RATE
+        else:
+            self.sample_rate = 1.0 if self.slow_ms is not None else 0.0
+        self._ids = itertools.count(1)
+
+    def _requested(self, scope) -> bool:
+        """Whether the request asks for a profile with the admin token"""
+        if not config.ADMIN_TOKEN:
+            return False
+        token = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                token = value.decode("latin-1")
+                break
+        if token is None and scope.get("query_string"):
+            token = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+        return token is not None and hmac.compare_digest(token, config.ADMIN_TOKEN)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = self._requested(scope)
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(f"{int(time.time())}-{os.getpid()}-{next(self._ids)}", scope["path"])
+
+        async def send_wrapper(message):
+            if requested and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        frame = sys._getframe()
+        self.profiler.start(frame, profile)
+        token = _current_profile.set((self.profiler, profile))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            self.profiler.stop(frame)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                profile.route = route
+            if requested or self.slow_ms is None or elapsed_ms >= self.slow_ms:
+                self._save(profile, elapsed_ms)
+
+    def _save(self, profile: RequestProfile, elapsed_ms: float) -> None:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        route = profile.route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        path = os.path.join(config.PROFILE_DIR, f"{profile.profile_id}_{route}_{elapsed_ms:.0f}ms.folded")
+        with open(path, "w") as f:
+            f.write(profile.folded())
@@ -0,0 +1,45 @@
+"""
+Fast JSON responses for BBQ Nation Chatbot.
+
+By default FastAPI validates every return value against the route's
+response model, walks it with jsonable_encoder and then encodes it with
+json.dumps. Routes that return fast_response() skip all three: the payload
+is encoded straight to bytes by pydantic-core, through a TypeAdapter
+compiled once at import. Routes keep their response_model, so the OpenAPI
+schema does not change.
+
+Setting FORMI_FAST_RESPONSES=0 hands return values back to FastAPI's
+default path, which the serialization benchmark uses as its baseline.
+"""
+
+from typing import Any, Dict, List
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from app import config
+from app.models.knowledge_base import OutletInfo, PhoneContact
+from app.models.menu import MenuItem
+from app.services.chat_handler import ChatResponse
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+STRING_LIST = TypeAdapter(List[str])
+STRING_LIST_MAP = TypeAdapter(Dict[str, List[str]])
+CHAT_RESPONSE = TypeAdapter(ChatResponse)
+OUTLET_INFO = TypeAdapter(OutletInfo)
+PHONE_CONTACT = TypeAdapter(PhoneContact)
+MENU_ITEMS = TypeAdapter(List[MenuItem])
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message; data is JSON-encoded unless already bytes"""
+    if not isinstance(data, bytes):
+        data = to_json(data)
+    # Compact JSON never contains a raw newline, so one data line suffices
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + data + b"\n\n"
+
+def fast_response(content: Any, adapter: TypeAdapter, status_code: int = 200) -> Any:
+    """Encode content with a precompiled adapter, or return it as-is when fast responses are off"""
+    if not config.FAST_RESPONSES:
+        return content
+    return FastJSONResponse(adapter.dump_json(content), status_code=status_code)
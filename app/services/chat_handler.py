@@ -1,13 +1,19 @@
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
 from pydantic import BaseModel
 from datetime import datetime
+import threading
+import time
+from app import config, conversation_log, metrics, tracing
 from app.models.knowledge_base import Conversation, KnowledgeBase
-from app.services.knowledge_processor import KnowledgeProcessor
+from app.services.knowledge_store import KnowledgeStore
 from app.services.prompt_handler import PromptHandler
+from app.services.session_snapshot import SessionRecord, decode_session
 
 class UserMessage(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    # Client-chosen id; retries with the same id are answered from cache
+    message_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -21,29 +27,135 @@ class ChatResponse(BaseModel):
     available_time_slots: List[str] = []
     menu_items: List[Dict] = []
 
+# Requirement flag set on the response for turns run in each template state
+STATE_REQUIREMENTS = {
+    "initial": "requires_city",
+    "city_collection": "requires_location",
+    "time_slot_verification": "requires_time_slot",
+    "confirmation": "requires_confirmation"
+}
+
+# Response fields filled in by ChatHandler.state_data
+STATE_DATA_FIELDS = {"available_cities", "available_locations", "menu_items", "available_time_slots"}
+
+# Locks that serialize turns of the same conversation, shared by conversation id hash
+CONVERSATION_LOCK_STRIPES = 256
+
 class ChatHandler:
-    def __init__(self):
-        self.knowledge_processor = KnowledgeProcessor()
-        self.knowledge_processor.load_processed_data()
-        self.prompt_handler = PromptHandler()
+    def __init__(self, knowledge_store: KnowledgeStore, log_conversations: bool = True,
+                 record_metrics: bool = True):
+        self.knowledge_store = knowledge_store
+        self.log_conversations = log_conversations
+        self.knowledge_processor = knowledge_store.knowledge_processor
+        self.prompt_handler = PromptHandler(knowledge_store, record_metrics=record_metrics)
         self.conversations: Dict[str, Dict] = {}
+        # Sessions restored from a snapshot, decoded when next used
+        self.restored_sessions: Dict[str, SessionRecord] = {}
+        # Batched turns run on worker threads and may start conversations at once
+        self._new_conversation_lock = threading.Lock()
+        self._conversation_locks = [threading.Lock() for _ in range(CONVERSATION_LOCK_STRIPES)]
+        
+    def restore_sessions(self, sessions: Dict[str, SessionRecord]) -> None:
+        """Add snapshot sessions that are not already live"""
+        for conversation_id, record in sessions.items():
+            if conversation_id not in self.conversations:
+                self.restored_sessions[conversation_id] = record
+                
+    def _resume_session(self, conversation_id: str) -> None:
+        """Decode a restored session back into live conversation state"""
+        record = self.restored_sessions.pop(conversation_id, None)
+        if record is None:
+            return
+        conversation, prompt_state = decode_session(*record)
+        self.conversations[conversation_id] = conversation
+        self.prompt_handler.conversation_state[conversation_id] = prompt_state
+        
+    def _conversation_lock(self, conversation_id: str) -> threading.Lock:
+        return self._conversation_locks[hash(conversation_id) % CONVERSATION_LOCK_STRIPES]
+        
+    def _new_conversation_id(self) -> str:
+        number = len(self.conversations) + len(self.restored_sessions) + 1
+        while f"conv_{number}" in self.conversations or f"conv_{number}" in self.restored_sessions:
+            number += 1
+        return f"conv_{number}"
+        
+    @staticmethod
+    def _new_conversation() -> Dict:
+        return {
+            "current_template": "initial",
+            "history": [],
+            "state": {}
+        }
+        
+    def has_conversation(self, conversation_id: str) -> bool:
+        """Whether the conversation is live or waiting to be restored"""
+        return conversation_id in self.conversations or conversation_id in self.restored_sessions
+        
+    def session_count(self) -> int:
+        """Number of live sessions, including restored ones not yet resumed"""
+        return len(self.conversations) + len(self.restored_sessions)
+        
+    def history_message_count(self) -> int:
+        """Number of messages held in live conversation histories"""
+        return sum(len(conversation["history"]) for conversation in list(self.conversations.values()))
         
     def handle_message(self, user_message: UserMessage) -> ChatResponse:
         """Handle incoming user message and generate appropriate response"""
+        with tracing.span("ChatHandler.handle_message"):
+            started = time.perf_counter()
+            response, current_template, collected_data = self.start_turn(user_message)
+            
+            # Add state-specific data
+            for field, value in self.state_data(current_template, collected_data):
+                setattr(response, field, value)
+                
+            self.log_turn(user_message.message, response, current_template, started)
+            return response
+            
+    def log_turn(self, message: str, response: ChatResponse, current_template: str, started: float) -> None:
+        """Record a finished turn, timed from perf_counter() value started, in the conversation log"""
+        if not self.log_conversations:
+            return
+        conversation_log.log_turn(
+            response.conversation_id,
+            message,
+            response.response,
+            current_template,
+            self.conversations[response.conversation_id]["current_template"],
+            time.perf_counter() - started
+        )
+            
+    def start_turn(self, user_message: UserMessage) -> Tuple[ChatResponse, str, Dict]:
+        """Run one message through the conversation state machine.
         
+        Returns the response with its text and requirement flags set, the
+        template state the turn ran in and a copy of the data collected so far,
+        which state_data() takes to fill in the rest without the conversation lock.
+        """
         # Initialize conversation if new
         if not user_message.conversation_id:
-            conversation_id = f"conv_{len(self.conversations) + 1}"
-            self.conversations[conversation_id] = {
-                "current_template": "initial",
-                "history": [],
-                "state": {}
-            }
+            with self._new_conversation_lock:
+                conversation_id = self._new_conversation_id()
+                self.conversations[conversation_id] = self._new_conversation()
         else:
             conversation_id = user_message.conversation_id
             
+        # Turns run on worker threads; two turns of one conversation must not interleave
+        with self._conversation_lock(conversation_id):
+            return self._run_turn(conversation_id, user_message)
+            
+    def _run_turn(self, conversation_id: str, user_message: UserMessage) -> Tuple[ChatResponse, str, Dict]:
+        if conversation_id in self.restored_sessions:
+            self._resume_session(conversation_id)
+        elif conversation_id not in self.conversations and config.DISPATCH_WORKER:
+            # The dispatcher chose this id for a new conversation
+            self.conversations[conversation_id] = self._new_conversation()
+            
         conversation = self.conversations[conversation_id]
         current_template = conversation["current_template"]
+        span = tracing.current_span()
+        span.set("conversation_id", conversation_id)
+        span.set("template", current_template)
         
         # Execute current template
         result = self.prompt_handler.execute_template(
@@ -58,7 +170,7 @@ class ChatHandler:
             
         # Store message in conversation history
         conversation["history"].append(
-            Conversation(
+            Conversation.model_construct(
                 role="user",
                 content=user_message.message,
                 timestamp=datetime.now()
@@ -66,41 +178,46 @@ class ChatHandler:
         )
         
         # Build response
-        response = ChatResponse(
+        response = ChatResponse.model_construct(
             response=result["message"],
             conversation_id=conversation_id
         )
         
-        # Add state-specific requirements and data
-        self._add_state_requirements(response, current_template, conversation_id)
+        # Add state-specific requirements
+        flag = STATE_REQUIREMENTS.get(current_template)
+        if flag:
+            setattr(response, flag, True)
         
-        return response
+        collected_data = dict(self.prompt_handler.conversation_state[conversation_id]["collected_data"])
+        return response, current_template, collected_data
         
-    def _add_state_requirements(self, response: ChatResponse, current_template: str, conversation_id: str):
-        """Add state-specific requirements and data to the response"""
+    def state_data(self, current_template: str, collected_data: Dict) -> Iterator[Tuple[str, object]]:
+        """Look up the state-specific response data, yielding (field, value) as each is ready"""
         
         if current_template == "initial":
-            response.requires_city = True
-            response.available_cities = self.knowledge_processor.get_available_cities()
+            with self.prompt_handler.tool_timer("get_available_cities"), tracing.span("knowledge.get_available_cities"):
+                available_cities = self.knowledge_processor.get_available_cities()
+            yield "available_cities", available_cities
             
         elif current_template == "city_collection":
-            response.requires_location = True
-            city = self.prompt_handler.conversation_state[conversation_id]["collected_data"].get("city")
+            city = collected_data.get("city")
             if city:
-                response.available_locations = {
-                    city: self.knowledge_processor.get_locations_in_city(city)
-                }
+                with self.prompt_handler.tool_timer("get_locations_in_city"), tracing.span("knowledge.get_locations_in_city"):
+                    available_locations = {
+                        city: self.knowledge_processor.get_locations_in_city(city)
+                    }
+                yield "available_locations", available_locations
                 
         elif current_template == "menu_browsing":
-            menu_preference = self.prompt_handler.conversation_state[conversation_id]["collected_data"].get("menu_preference")
+            menu_preference = collected_data.get("menu_preference")
             if menu_preference:
-                response.menu_items = self.knowledge_processor.get_menu_items(menu_preference)
+                with self.prompt_handler.tool_timer("get_menu_items"), tracing.span("knowledge.get_menu_items"):
+                    menu_items = self.knowledge_processor.get_menu_items(menu_preference)
+                yield "menu_items", menu_items
                 
         elif current_template == "time_slot_verification":
-            response.requires_time_slot = True
-            location = self.prompt_handler.conversation_state[conversation_id]["collected_data"].get("location")
+            location = collected_data.get("location")
             if location:
-                response.available_time_slots = self.knowledge_processor.get_available_time_slots(location)
-                
-        elif current_template == "confirmation":
-            response.requires_confirmation = True 
\ No newline at end of file
+                with self.prompt_handler.tool_timer("get_available_time_slots"), tracing.span("knowledge.get_available_time_slots"):
+                    available_time_slots = self.knowledge_processor.get_available_time_slots(location)
+                yield "available_time_slots", available_time_slots
\ No newline at end of file
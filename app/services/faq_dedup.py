@@ -0,0 +1,339 @@
+"""
+Near-duplicate FAQ detection for ingestion in BBQ Nation Chatbot.
+
+FAQs extracted from PDFs are noisy ("Q 1 Is Jain food available", "Response
+Y es we serv e ...") and many of them repeat the hard-coded FAQs, or each
+other once several outlets' documents are merged. This stage cleans the
+extracted text and clusters near-duplicates with MinHash locality-sensitive
+hashing, so the corpus is never compared pair by pair:
+
+- Questions are lowercased and stripped of question numbers, the restaurant's
+  name, punctuation and all spaces, so broken words still produce the same
+  character shingles and the name does not make short questions look alike.
+- Every FAQ gets a MinHash signature of NUM_PERMUTATIONS values, whose
+  agreement rate estimates the Jaccard similarity of two shingle sets.
+- Signatures are cut into BANDS bands. FAQs sharing any band's values land
+  in the same bucket, and only bucket mates are compared; a pair joins one
+  cluster when its estimated similarity is at least SIMILARITY_THRESHOLD.
+
+Each cluster is represented by one FAQ, a hard-coded one when the cluster
+has any, so the canonical set written to data/processed/faqs_canonical.json
+holds every curated FAQ plus one cleaned entry per new question.
+
+Some extracted answers are notes for the support agent ("Inform the menu as
+per altius") rather than answers. They are kept in the canonical set for an
+editor to rewrite, marked with metadata["review"], and are not served.
+"""
+
+from typing import Counter, Dict, Iterable, List, Optional, Sequence
+from collections import Counter as WordCounter
+from datetime import datetime
+import hashlib
+import json
+import re
+import zlib
+import numpy as np
+from app.models.faq import FAQ, FAQCategory
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: pairs at 0.7 similarity share a band 99.9% of the time,
+# pairs at 0.2 only 5% of the time
+BANDS = 32
+SIMILARITY_THRESHOLD = 0.7
+
+# Mersenne prime 2^31 - 1, so a * x + b stays within int64
+_PRIME = (1 << 31) - 1
+
+_QUESTION_NUMBER = re.compile(r"^\s*Q\s*\d+\s*")
+_RESPONSE_PREFIX = re.compile(r"^\s*Response\s*")
+_SALUTATION = re.compile(r"\b(?:mam|sir)\s*/\s*(?:mam|sir)\b\s*,?\s*", re.IGNORECASE)
+# Page chrome the PDF export mixes into answers: session banners and print footers
+_PAGE_CHROME = re.compile(
+    r"(?:Freshworks Switcher|Your session is about to expire!|\d{1,2}/\d{1,2}/\d{2}, \d{1,2}:\d{2} [AP]M).*$",
+    re.DOTALL
+)
+_TAGGING = re.compile(r"\s*Tagging\s*(.*)$", re.DOTALL)
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.?!])")
+_WORD = re.compile(r"[a-z0-9]+")
+# Matched after spaces are removed, so a name broken by the extraction is found too
+_BRAND = re.compile(r"(?:barbeque|barbecue|bbq)nation")
+# Answers that tell the agent where to look the answer up, naming internal tools
+_AGENT_INSTRUCTION = re.compile(
+    r"\baltius\b|\bKP\b|(?:^|[:.-]\s*)(?:inform|provide information)\b", re.IGNORECASE
+)
+REVIEW_AGENT_INSTRUCTION = "agent_instruction"
+
+# Words that are complete on their own and never a fragment of a broken word
+_SHORT_WORDS = {
+    "a", "i", "am", "an", "as", "at", "be", "by", "do", "go", "he", "if", "in", "is",
+    "it", "me", "my", "no", "of", "on", "or", "so", "to", "up", "us", "we"
+}
+
+# Three-letter words common enough that they are never taken for a fragment,
+# even when a small corpus happens to use them once
+_THREE_LETTER_WORDS = {
+    "all", "and", "any", "are", "but", "can", "day", "egg", "for", "get", "had", "has",
+    "her", "him", "his", "hot", "how", "ice", "its", "may", "new", "not", "now", "off",
+    "one", "our", "out", "own", "per", "she", "tea", "the", "too", "two", "veg", "via",
+    "was", "way", "who", "why", "yes", "yet", "you"
+}
+
+_KEYWORD_STOP_WORDS = _SHORT_WORDS | {
+    "the", "you", "your", "our", "are", "can", "any", "have", "has", "what", "which",
+    "does", "there", "their", "for", "and", "with", "get", "only", "type", "types",
+    "bbq", "nation", "barbeque", "available", "serve"
+}
+
+# Category by the words of an extracted FAQ's "Tagging" label
+_TAG_CATEGORIES = [
+    ("menu", FAQCategory.MENU),
+    ("drink", FAQCategory.MENU),
+    ("book", FAQCategory.BOOKING),
+    ("reserv", FAQCategory.BOOKING),
+    ("payment", FAQCategory.PAYMENT),
+    ("timing", FAQCategory.TIMING),
+    ("facilit", FAQCategory.FACILITIES)
+]
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def build_vocabulary(texts: Iterable[str]) -> Counter[str]:
+    """How often each word is seen in the texts, for telling broken words from real ones"""
+    vocabulary: Counter[str] = WordCounter()
+    for text in texts:
+        vocabulary.update(_words(text))
+    return vocabulary
+
+def _is_fragment(token: str, vocabulary: Counter[str]) -> bool:
+    """Whether token could be a piece of a broken word: seen only once and not a short word"""
+    lower = token.lower()
+    return (len(token) >= 2 and token.isalpha() and lower not in _SHORT_WORDS
+            and lower not in _THREE_LETTER_WORDS and vocabulary.get(lower, 0) < 2)
+
+def _fragments(first: str, second: Optional[str], vocabulary: Counter[str]) -> bool:
+    """Whether two neighbouring tokens look like the halves of one broken word"""
+    if second is None:
+        return False
+    second = second.rstrip(",.?!")
+    return (min(len(first), len(second)) <= 3
+            and _is_fragment(first, vocabulary) and _is_fragment(second, vocabulary))
+
+def _join_broken_words(text: str, vocabulary: Counter[str]) -> str:
+    """Rejoin words the PDF extraction split in two, e.g. "Y es", "serv e" or "buf fet"
+
+    A pair is joined when the joined word is known, or else when both halves
+    are fragments, words seen only once, and one is at most three letters.
+    The extraction breaks words at kerned letters, so in a run of fragments
+    such as "two fla vor" the last two are joined.
+    """
+    tokens = text.split()
+    joined: List[str] = []
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        following = tokens[index + 1] if index + 1 < len(tokens) else None
+        lower = token.lower()
+        if len(token) == 1 and token.isalpha() and lower not in _SHORT_WORDS:
+            # A stray letter ends the word before it or starts the one after it
+            if joined and (joined[-1] + token).lower() in vocabulary:
+                joined[-1] += token
+                index += 1
+                continue
+            if following is not None and following[0].isalpha():
+                joined.append(token + following)
+                index += 2
+                continue
+        elif following is not None and token.isalpha() and following[0].isalpha():
+            rest = following.rstrip(",.?!")
+            after = tokens[index + 2] if index + 2 < len(tokens) else None
+            known = (min(len(token), len(rest)) <= 2 and lower not in _SHORT_WORDS
+                     and rest.lower() not in _SHORT_WORDS and (token + rest).lower() in vocabulary)
+            broken = (_fragments(token, following, vocabulary)
+                      and not (following == rest and _fragments(following, after, vocabulary)))
+            if known or broken:
+                joined.append(token + following)
+                index += 2
+                continue
+        joined.append(token)
+        index += 1
+    return " ".join(joined)
+
+def clean_question(question: str) -> str:
+    question = _QUESTION_NUMBER.sub("", question.replace("\xa0", " "))
+    question = " ".join(question.split())
+    return _SPACE_BEFORE_PUNCTUATION.sub(r"\1", question)
+
+def clean_answer(answer: str, vocabulary: Optional[Counter[str]] = None) -> str:
+    """The answer without the response label, salutation, tagging and page chrome"""
+    answer = _PAGE_CHROME.sub("", answer.replace("\xa0", " "))
+    answer = _TAGGING.sub("", answer)
+    answer = _SALUTATION.sub("", _RESPONSE_PREFIX.sub("", answer))
+    answer = " ".join(answer.split())
+    if vocabulary:
+        answer = _join_broken_words(answer, vocabulary)
+    answer = _SPACE_BEFORE_PUNCTUATION.sub(r"\1", answer)
+    if answer and answer[-1] not in ".?!)":
+        answer += "."
+    return answer[:1].upper() + answer[1:]
+
+def is_agent_instruction(answer: str) -> bool:
+    """Whether an answer is a note telling the agent where to find the answer"""
+    return _AGENT_INSTRUCTION.search(answer) is not None
+
+def extracted_category(faq: Dict) -> FAQCategory:
+    """Category of an extracted FAQ, from its category or its Tagging label"""
+    tag = faq.get("category") or ""
+    match = _TAGGING.search(_PAGE_CHROME.sub("", faq.get("answer", "")))
+    if match:
+        tag += " " + match.group(1)
+    tag = tag.lower()
+    for word, category in _TAG_CATEGORIES:
+        if word in tag:
+            return category
+    return FAQCategory.GENERAL
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hashes of the character shingles of text with all non-word characters removed"""
+    compact = _BRAND.sub("", "".join(_words(clean_question(text))))
+    if len(compact) <= size:
+        grams = {compact}
+    else:
+        grams = {compact[start:start + size] for start in range(len(compact) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) % _PRIME for gram in grams), dtype=np.int64)
+
+class MinHasher:
+    """MinHash signatures and LSH clustering with fixed, seeded permutations"""
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, bands: int = BANDS,
+                 threshold: float = SIMILARITY_THRESHOLD, seed: int = 1):
+        if num_permutations % bands:
+            raise ValueError("num_permutations must be a multiple of bands")
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_permutations, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_permutations, dtype=np.int64)
+
+    def signature(self, shingle_hashes: np.ndarray) -> np.ndarray:
+        return ((np.outer(self._a, shingle_hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        return np.stack([self.signature(shingles(text)) for text in texts])
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+        return float(np.mean(first == second))
+
+    def cluster(self, texts: Sequence[str]) -> List[List[int]]:
+        """Indexes of texts grouped into near-duplicate clusters, in order of first member"""
+        if not texts:
+            return []
+        signatures = self.signatures(texts)
+        parent = list(range(len(texts)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        for band in range(self.bands):
+            columns = signatures[:, band * self.rows:(band + 1) * self.rows]
+            buckets: Dict[bytes, List[int]] = {}
+            for index, key in enumerate(columns):
+                buckets.setdefault(key.tobytes(), []).append(index)
+            for members in buckets.values():
+                # Compare each member with one member per cluster already in the
+                # bucket, not with every other member
+                leaders: List[int] = []
+                for index in members:
+                    for leader in leaders:
+                        if find(leader) == find(index):
+                            break
+                        if self.similarity(signatures[index], signatures[leader]) >= self.threshold:
+                            parent[find(index)] = find(leader)
+                            break
+                    else:
+                        leaders.append(index)
+
+        clusters: Dict[int, List[int]] = {}
+        for index in range(len(texts)):
+            clusters.setdefault(find(index), []).append(index)
+        return sorted(clusters.values(), key=lambda members: members[0])
+
+def _faq_id(question: str) -> str:
+    key = " ".join(_words(question))
+    return "faq-" + hashlib.blake2b(key.encode("utf-8"), digest_size=4).hexdigest()
+
+def _keywords(question: str) -> List[str]:
+    keywords: List[str] = []
+    for word in _words(question):
+        if len(word) > 2 and word not in _KEYWORD_STOP_WORDS and word not in keywords:
+            keywords.append(word)
+    return keywords
+
+def deduplicate_faqs(extracted: List[Dict], curated: List[FAQ],
+                     hasher: Optional[MinHasher] = None) -> List[FAQ]:
+    """One FAQ per near-duplicate cluster of the curated and extracted FAQs.
+
+    Clusters with a curated FAQ are represented by it unchanged; the others
+    by their member with the longest cleaned answer that is not an agent
+    instruction. metadata["variants"] counts the FAQs each one stands for,
+    and metadata["review"] marks a cluster whose answers are all agent
+    instructions.
+    """
+    hasher = hasher or MinHasher()
+    vocabulary = build_vocabulary(
+        [faq.question + " " + faq.answer for faq in curated] +
+        [faq["question"] + " " + faq["answer"] for faq in extracted]
+    )
+    questions = [faq.question for faq in curated] + [faq["question"] for faq in extracted]
+    canonical: List[FAQ] = []
+    for members in hasher.cluster(questions):
+        curated_members = [index for index in members if index < len(curated)]
+        if curated_members:
+            representative = curated[curated_members[0]]
+            faq = representative.model_copy(update={
+                "metadata": {**representative.metadata, "source": "curated", "variants": str(len(members))}
+            })
+        else:
+            entries = [extracted[index - len(curated)] for index in members]
+            answers = [clean_answer(entry["answer"], vocabulary) for entry in entries]
+            instructions = [is_agent_instruction(answer) for answer in answers]
+            best = max(
+                range(len(entries)),
+                key=lambda position: (not instructions[position], len(answers[position]))
+            )
+            question = clean_question(entries[best]["question"])
+            metadata = {"source": "extracted", "variants": str(len(members))}
+            if instructions[best]:
+                metadata["review"] = REVIEW_AGENT_INSTRUCTION
+            faq = FAQ(
+                id=_faq_id(question),
+                question=question,
+                answer=answers[best],
+                category=extracted_category(entries[best]),
+                keywords=_keywords(question),
+                metadata=metadata
+            )
+        # Curated FAQs that are near-duplicates of each other are all kept
+        canonical.append(faq)
+        for index in curated_members[1:]:
+            canonical.append(curated[index])
+    return canonical
+
+def write_canonical_faqs(extracted: List[Dict], curated: List[FAQ], output_path: str) -> Dict:
+    """Deduplicate and save the canonical FAQ set the app loads at startup"""
+    faqs = deduplicate_faqs(extracted, curated)
+    data = {
+        "faqs": [faq.model_dump(mode="json") for faq in faqs],
+        "input_count": len(extracted) + len(curated),
+        "last_updated": datetime.now().isoformat()
+    }
+    with open(output_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    return data
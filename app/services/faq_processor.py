@@ -1,9 +1,34 @@
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Set, Tuple
+import json
+import os
+from app.faq_misses import normalize_query
 from app.models.faq import FAQ, FAQCategory, FAQResponse
 
+# Messages opening with one of these, or ending in "?", are answered from the FAQs
+QUESTION_WORDS = {
+    "what", "when", "where", "which", "who", "why", "how", "is", "are", "do", "does",
+    "can", "could", "will", "would", "should", "any"
+}
+
+# Words too common to pick out an FAQ by themselves
+FAQ_STOP_WORDS = QUESTION_WORDS | {
+    "the", "a", "an", "you", "your", "we", "our", "i", "me", "my", "there", "it", "in",
+    "at", "on", "of", "for", "to", "and", "or", "have", "has", "with", "bbq", "nation",
+    "barbeque", "barbecue", "please", "tell", "about", "available", "serve", "get",
+    "type", "types", "want", "know"
+}
+
+def faq_terms(text: str) -> Set[str]:
+    """The words of text that can pick out an FAQ, with plural endings dropped"""
+    return {
+        word[:-1] if word.endswith("s") and len(word) > 3 else word
+        for word in normalize_query(text).split()
+        if len(word) >= 3 and word not in FAQ_STOP_WORDS
+    }
+
 class FAQProcessor:
     def __init__(self):
-        self.faqs: List[FAQ] = [
+        self.faqs = [
             # Menu & Food Related FAQs
             FAQ(
                 id="menu-1",
@@ -95,6 +120,38 @@ class FAQProcessor:
             )
         ]
         
+    @property
+    def faqs(self) -> List[FAQ]:
+        return self._faqs
+        
+    @faqs.setter
+    def faqs(self, faqs: List[FAQ]) -> None:
+        self._faqs = faqs
+        self._index_terms()
+        
+    def _index_terms(self) -> None:
+        """Work out the words of each FAQ's question and keywords, once per change to the FAQs"""
+        self._faq_terms = [
+            (faq, faq_terms(faq.question) | faq_terms(" ".join(faq.keywords)))
+            for faq in self._faqs
+        ]
+        
+    def load_processed_faqs(self, path: str = "data/processed/faqs_canonical.json") -> None:
+        """Add the FAQs of the deduplicated set from ingestion that are not hard-coded.
+        
+        FAQs marked for review (metadata "review") are left out until an editor fixes them.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as f:
+            data = json.load(f)
+        known = {faq.id for faq in self.faqs}
+        self.faqs.extend(
+            FAQ.model_validate(entry) for entry in data["faqs"]
+            if entry["id"] not in known and "review" not in entry.get("metadata", {})
+        )
+        self._index_terms()
+        
     def get_faq_by_id(self, faq_id: str) -> Optional[FAQ]:
         """Get FAQ by ID"""
         for faq in self.faqs:
@@ -117,7 +174,7 @@ class FAQProcessor:
                 query in faq.answer.lower() or
                 any(query in keyword.lower() for keyword in faq.keywords)):
                 
-                results.append(FAQResponse(
+                results.append(FAQResponse.model_construct(
                     question=faq.question,
                     answer=faq.answer,
                     category=faq.category,
@@ -126,10 +183,46 @@ class FAQProcessor:
                 
         return results
         
+    @staticmethod
+    def _rank_matches(words: Set[str], candidates: List[Tuple[Any, Set[str]]]) -> List[Any]:
+        """The candidates whose words make a match for the query's words, best first"""
+        # (shared words, words of the FAQ, candidate); ties go to the FAQ with fewer other words
+        matched = []
+        for candidate, terms in candidates:
+            count = len(words & terms)
+            if count:
+                matched.append((count, len(terms), candidate))
+        if len(words) == 1:
+            return [candidate for _, _, candidate in matched] if len(matched) == 1 else []
+        return [
+            candidate for count, _, candidate in sorted(matched, key=lambda entry: (-entry[0], entry[1]))
+            if count >= 2 and 2 * count > len(words)
+        ]
+        
+    def match_question(self, query: str) -> List[FAQResponse]:
+        """FAQs whose question and keywords share most of the query's words, best first.
+        
+        Answers are not searched, since a word an answer merely mentions says
+        little about what the FAQ is about. An FAQ has to share at least two
+        words, unless the query has a single word and only one FAQ has it.
+        """
+        words = faq_terms(query)
+        if not words:
+            return []
+        return [
+            FAQResponse.model_construct(
+                question=faq.question,
+                answer=faq.answer,
+                category=faq.category,
+                related_questions=faq.related_questions
+            )
+            for faq in self._rank_matches(words, self._faq_terms)
+        ]
+        
     def get_faqs_by_category(self, category: FAQCategory) -> List[FAQResponse]:
         """Get all FAQs in a category"""
         return [
-            FAQResponse(
+            FAQResponse.model_construct(
                 question=faq.question,
                 answer=faq.answer,
                 category=faq.category,
@@ -142,12 +235,14 @@ class FAQProcessor:
     def add_faq(self, faq: FAQ) -> None:
         """Add a new FAQ"""
         self.faqs.append(faq)
+        self._index_terms()
         
     def update_faq(self, faq_id: str, updated_faq: FAQ) -> bool:
         """Update an existing FAQ"""
         for i, faq in enumerate(self.faqs):
             if faq.id == faq_id:
                 self.faqs[i] = updated_faq
+                self._index_terms()
                 return True
         return False
         
@@ -156,5 +251,6 @@ class FAQProcessor:
         for i, faq in enumerate(self.faqs):
             if faq.id == faq_id:
                 self.faqs.pop(i)
+                self._index_terms()
                 return True
         return False 
\ No newline at end of file
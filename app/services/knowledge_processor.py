@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
-from app.models.knowledge_base import KnowledgeBase, KnowledgeEntry, OutletInfo, Conversation
+from app.models.knowledge_base import KnowledgeBase, KnowledgeEntry, OutletInfo, PhoneContact, Conversation
+from app.models.records import OutletRecord, PhoneContactRecord
 import json
 import os
 from datetime import datetime, time
@@ -17,6 +18,9 @@ class KnowledgeProcessor:
             "main_course": ["indian", "chinese", "continental"],
             "desserts": ["indian", "international"]
         }
+        # Outlets and phone contacts are held as compact records; see set_outlets
+        self.outlets: Dict[str, Dict[str, OutletRecord]] = {}
+        self.phone_contacts: Dict[str, Dict[str, PhoneContactRecord]] = {}
 
     def save_processed_data(self) -> None:
         """Save processed data to JSON files"""
@@ -29,7 +33,7 @@ class KnowledgeProcessor:
 
         # Save outlet information
         with open(f"{self.processed_data_path}/outlets.json", "w") as f:
-            json.dump(self.knowledge_base.outlets, f, indent=2, default=lambda x: x.dict())
+            json.dump(self.outlet_models(), f, indent=2, default=lambda x: x.dict())
 
     def load_processed_data(self) -> None:
         """Load processed data from JSON files"""
@@ -41,14 +45,46 @@ class KnowledgeProcessor:
             # Load outlet information
             with open(f"{self.processed_data_path}/outlets.json", "r") as f:
                 outlets_data = json.load(f)
-                for city, outlets in outlets_data.items():
-                    self.knowledge_base.outlets[city] = {
-                        name: OutletInfo(**info) for name, info in outlets.items()
-                    }
+                self.set_outlets({
+                    city: {name: OutletInfo(**info) for name, info in outlets.items()}
+                    for city, outlets in outlets_data.items()
+                })
 
         except FileNotFoundError:
             print("Processed data files not found. Please run processing first.")
         
+    def set_outlets(self, outlets: Dict[str, Dict[str, OutletInfo]],
+                    phone_contacts: Optional[Dict[str, Dict[str, PhoneContact]]] = None) -> None:
+        """Replace outlet data, and phone contacts if given, with compact records"""
+        if phone_contacts is not None:
+            self.phone_contacts = {
+                city: {location: PhoneContactRecord.from_model(contact) for location, contact in contacts.items()}
+                for city, contacts in phone_contacts.items()
+            }
+        self.outlets = {}
+        for city, city_outlets in outlets.items():
+            self.outlets[city] = {}
+            for location, outlet in city_outlets.items():
+                # Share the contact record when the outlet embeds the same contact
+                contact = self.phone_contacts.get(city, {}).get(location)
+                if contact is not None and outlet.phone_contact != contact.to_model():
+                    contact = None
+                self.outlets[city][location] = OutletRecord.from_model(outlet, contact)
+                
+    def outlet_models(self) -> Dict[str, Dict[str, OutletInfo]]:
+        """All outlets as API models, for persisting"""
+        return {
+            city: {location: record.to_model() for location, record in outlets.items()}
+            for city, outlets in self.outlets.items()
+        }
+        
+    def phone_contact_models(self) -> Dict[str, Dict[str, PhoneContact]]:
+        """All phone contacts as API models, for persisting"""
+        return {
+            city: {location: record.to_model() for location, record in contacts.items()}
+            for city, contacts in self.phone_contacts.items()
+        }
+        
     def get_available_cities(self) -> List[str]:
         """Get list of available cities"""
         return list(self.cities.keys())
@@ -57,6 +93,20 @@ class KnowledgeProcessor:
         """Get available locations for a given city"""
         return self.cities.get(city, [])
         
+    def get_outlet(self, city: str, location: str) -> Optional[OutletInfo]:
+        """Get outlet information for a location in a city"""
+        record = self.outlets.get(city, {}).get(location)
+        return record.to_model() if record else None
+        
+    def get_phone_contact(self, city: str, location: str) -> Optional[PhoneContact]:
+        """Get phone contact for a location in a city"""
+        record = self.phone_contacts.get(city, {}).get(location)
+        return record.to_model() if record else None
+        
+    def get_menu_items_in_category(self, category: str) -> List[str]:
+        """Get menu item names in a knowledge base category"""
+        return self.knowledge_base.menu_items.get(category, [])
+        
     def get_menu_items(self, preference: str) -> List[Dict]:
         """Get menu items based on preference"""
         # Implementation would filter based on preference
@@ -97,8 +147,13 @@ class KnowledgeProcessor:
         
     def search_menu_items(self, query: str) -> List[Dict]:
         """Search menu items by query"""
-        # Implementation would search through menu items
-        return []
+        query = query.lower()
+        return [
+            {"category": category, "name": name}
+            for category, names in self.knowledge_base.menu_items.items()
+            for name in names
+            if query in name.lower()
+        ]
         
     def get_popular_dishes(self) -> List[Dict]:
         """Get list of popular dishes"""
@@ -0,0 +1,103 @@
+from typing import Optional
+import gc
+import hashlib
+import json
+from app import config
+from app.startup_profile import startup_step
+from app.services.knowledge_processor import KnowledgeProcessor
+from app.services.menu_processor import MenuProcessor
+from app.services.faq_processor import FAQProcessor
+
+class KnowledgeStore:
+    """Process-wide, read-only knowledge data shared by every service"""
+
+    def __init__(self,
+                 knowledge_processor: KnowledgeProcessor,
+                 menu_processor: MenuProcessor,
+                 faq_processor: FAQProcessor,
+                 version: Optional[str] = None):
+        self.knowledge_processor = knowledge_processor
+        self.menu_processor = menu_processor
+        self.faq_processor = faq_processor
+        self.version = version or self._compute_version()
+
+    @classmethod
+    def build(cls, backend: Optional[str] = None, db_path: Optional[str] = None) -> "KnowledgeStore":
+        """Load all knowledge data once and wrap it in a store"""
+        backend = backend or config.KNOWLEDGE_BACKEND
+        if backend == "sqlite":
+            return cls.build_sqlite(db_path or config.KNOWLEDGE_DB_PATH)
+        if backend != "memory":
+            raise ValueError(f"Unknown knowledge backend: {backend}")
+
+        with startup_step("KnowledgeProcessor"):
+            knowledge_processor = KnowledgeProcessor()
+            knowledge_processor.load_processed_data()
+        with startup_step("MenuProcessor"):
+            menu_processor = MenuProcessor()
+        with startup_step("FAQProcessor"):
+            faq_processor = FAQProcessor()
+            faq_processor.load_processed_faqs()
+        with startup_step("KnowledgeStore version"):
+            return cls(knowledge_processor, menu_processor, faq_processor)
+
+    @classmethod
+    def build_sqlite(cls, db_path: str) -> "KnowledgeStore":
+        """Wrap a database written by write_sqlite in a store"""
+        from app.services.sqlite_backend import (
+            SQLiteConnectionPool, SQLiteKnowledgeProcessor, SQLiteFAQProcessor
+        )
+        with startup_step("SQLiteKnowledgeProcessor"):
+            pool = SQLiteConnectionPool(db_path)
+            knowledge_processor = SQLiteKnowledgeProcessor(pool)
+        with startup_step("MenuProcessor"):
+            menu_processor = MenuProcessor()
+        return cls(
+            knowledge_processor,
+            menu_processor,
+            SQLiteFAQProcessor(pool),
+            version=knowledge_processor.data_version
+        )
+
+    def write_sqlite(self, db_path: str) -> None:
+        """Write this store's data into a SQLite database for the sqlite backend"""
+        from app.services.sqlite_backend import write_knowledge_database
+        write_knowledge_database(db_path, self.knowledge_processor, self.faq_processor, self.version)
+
+    def _compute_version(self) -> str:
+        """Content hash of the loaded data, used as a cache key"""
+        knowledge_base = self.knowledge_processor.knowledge_base
+        payload = {
+            "cities": self.knowledge_processor.cities,
+            "menu_categories": self.knowledge_processor.menu_categories,
+            "menu_items": knowledge_base.menu_items,
+            "menu": self.menu_processor.menu_categories,
+            "outlets": {
+                city: {name: outlet.model_dump() for name, outlet in outlets.items()}
+                for city, outlets in self.knowledge_processor.outlet_models().items()
+            },
+            "faqs": [faq.model_dump() for faq in self.faq_processor.faqs]
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha1(encoded).hexdigest()[:12]
+
+_shared_store: Optional[KnowledgeStore] = None
+
+def get_knowledge_store() -> KnowledgeStore:
+    """Return the process-wide knowledge store, building it on first use"""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = KnowledgeStore.build()
+    return _shared_store
+
+def preload_knowledge_store() -> KnowledgeStore:
+    """Build the store in a pre-fork master process so workers inherit it.
+
+    Forked workers share the master's memory pages copy-on-write. Freezing the
+    garbage collector moves the store into the permanent generation, so worker
+    collections never write to (and therefore never copy) those pages.
+    """
+    store = get_knowledge_store()
+    gc.collect()
+    gc.freeze()
+    return store
@@ -1,8 +1,9 @@
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
 from app.models.menu import (
     Menu, MenuCategory, MenuItem, SpiceLevel,
     CookingMethod, DietaryInfo
 )
+from app.models.records import MenuItemRecord
 
 class MenuProcessor:
     def __init__(self):
@@ -56,38 +57,47 @@ class MenuProcessor:
             }
         }
 
+    @property
+    def menu_categories(self) -> Dict[str, Dict]:
+        """Menu in its raw form, built from the compact item records on first use"""
+        if self._menu_categories is None:
+            self._menu_categories = {
+                name: {
+                    "description": description,
+                    "available_times": list(available_times),
+                    "items": [record.to_dict() for record in self.items_by_category[name]]
+                }
+                for name, (description, available_times) in self.categories.items()
+            }
+        return self._menu_categories
+
+    @menu_categories.setter
+    def menu_categories(self, menu_categories: Dict[str, Dict]) -> None:
+        """Replace the menu, converting every item to a compact record once"""
+        self.categories: Dict[str, tuple] = {}
+        self.items_by_category: Dict[str, List[MenuItemRecord]] = {}
+        for name, data in menu_categories.items():
+            self.categories[name] = (data["description"], tuple(data["available_times"]))
+            self.items_by_category[name] = [
+                MenuItemRecord.from_dict(name, item) for item in data["items"]
+            ]
+        self._category_names = {name.lower(): name for name in self.categories}
+        self._menu_categories: Optional[Dict[str, Dict]] = None
+
+    def _all_records(self) -> Iterator[MenuItemRecord]:
+        for records in self.items_by_category.values():
+            yield from records
+
     def process_raw_menu(self) -> Menu:
-        categories: List[MenuCategory] = []
-        
-        for cat_name, cat_data in self.menu_categories.items():
-            menu_items: List[MenuItem] = []
-            
-            for item_data in cat_data["items"]:
-                menu_items.append(
-                    MenuItem(
-                        name=item_data["name"],
-                        category=cat_name,
-                        sub_category=item_data["sub_category"],
-                        price=item_data["price"],
-                        spice_level=item_data["spice_level"],
-                        cooking_method=item_data["cooking_method"],
-                        dietary_info=item_data["dietary_info"],
-                        preparation_time=item_data["preparation_time"],
-                        ingredients=item_data["ingredients"],
-                        chef_special=item_data.get("chef_special", False),
-                        accompaniments=item_data.get("accompaniments", []),
-                        customization_options=item_data.get("customization_options", {})
-                    )
-                )
-            
-            categories.append(
-                MenuCategory(
-                    name=cat_name,
-                    description=cat_data["description"],
-                    items=menu_items,
-                    available_times=cat_data["available_times"]
-                )
+        categories: List[MenuCategory] = [
+            MenuCategory(
+                name=name,
+                description=description,
+                items=[record.to_model() for record in self.items_by_category[name]],
+                available_times=list(available_times)
             )
+            for name, (description, available_times) in self.categories.items()
+        ]
         
         return Menu(
             categories=categories,
@@ -107,36 +117,30 @@ class MenuProcessor:
         )
 
     def get_menu_by_category(self, category: str) -> List[MenuItem]:
-        menu = self.process_raw_menu()
-        for cat in menu.categories:
-            if cat.name.lower() == category.lower():
-                return cat.items
-        return []
+        name = self._category_names.get(category.lower())
+        if name is None:
+            return []
+        return [record.to_model() for record in self.items_by_category[name]]
 
     def get_menu_by_dietary_preference(self, 
                                      is_veg: bool = None,
                                      is_jain: bool = None,
                                      is_halal: bool = None,
                                      gluten_free: bool = None) -> List[MenuItem]:
-        menu = self.process_raw_menu()
         filtered_items = []
         
-        for category in menu.categories:
-            for item in category.items:
-                if (is_veg is None or item.dietary_info.is_veg == is_veg) and \
-                   (is_jain is None or item.dietary_info.is_jain == is_jain) and \
-                   (is_halal is None or item.dietary_info.is_halal == is_halal) and \
-                   (gluten_free is None or item.dietary_info.gluten_free == gluten_free):
-                    filtered_items.append(item)
+        for item in self._all_records():
+            dietary_info = item.dietary_info
+            if (is_veg is None or dietary_info.is_veg == is_veg) and \
+               (is_jain is None or dietary_info.is_jain == is_jain) and \
+               (is_halal is None or dietary_info.is_halal == is_halal) and \
+               (gluten_free is None or dietary_info.gluten_free == gluten_free):
+                filtered_items.append(item.to_model())
         
         return filtered_items
 
     def get_chef_specials(self) -> List[MenuItem]:
-        menu = self.process_raw_menu()
-        return [item for cat in menu.categories 
-                for item in cat.items if item.chef_special]
+        return [item.to_model() for item in self._all_records() if item.chef_special]
 
     def get_items_by_spice_level(self, spice_level: SpiceLevel) -> List[MenuItem]:
-        menu = self.process_raw_menu()
-        return [item for cat in menu.categories 
-                for item in cat.items if item.spice_level == spice_level] 
\ No newline at end of file
+        return [item.to_model() for item in self._all_records() if item.spice_level == spice_level]
@@ -2,8 +2,9 @@ from typing import Dict, List, Optional
 import os
 import json
 from datetime import datetime, time
-import PyPDF2
 from pathlib import Path
+from app.services.faq_dedup import write_canonical_faqs
+from app.services.faq_processor import FAQProcessor
 
 class PDFProcessor:
     def __init__(self, pdf_dir: str = "data/pdfs"):
@@ -19,6 +20,137 @@ class PDFProcessor:
         os.makedirs(self.timeslots_dir, exist_ok=True)
         os.makedirs(self.processed_dir, exist_ok=True)
         
+    def _read_pdf_pages(self, pdf_path: str) -> List[str]:
+        """Extract the text of every page in a PDF"""
+        # PyPDF2 is only needed for ingestion, so it is not imported with the app
+        import PyPDF2
+        
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            return [page.extract_text() for page in reader.pages]
+        
+    def parse_menu_text(self, text: str, menu_data: Dict) -> None:
+        """Parse the extracted text of one menu page into menu_data"""
+        # Process menu categories and items
+        # This is a basic implementation - customize based on your PDF structure
+        lines = text.split('\n')
+        current_category = None
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+                
+            # Assume categories are in ALL CAPS
+            if line.isupper():
+                current_category = {
+                    "name": line,
+                    "items": []
+                }
+                menu_data["categories"].append(current_category)
+            elif current_category and ':' in line:
+                # Assume items have name: description format
+                name, description = line.split(':', 1)
+                item = {
+                    "name": name.strip(),
+                    "description": description.strip(),
+                    "category": current_category["name"]
+                }
+                menu_data["items"].append(item)
+                current_category["items"].append(item)
+        
+    def parse_faq_text(self, text: str, faq_data: Dict) -> None:
+        """Parse the extracted text of one FAQ page into faq_data"""
+        # Process FAQs
+        # This is a basic implementation - customize based on your PDF structure
+        lines = text.split('\n')
+        current_question = None
+        current_answer = []
+        current_category = None
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+                
+            # Assume categories are in [Square Brackets]
+            if line.startswith('[') and line.endswith(']'):
+                current_category = line[1:-1]
+                faq_data["categories"].add(current_category)
+                continue
+                
+            # Assume questions end with ?
+            if line.endswith('?'):
+                # Save previous QA pair if exists
+                if current_question and current_answer:
+                    faq_data["faqs"].append({
+                        "question": current_question,
+                        "answer": ' '.join(current_answer),
+                        "category": current_category
+                    })
+                
+                current_question = line
+                current_answer = []
+            elif current_question:
+                current_answer.append(line)
+        
+        # Save last QA pair
+        if current_question and current_answer:
+            faq_data["faqs"].append({
+                "question": current_question,
+                "answer": ' '.join(current_answer),
+                "category": current_category
+            })
+        
+    def parse_timeslot_text(self, text: str, location_slots: Dict) -> None:
+        """Parse the extracted text of one time slot page into location_slots"""
+        lines = text.split('\n')
+        current_section = None
+        current_meal = None
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Check for section headers
+            lower_line = line.lower()
+            if "weekday" in lower_line:
+                current_section = "weekday"
+                continue
+            elif "weekend" in lower_line:
+                current_section = "weekend"
+                continue
+            elif "special days" in lower_line:
+                current_section = "special_days"
+                continue
+            
+            # Check for meal type
+            if "lunch" in lower_line:
+                current_meal = "lunch"
+                continue
+            elif "dinner" in lower_line:
+                current_meal = "dinner"
+                continue
+            
+            # Process time slots
+            if current_section and current_meal and ":" in line:
+                try:
+                    # Parse time in format "HH:MM" or "HH:MM AM/PM"
+                    time_str = line.strip()
+                    if "special_days" == current_section:
+                        # Format: "Holiday Name: HH:MM - HH:MM"
+                        day_name, time_range = time_str.split(':', 1)
+                        start_time, end_time = time_range.split('-')
+                        location_slots["special_days"][day_name.strip()] = {
+                            "start": start_time.strip(),
+                            "end": end_time.strip()
+                        }
+                    else:
+                        location_slots[current_section][current_meal].append(time_str)
+                except Exception as e:
+                    print(f"Error parsing time slot '{line}': {str(e)}")
+        
     def process_menu_pdfs(self) -> Dict:
         """Process menu PDFs and extract structured data"""
         menu_data = {
@@ -32,40 +164,10 @@ class PDFProcessor:
                 continue
                 
             pdf_path = os.path.join(self.menu_dir, pdf_file)
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                
-                # Extract text from each page
-                for page in reader.pages:
-                    text = page.extract_text()
-                    
-                    # Process menu categories and items
-                    # This is a basic implementation - customize based on your PDF structure
-                    lines = text.split('\n')
-                    current_category = None
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                            
-                        # Assume categories are in ALL CAPS
-                        if line.isupper():
-                            current_category = {
-                                "name": line,
-                                "items": []
-                            }
-                            menu_data["categories"].append(current_category)
-                        elif current_category and ':' in line:
-                            # Assume items have name: description format
-                            name, description = line.split(':', 1)
-                            item = {
-                                "name": name.strip(),
-                                "description": description.strip(),
-                                "category": current_category["name"]
-                            }
-                            menu_data["items"].append(item)
-                            current_category["items"].append(item)
+            
+            # Extract text from each page
+            for text in self._read_pdf_pages(pdf_path):
+                self.parse_menu_text(text, menu_data)
         
         # Save processed data
         output_path = os.path.join(self.processed_dir, "menu.json")
@@ -87,53 +189,10 @@ class PDFProcessor:
                 continue
                 
             pdf_path = os.path.join(self.faq_dir, pdf_file)
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                
-                # Extract text from each page
-                for page in reader.pages:
-                    text = page.extract_text()
-                    
-                    # Process FAQs
-                    # This is a basic implementation - customize based on your PDF structure
-                    lines = text.split('\n')
-                    current_question = None
-                    current_answer = []
-                    current_category = None
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                            
-                        # Assume categories are in [Square Brackets]
-                        if line.startswith('[') and line.endswith(']'):
-                            current_category = line[1:-1]
-                            faq_data["categories"].add(current_category)
-                            continue
-                            
-                        # Assume questions end with ?
-                        if line.endswith('?'):
-                            # Save previous QA pair if exists
-                            if current_question and current_answer:
-                                faq_data["faqs"].append({
-                                    "question": current_question,
-                                    "answer": ' '.join(current_answer),
-                                    "category": current_category
-                                })
-                            
-                            current_question = line
-                            current_answer = []
-                        elif current_question:
-                            current_answer.append(line)
-                    
-                    # Save last QA pair
-                    if current_question and current_answer:
-                        faq_data["faqs"].append({
-                            "question": current_question,
-                            "answer": ' '.join(current_answer),
-                            "category": current_category
-                        })
+            
+            # Extract text from each page
+            for text in self._read_pdf_pages(pdf_path):
+                self.parse_faq_text(text, faq_data)
         
         # Convert categories set to list for JSON serialization
         faq_data["categories"] = list(faq_data["categories"])
@@ -143,8 +202,17 @@ class PDFProcessor:
         with open(output_path, 'w') as f:
             json.dump(faq_data, f, indent=2)
             
+        self.deduplicate_faqs(faq_data["faqs"])
         return faq_data
         
+    def deduplicate_faqs(self, faqs: Optional[List[Dict]] = None) -> Dict:
+        """Cluster extracted FAQs with the hard-coded ones and save the canonical set"""
+        if faqs is None:
+            with open(os.path.join(self.processed_dir, "faqs.json"), 'r') as f:
+                faqs = json.load(f)["faqs"]
+        output_path = os.path.join(self.processed_dir, "faqs_canonical.json")
+        return write_canonical_faqs(faqs, FAQProcessor().faqs, output_path)
+        
     def process_timeslot_pdfs(self) -> Dict:
         """Process time slot PDFs for different locations"""
         timeslot_data = {
@@ -161,75 +229,27 @@ class PDFProcessor:
             city = location_name.split()[0]
             
             pdf_path = os.path.join(self.timeslots_dir, pdf_file)
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                
-                location_slots = {
-                    "weekday": {
-                        "lunch": [],
-                        "dinner": []
-                    },
-                    "weekend": {
-                        "lunch": [],
-                        "dinner": []
-                    },
-                    "special_days": {}
-                }
-                
-                # Extract text from each page
-                for page in reader.pages:
-                    text = page.extract_text()
-                    lines = text.split('\n')
-                    current_section = None
-                    current_meal = None
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        # Check for section headers
-                        lower_line = line.lower()
-                        if "weekday" in lower_line:
-                            current_section = "weekday"
-                            continue
-                        elif "weekend" in lower_line:
-                            current_section = "weekend"
-                            continue
-                        elif "special days" in lower_line:
-                            current_section = "special_days"
-                            continue
-                        
-                        # Check for meal type
-                        if "lunch" in lower_line:
-                            current_meal = "lunch"
-                            continue
-                        elif "dinner" in lower_line:
-                            current_meal = "dinner"
-                            continue
-                        
-                        # Process time slots
-                        if current_section and current_meal and ":" in line:
-                            try:
-                                # Parse time in format "HH:MM" or "HH:MM AM/PM"
-                                time_str = line.strip()
-                                if "special_days" == current_section:
-                                    # Format: "Holiday Name: HH:MM - HH:MM"
-                                    day_name, time_range = time_str.split(':', 1)
-                                    start_time, end_time = time_range.split('-')
-                                    location_slots["special_days"][day_name.strip()] = {
-                                        "start": start_time.strip(),
-                                        "end": end_time.strip()
-                                    }
-                                else:
-                                    location_slots[current_section][current_meal].append(time_str)
-                            except Exception as e:
-                                print(f"Error parsing time slot '{line}': {str(e)}")
-                
-                # Add location data
-                if city not in timeslot_data["locations"]:
-                    timeslot_data["locations"][city] = {}
-                timeslot_data["locations"][city][location_name] = location_slots
+            
+            location_slots = {
+                "weekday": {
+                    "lunch": [],
+                    "dinner": []
+                },
+                "weekend": {
+                    "lunch": [],
+                    "dinner": []
+                },
+                "special_days": {}
+            }
+            
+            # Extract text from each page
+            for text in self._read_pdf_pages(pdf_path):
+                self.parse_timeslot_text(text, location_slots)
+            
+            # Add location data
+            if city not in timeslot_data["locations"]:
+                timeslot_data["locations"][city] = {}
+            timeslot_data["locations"][city][location_name] = location_slots
         
         # Save processed data
         output_path = os.path.join(self.processed_dir, "timeslots.json")
@@ -1,16 +1,51 @@
-from typing import Dict, Optional, Any
-from app.prompts.templates import TEMPLATES, PromptTemplate, PromptObjective
-from app.services.knowledge_processor import KnowledgeProcessor
+from typing import ContextManager, Dict, Optional, Any, Callable, TYPE_CHECKING
+from app.services.knowledge_store import KnowledgeStore
+from contextlib import nullcontext
 from datetime import datetime
+import time
+from app import metrics, tracing
+from app.faq_misses import FAQ_MISSES, normalize_query
+from app.services.faq_processor import QUESTION_WORDS
 from app.models.knowledge_base import KnowledgeBase
 
+if TYPE_CHECKING:
+    from app.prompts.templates import PromptTemplate
+
 class PromptHandler:
-    def __init__(self):
-        self.templates = TEMPLATES
-        self.knowledge_processor = KnowledgeProcessor()
+    def __init__(self, knowledge_store: KnowledgeStore, record_metrics: bool = True):
+        self.record_metrics = record_metrics
+        self._templates: Optional[Dict[str, "PromptTemplate"]] = None
+        self.knowledge_store = knowledge_store
+        self.knowledge_processor = knowledge_store.knowledge_processor
         self.conversation_state: Dict[str, Dict] = {}
+        self.state_handlers: Dict[str, Callable[[str, Optional[str]], Dict[str, Any]]] = {
+            "initial": self._handle_initial_state,
+            "city_collection": self._handle_city_collection,
+            "location_collection": self._handle_location_collection,
+            "intent_identification": self._handle_intent,
+            "menu_browsing": self._handle_menu_browsing,
+            "reservation": self._handle_reservation,
+            "time_slot_verification": self._handle_time_slot,
+            "clarification": self._handle_clarification,
+            "modification": self._handle_modification,
+            "confirmation": self._handle_confirmation
+        }
+        
+    @property
+    def templates(self) -> Dict[str, "PromptTemplate"]:
+        """Prompt template definitions, imported on first use"""
+        if self._templates is None:
+            from app.prompts.templates import TEMPLATES
+            self._templates = TEMPLATES
+        return self._templates
+        
+    def tool_timer(self, tool_name: str) -> ContextManager:
+        """Times a knowledge tool call into the tool latency metric, unless metrics are off"""
+        if not self.record_metrics:
+            return nullcontext()
+        return metrics.TOOL_CALL_SECONDS.time((tool_name,))
         
-    def get_template(self, template_name: str) -> Optional[PromptTemplate]:
+    def get_template(self, template_name: str) -> Optional["PromptTemplate"]:
         """Get a prompt template by name"""
         return self.templates.get(template_name)
         
@@ -22,14 +57,21 @@ class PromptHandler:
                 "last_message": None
             }
             
-        handler = self.templates.get(template_name)
+        handler = self.state_handlers.get(template_name)
         if not handler:
             return {
                 "message": "I apologize, but I'm not sure how to handle that request.",
                 "response_type": "error"
             }
             
-        return handler(conversation_id, user_input)
+        start = time.perf_counter()
+        try:
+            with tracing.span("PromptHandler.execute_template", conversation_id=conversation_id, template=template_name):
+                with tracing.span(f"PromptHandler.{handler.__name__}"):
+                    return handler(conversation_id, user_input)
+        finally:
+            if self.record_metrics:
+                metrics.CHAT_TURN_SECONDS.observe(time.perf_counter() - start, (template_name,))
         
     def _handle_initial_state(self, conversation_id: str, user_input: Optional[str]) -> Dict[str, Any]:
         return {
@@ -81,12 +123,36 @@ class PromptHandler:
                 "response_type": "transition",
                 "next_state": "reservation"
             }
+        elif self._is_question(user_input):
+            return self._handle_faq(conversation_id, user_input)
         else:
             return {
                 "message": "Could you please clarify if you'd like to browse our menu or make a reservation?",
                 "response_type": "continue"
             }
             
+    @staticmethod
+    def _is_question(user_input: str) -> bool:
+        words = normalize_query(user_input).split(" ", 1)
+        return user_input.rstrip().endswith("?") or words[0] in QUESTION_WORDS
+        
+    def _handle_faq(self, conversation_id: str, user_input: str) -> Dict[str, Any]:
+        """Answer a question from the FAQs, as in FAQ_TEMPLATE"""
+        with self.tool_timer("search_faqs"), tracing.span("knowledge.search_faqs"):
+            results = self.knowledge_store.faq_processor.match_question(user_input)
+        if results:
+            return {
+                "message": f"{results[0].answer} Is there anything else I can help you with?",
+                "response_type": "continue"
+            }
+        # no_faq_found: count the question so the most missed ones can be added
+        if self.record_metrics:
+            FAQ_MISSES.record(user_input)
+        return {
+            "message": "I'm sorry, I don't have an answer to that yet. The outlet team will be happy to help, or I can help you browse our menu or make a reservation.",
+            "response_type": "continue"
+        }
+        
     def _handle_menu_browsing(self, conversation_id: str, user_input: str) -> Dict[str, Any]:
         # Store menu preferences
         self.conversation_state[conversation_id]["collected_data"]["menu_preference"] = user_input
@@ -150,15 +216,21 @@ class PromptHandler:
         
     def _verify_with_tool(self, tool_name: str, value: str) -> Dict[str, Any]:
         """Verify data using the specified tool"""
+        with self.tool_timer(tool_name), tracing.span("PromptHandler._verify_with_tool", tool=tool_name):
+            return self._run_tool(tool_name, value)
+            
+    def _run_tool(self, tool_name: str, value: str) -> Dict[str, Any]:
         if tool_name == "get_available_cities":
-            available_cities = self.knowledge_processor.get_available_cities()
+            with tracing.span("knowledge.get_available_cities"):
+                available_cities = self.knowledge_processor.get_available_cities()
             return {
                 "valid": value in available_cities,
                 "message": f"City {value} is {'valid' if value in available_cities else 'invalid'}"
             }
         elif tool_name == "get_locations_in_city":
             city = self.conversation_state.get("city", "")
-            available_locations = self.knowledge_processor.get_locations_in_city(city)
+            with tracing.span("knowledge.get_locations_in_city"):
+                available_locations = self.knowledge_processor.get_locations_in_city(city)
             return {
                 "valid": value in available_locations,
                 "message": f"Location {value} is {'valid' if value in available_locations else 'invalid'}"
@@ -184,7 +256,8 @@ class PromptHandler:
         if info_type == "outlet_details":
             city = state["collected_data"].get("city")
             location = state["collected_data"].get("location")
-            outlet_info = self.knowledge_processor.knowledge_base.outlets.get(city, {}).get(location, {})
+            with tracing.span("knowledge.get_outlet"):
+                outlet_info = self.knowledge_processor.get_outlet(city, location) or {}
             return {
                 "message": f"Here are the details for our {location} outlet: {outlet_info}"
             }
@@ -0,0 +1,106 @@
+from typing import Dict, Tuple, Any
+from datetime import datetime
+import json
+import os
+import time
+from app.models.knowledge_base import Conversation
+
+SNAPSHOT_FORMAT = "formi-sessions"
+SNAPSHOT_VERSION = 1
+
+# A restored session is kept as (snapshot version, encoded payload) and only
+# decoded when the conversation is next used
+SessionRecord = Tuple[int, str]
+
+def encode_session(conversation: Dict[str, Any], prompt_state: Dict[str, Any]) -> str:
+    """Encode one live session as a compact JSON payload"""
+    return json.dumps({
+        "t": conversation["current_template"],
+        "s": conversation["state"],
+        "h": [
+            [entry.role, entry.content, entry.timestamp.timestamp()]
+            for entry in conversation["history"]
+        ],
+        "p": prompt_state
+    }, separators=(",", ":"))
+
+def _decode_v1(payload: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    data = json.loads(payload)
+    conversation = {
+        "current_template": data["t"],
+        "history": [
+            Conversation.model_construct(
+                role=role,
+                content=content,
+                timestamp=datetime.fromtimestamp(timestamp)
+            )
+            for role, content, timestamp in data["h"]
+        ],
+        "state": data["s"]
+    }
+    return conversation, data["p"]
+
+# One decoder per snapshot version ever written, so a new build can still
+# resume sessions saved by an older one
+_DECODERS = {
+    1: _decode_v1
+}
+
+def decode_session(version: int, payload: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Decode a session payload into (conversation, prompt state)"""
+    decoder = _DECODERS.get(version)
+    if decoder is None:
+        raise ValueError(f"Unsupported session snapshot version: {version}")
+    return decoder(payload)
+
+def save_snapshot(path: str,
+                  conversations: Dict[str, Dict[str, Any]],
+                  conversation_state: Dict[str, Dict[str, Any]],
+                  restored_sessions: Dict[str, SessionRecord]) -> int:
+    """Write every session to a snapshot file and return how many were saved.
+
+    Restored sessions that were never resumed are written back as they were
+    read, without decoding them.
+    """
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.time()
+        }) + "\n")
+        for conversation_id, conversation in conversations.items():
+            payload = encode_session(conversation, conversation_state.get(conversation_id, {}))
+            f.write(f"{SNAPSHOT_VERSION}\t{json.dumps(conversation_id)}\t{payload}\n")
+            count += 1
+        for conversation_id, (version, payload) in restored_sessions.items():
+            if conversation_id in conversations:
+                continue
+            f.write(f"{version}\t{json.dumps(conversation_id)}\t{payload}\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def load_snapshot(path: str) -> Dict[str, SessionRecord]:
+    """Read a snapshot file into undecoded session records keyed by conversation id.
+
+    Only the conversation ids are parsed here, which keeps restoring even
+    very large snapshots to a single pass over the file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not a session snapshot")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Session snapshot version {header['version']} is newer than supported "
+                f"version {SNAPSHOT_VERSION}"
+            )
+
+        sessions: Dict[str, SessionRecord] = {}
+        for line in f:
+            version, conversation_id, payload = line.rstrip("\n").split("\t", 2)
+            sessions[json.loads(conversation_id)] = (int(version), payload)
+    return sessions
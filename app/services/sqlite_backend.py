@@ -0,0 +1,355 @@
+from typing import List, Dict, Optional
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from app.models.faq import FAQ, FAQCategory, FAQResponse
+from app.models.knowledge_base import OutletInfo, PhoneContact
+from app.services.knowledge_processor import KnowledgeProcessor
+from app.services.faq_processor import FAQProcessor, faq_terms
+
+SCHEMA_VERSION = 1
+
+# Keywords are stored in one FTS column; the separator never appears in a
+# query, so a match cannot straddle two keywords
+KEYWORD_SEPARATOR = "\x1f"
+
+class ReadOnlyBackendError(Exception):
+    """Raised on writes to the SQLite knowledge backend, which is rebuilt by ingestion only"""
+
+    def __init__(self, operation: str):
+        super().__init__(
+            f"Cannot {operation}: the SQLite knowledge backend is read-only; "
+            "re-run ingestion with scripts/process_knowledge_base.py --type sqlite"
+        )
+        self.operation = operation
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE locations (
+    city TEXT NOT NULL,
+    location TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (city, location)
+);
+CREATE TABLE outlets (
+    city TEXT NOT NULL,
+    location TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (city, location)
+);
+CREATE TABLE phone_contacts (
+    city TEXT NOT NULL,
+    location TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (city, location)
+);
+CREATE TABLE menu_items (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX idx_menu_items_category ON menu_items (category, id);
+CREATE VIRTUAL TABLE menu_items_fts USING fts5(
+    name, content='menu_items', content_rowid='id', tokenize='trigram'
+);
+CREATE TABLE faqs (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    category TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    related_questions TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX idx_faqs_category ON faqs (category, rowid);
+CREATE VIRTUAL TABLE faqs_fts USING fts5(
+    question, answer, keywords, content='faqs', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TABLE time_slots (
+    location TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    slot TEXT NOT NULL,
+    PRIMARY KEY (location, position)
+);
+CREATE INDEX idx_time_slots_slot ON time_slots (location, slot);
+"""
+
+def write_knowledge_database(db_path: str,
+                             knowledge_processor: KnowledgeProcessor,
+                             faq_processor: FAQProcessor,
+                             version: str) -> None:
+    """Write the in-memory knowledge data into a new SQLite database.
+
+    The database is built in a temporary file and moved into place, so
+    readers never see a half-written file.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("schema_version", str(SCHEMA_VERSION)),
+            ("data_version", version)
+        ])
+
+        for city in knowledge_processor.get_available_cities():
+            locations = knowledge_processor.get_locations_in_city(city)
+            conn.executemany(
+                "INSERT INTO locations (city, location, position) VALUES (?, ?, ?)",
+                [(city, location, position) for position, location in enumerate(locations)]
+            )
+            conn.executemany(
+                "INSERT INTO time_slots (location, position, slot) VALUES (?, ?, ?)",
+                [
+                    (location, position, slot)
+                    for location in locations
+                    for position, slot in enumerate(knowledge_processor.get_available_time_slots(location))
+                ]
+            )
+
+        conn.executemany(
+            "INSERT INTO outlets (city, location, data) VALUES (?, ?, ?)",
+            [
+                (city, location, outlet.model_dump_json())
+                for city, outlets in knowledge_processor.outlet_models().items()
+                for location, outlet in outlets.items()
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO phone_contacts (city, location, data) VALUES (?, ?, ?)",
+            [
+                (city, location, contact.model_dump_json())
+                for city, contacts in knowledge_processor.phone_contact_models().items()
+                for location, contact in contacts.items()
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO menu_items (category, name) VALUES (?, ?)",
+            [
+                (category, name)
+                for category, names in knowledge_processor.knowledge_base.menu_items.items()
+                for name in names
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO faqs (id, question, answer, category, keywords, related_questions, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    faq.id,
+                    faq.question,
+                    faq.answer,
+                    faq.category.value,
+                    KEYWORD_SEPARATOR.join(faq.keywords),
+                    json.dumps(faq.related_questions),
+                    json.dumps(faq.metadata)
+                )
+                for faq in faq_processor.faqs
+            ]
+        )
+        conn.execute("INSERT INTO menu_items_fts (menu_items_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO faqs_fts (faqs_fts) VALUES ('rebuild')")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+
+class SQLiteConnectionPool:
+    """Read-only SQLite connections, one per thread"""
+
+    def __init__(self, db_path: str):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(
+                f"Knowledge database {db_path} not found. Please run processing first."
+            )
+        self.db_path = db_path
+        self.uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "connection", None)
+        # A connection inherited across fork() must never be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.connection = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return self.connection().execute(sql, params).fetchall()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        rows = self.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+def _substring_match(pool: SQLiteConnectionPool, table: str, fts_table: str,
+                     columns: List[str], query: str, extra_where: str = "",
+                     extra_params: tuple = ()) -> List[sqlite3.Row]:
+    """Case-insensitive substring search over the given columns.
+
+    The trigram tokenizer answers substring queries of three or more
+    characters from the index; shorter queries fall back to a LIKE scan.
+    """
+    if len(query) >= 3:
+        phrase = '"' + query.replace('"', '""') + '"'
+        sql = (
+            f"SELECT t.* FROM {fts_table} f JOIN {table} t ON t.rowid = f.rowid "
+            f"WHERE {fts_table} MATCH ? {extra_where} ORDER BY t.rowid"
+        )
+        return pool.execute(sql, (phrase,) + extra_params)
+
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    like = " OR ".join(f"t.{column} LIKE ? ESCAPE '\\'" for column in columns)
+    sql = f"SELECT t.* FROM {table} t WHERE ({like}) {extra_where} ORDER BY t.rowid"
+    return pool.execute(sql, (pattern,) * len(columns) + extra_params)
+
+class SQLiteKnowledgeProcessor(KnowledgeProcessor):
+    """KnowledgeProcessor that answers lookups from the SQLite database"""
+
+    def __init__(self, pool: SQLiteConnectionPool):
+        super().__init__()
+        self.pool = pool
+        self.data_version = pool.get_meta("data_version")
+
+    def load_processed_data(self) -> None:
+        """Data lives in the database; nothing to load"""
+
+    def get_available_cities(self) -> List[str]:
+        rows = self.pool.execute(
+            "SELECT city FROM locations GROUP BY city ORDER BY MIN(rowid)"
+        )
+        return [row["city"] for row in rows]
+
+    def get_locations_in_city(self, city: str) -> List[str]:
+        rows = self.pool.execute(
+            "SELECT location FROM locations WHERE city = ? ORDER BY position", (city,)
+        )
+        return [row["location"] for row in rows]
+
+    def get_outlet(self, city: str, location: str) -> Optional[OutletInfo]:
+        rows = self.pool.execute(
+            "SELECT data FROM outlets WHERE city = ? AND location = ?", (city, location)
+        )
+        return OutletInfo.model_validate_json(rows[0]["data"]) if rows else None
+
+    def get_phone_contact(self, city: str, location: str) -> Optional[PhoneContact]:
+        rows = self.pool.execute(
+            "SELECT data FROM phone_contacts WHERE city = ? AND location = ?", (city, location)
+        )
+        return PhoneContact.model_validate_json(rows[0]["data"]) if rows else None
+
+    def get_menu_items_in_category(self, category: str) -> List[str]:
+        rows = self.pool.execute(
+            "SELECT name FROM menu_items WHERE category = ? ORDER BY id", (category,)
+        )
+        return [row["name"] for row in rows]
+
+    def get_available_time_slots(self, location: str) -> List[str]:
+        rows = self.pool.execute(
+            "SELECT slot FROM time_slots WHERE location = ? ORDER BY position", (location,)
+        )
+        return [row["slot"] for row in rows]
+
+    def verify_time_slot(self, location: str, requested_time: str) -> bool:
+        rows = self.pool.execute(
+            "SELECT 1 FROM time_slots WHERE location = ? AND slot = ? LIMIT 1",
+            (location, requested_time)
+        )
+        return bool(rows)
+
+    def search_menu_items(self, query: str) -> List[Dict]:
+        rows = _substring_match(self.pool, "menu_items", "menu_items_fts", ["name"], query)
+        return [{"category": row["category"], "name": row["name"]} for row in rows]
+
+class SQLiteFAQProcessor(FAQProcessor):
+    """FAQProcessor that searches FAQs through the SQLite FTS5 index"""
+
+    def __init__(self, pool: SQLiteConnectionPool):
+        # The hard-coded FAQ list is deliberately not built here
+        self.pool = pool
+
+    @property
+    def faqs(self) -> List[FAQ]:
+        return [self._to_faq(row) for row in self.pool.execute("SELECT * FROM faqs ORDER BY rowid")]
+
+    @staticmethod
+    def _to_faq(row: sqlite3.Row) -> FAQ:
+        return FAQ.model_construct(
+            id=row["id"],
+            question=row["question"],
+            answer=row["answer"],
+            category=FAQCategory(row["category"]),
+            keywords=row["keywords"].split(KEYWORD_SEPARATOR) if row["keywords"] else [],
+            related_questions=json.loads(row["related_questions"]),
+            metadata=json.loads(row["metadata"])
+        )
+
+    @staticmethod
+    def _to_response(row: sqlite3.Row) -> FAQResponse:
+        return FAQResponse.model_construct(
+            question=row["question"],
+            answer=row["answer"],
+            category=FAQCategory(row["category"]),
+            related_questions=json.loads(row["related_questions"])
+        )
+
+    def get_faq_by_id(self, faq_id: str) -> Optional[FAQ]:
+        rows = self.pool.execute("SELECT * FROM faqs WHERE id = ?", (faq_id,))
+        return self._to_faq(rows[0]) if rows else None
+
+    def search_faqs(self, query: str, category: Optional[FAQCategory] = None) -> List[FAQResponse]:
+        extra_where, extra_params = "", ()
+        if category:
+            extra_where, extra_params = "AND t.category = ?", (category.value,)
+        rows = _substring_match(
+            self.pool, "faqs", "faqs_fts", ["question", "answer", "keywords"],
+            query, extra_where, extra_params
+        )
+        return [self._to_response(row) for row in rows]
+
+    def match_question(self, query: str) -> List[FAQResponse]:
+        words = faq_terms(query)
+        if not words:
+            return []
+        # Only FAQs whose question or keywords contain one of the words can
+        # match; terms are lowercase runs of word characters, so quoting is safe
+        match = "{question keywords} : (" + " OR ".join(f'"{word}"' for word in sorted(words)) + ")"
+        rows = self.pool.execute(
+            "SELECT t.* FROM faqs_fts f JOIN faqs t ON t.rowid = f.rowid "
+            "WHERE faqs_fts MATCH ? ORDER BY t.rowid",
+            (match,)
+        )
+        candidates = [
+            (row, faq_terms(row["question"]) | faq_terms(row["keywords"].replace(KEYWORD_SEPARATOR, " ")))
+            for row in rows
+        ]
+        return [self._to_response(row) for row in self._rank_matches(words, candidates)]
+
+    def get_faqs_by_category(self, category: FAQCategory) -> List[FAQResponse]:
+        rows = self.pool.execute(
+            "SELECT * FROM faqs WHERE category = ? ORDER BY rowid", (category.value,)
+        )
+        return [self._to_response(row) for row in rows]
+
+    def add_faq(self, faq: FAQ) -> None:
+        raise ReadOnlyBackendError("add FAQ")
+
+    def update_faq(self, faq_id: str, updated_faq: FAQ) -> bool:
+        raise ReadOnlyBackendError("update FAQ")
+
+    def delete_faq(self, faq_id: str) -> bool:
+        raise ReadOnlyBackendError("delete FAQ")
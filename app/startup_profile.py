@@ -0,0 +1,92 @@
+"""
+Startup timing for BBQ Nation Chatbot
+"""
+
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+import asyncio
+import re
+import subprocess
+import sys
+import time
+
+# (step name, seconds) for every service initialization step in this process
+_startup_timings: List[Tuple[str, float]] = []
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+@contextmanager
+def startup_step(name: str):
+    """Record how long a service initialization step takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _startup_timings.append((name, time.perf_counter() - start))
+
+def get_startup_timings() -> List[Tuple[str, float]]:
+    """Get the initialization steps recorded so far in this process"""
+    return list(_startup_timings)
+
+def profile_imports(module: str = "app.main") -> List[Dict]:
+    """Import a module in a fresh interpreter and collect per-module import times.
+
+    Uses the interpreter's own -X importtime report, so the numbers are not
+    skewed by modules this process has already imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "module": name,
+                "depth": len(indent) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000
+            })
+    return entries
+
+def profile_initialization() -> List[Tuple[str, float]]:
+    """Run the app's lifespan startup and return the timed steps"""
+    from app.main import app
+
+    async def start_and_stop():
+        async with app.router.lifespan_context(app):
+            pass
+
+    with startup_step("lifespan total"):
+        asyncio.run(start_and_stop())
+    return get_startup_timings()
+
+def report_startup_profile(module: str = "app.main", top: int = 15) -> None:
+    """Print import and initialization times so cold-start regressions are visible"""
+    entries = profile_imports(module)
+    # importtime lists each module after its imports, so the module's own
+    # subtree is everything since the previous top-level entry
+    end = next(i for i, e in enumerate(entries) if e["module"] == module and e["depth"] == 0)
+    start = max((i + 1 for i, e in enumerate(entries[:end]) if e["depth"] == 0), default=0)
+    entries = entries[start:end + 1]
+    total_ms = entries[-1]["cumulative_ms"]
+
+    print(f"Import of {module}: {total_ms:.1f} ms")
+    print("\nApplication modules (cumulative, self):")
+    for entry in entries:
+        if entry["module"].split(".")[0] == "app":
+            print(f"  {entry['module']:<40} {entry['cumulative_ms']:>8.1f} ms {entry['self_ms']:>8.1f} ms")
+
+    print("\nSlowest top-level packages:")
+    top_level = sorted(
+        (e for e in entries if "." not in e["module"] and e["module"] != "app"),
+        key=lambda e: e["cumulative_ms"], reverse=True
+    )
+    for entry in top_level[:top]:
+        print(f"  {entry['module']:<40} {entry['cumulative_ms']:>8.1f} ms")
+
+    print("\nService initialization:")
+    for name, seconds in profile_initialization():
+        print(f"  {name:<40} {seconds * 1000:>8.1f} ms")
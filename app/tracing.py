@@ -0,0 +1,160 @@
+"""
+Trace spans for the chat pipeline, exported as JSON lines.
+
+Spans nest through a context variable, and a child span inherits its
+parent's conversation id and template state unless it sets its own.
+Finished spans go onto a bounded in-memory queue, and a background thread
+writes them to disk in batches. When the queue is full, spans are dropped
+and counted, so the request path never waits on I/O.
+
+Tracing is enabled by setting FORMI_TRACE_PATH. When it is off, span()
+returns a shared no-op span, so instrumented code pays one function call.
+"""
+
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import json
+import queue
+import random
+import threading
+import time
+from app import config
+
+# Attributes a child span copies from its parent
+INHERITED_ATTRIBUTES = ("conversation_id", "template")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_time", "_start", "_token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+            self.parent_id = None
+            self.attributes = attributes
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.attributes = {
+                key: parent.attributes[key]
+                for key in INHERITED_ATTRIBUTES if key in parent.attributes
+            }
+            self.attributes.update(attributes)
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        _exporter().export({
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": duration * 1000,
+            "attributes": self.attributes
+        })
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class JSONLinesExporter:
+    """Buffers finished spans and writes them from a background thread"""
+
+    def __init__(self, path: str, max_queue: int = 10000, batch_size: int = 512,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.exported = 0
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Dict) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        # Unbuffered append: each batch is one write, so workers sharing the
+        # file never interleave partial lines
+        with open(self.path, "ab", buffering=0) as f:
+            while True:
+                batch: List[Dict] = []
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                    while item is not None:
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            break
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = ...
+                if batch:
+                    f.write("".join(json.dumps(span, default=str) + "\n" for span in batch).encode("utf-8"))
+                    self.exported += len(batch)
+                if item is None:
+                    return
+
+    def close(self) -> None:
+        """Write out everything queued so far and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+_exporter_instance: Optional[JSONLinesExporter] = None
+_exporter_lock = threading.Lock()
+
+def _exporter() -> JSONLinesExporter:
+    global _exporter_instance
+    if _exporter_instance is None:
+        with _exporter_lock:
+            if _exporter_instance is None:
+                _exporter_instance = JSONLinesExporter(config.TRACE_PATH, config.TRACE_QUEUE_SIZE)
+    return _exporter_instance
+
+def span(name: str, **attributes: Any):
+    """Start a span; use as a context manager"""
+    if config.TRACE_PATH is None:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+def current_span():
+    """The innermost open span, or the no-op span"""
+    return _current_span.get() or _NOOP_SPAN
+
+def shutdown() -> None:
+    """Flush and stop the exporter, if tracing was used"""
+    global _exporter_instance
+    with _exporter_lock:
+        if _exporter_instance is not None:
+            _exporter_instance.close()
+            _exporter_instance = None
@@ -0,0 +1,59 @@
+"""
+Startup warm-up for BBQ Nation Chatbot.
+
+Everything that is built lazily is built here, before the worker reports
+ready, so the first real requests do not pay for it: the prompt templates,
+every knowledge lookup path, response serialization, and each state
+handler through scripted conversations on a scratch ChatHandler.
+Warm-up conversations share the knowledge store, but not the session
+state of the handler that serves traffic, and their turns are neither
+logged nor recorded in the chat metrics.
+"""
+
+from typing import List
+from app import serialization
+from app.startup_profile import startup_step
+from app.services.chat_handler import ChatHandler, UserMessage
+from app.services.knowledge_store import KnowledgeStore
+
+def _warmup_conversations(city: str, location: str, time_slot: str) -> List[List[str]]:
+    opening = ["Hi", city, location]
+    return [
+        opening + ["I want to book a table", "4", time_slot, "yes, confirm"],
+        opening + ["Can I see the menu?", "veg starters", "Tell me about the paneer", "No spice please", "yes"]
+    ]
+
+def warm_up(knowledge_store: KnowledgeStore) -> None:
+    """Build templates and indexes and run every chat state once"""
+    knowledge_processor = knowledge_store.knowledge_processor
+
+    with startup_step("Warm-up: knowledge lookups"):
+        cities = knowledge_processor.get_available_cities()
+        for city in cities:
+            for location in knowledge_processor.get_locations_in_city(city):
+                knowledge_processor.get_outlet(city, location)
+                knowledge_processor.get_phone_contact(city, location)
+                knowledge_processor.get_available_time_slots(location)
+        for category in knowledge_processor.menu_categories:
+            knowledge_processor.get_menu_items_in_category(category)
+        knowledge_processor.search_menu_items("paneer")
+        knowledge_store.faq_processor.search_faqs("food")
+        knowledge_store.faq_processor.match_question("Do you have parking facilities?")
+        knowledge_store.menu_processor.process_raw_menu()
+
+    with startup_step("Warm-up: chat states"):
+        chat_handler = ChatHandler(knowledge_store, log_conversations=False, record_metrics=False)
+        chat_handler.prompt_handler.templates
+        city = cities[0] if cities else ""
+        locations = knowledge_processor.get_locations_in_city(city)
+        location = locations[0] if locations else ""
+        time_slots = knowledge_processor.get_available_time_slots(location)
+        time_slot = time_slots[0] if time_slots else "7:30 PM"
+        for messages in _warmup_conversations(city, location, time_slot):
+            conversation_id = None
+            for message in messages:
+                response = chat_handler.handle_message(
+                    UserMessage(message=message, conversation_id=conversation_id)
+                )
+                conversation_id = response.conversation_id
+                serialization.CHAT_RESPONSE.dump_json(response)
@@ -0,0 +1,116 @@
+"""
+WebSocket chat sessions for BBQ Nation Chatbot.
+
+A socket is bound to one conversation for its lifetime: the first message
+starts a new conversation (or resumes the one named by ?conversation_id=),
+and every later message continues it without the client resending the id.
+Clients send either plain text or {"message": "..."}; every turn is
+answered with a ChatResponse JSON text frame.
+
+Each connection is a single coroutine with no extra tasks or buffers, so
+an idle socket costs little more than its parked receive. Backpressure is
+per turn: the next message is not read until the previous response has
+been sent. A client that stops reading is disconnected after
+FORMI_WS_SEND_TIMEOUT seconds.
+
+Turns go through admission control like /chat and run on its worker
+threads. A turn that is not admitted is answered with an
+{"error": ..., "retry_after": seconds} frame, and the socket stays open.
+Sockets refused at connect time are accepted first and then closed, so
+the client sees the close code rather than an HTTP 403.
+"""
+
+import asyncio
+import json
+from fastapi import HTTPException, WebSocket
+from app import config, metrics, serialization, tracing
+from app.admission import ADMISSION, client_id, is_priority
+from app.services.chat_handler import ChatHandler, UserMessage
+
+# Close codes: 1008 policy violation, 1013 try again later, 4404 unknown conversation
+CLOSE_TRY_AGAIN = 1013
+CLOSE_UNKNOWN_CONVERSATION = 4404
+
+_open_connections = 0
+
+def open_connections() -> int:
+    return _open_connections
+
+metrics.WEBSOCKET_CONNECTIONS.set_function(open_connections)
+
+def _parse_message(text: str) -> str:
+    """Message text from a plain-text or {"message": ...} frame"""
+    if text.startswith("{"):
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            return text
+        if isinstance(payload, dict) and isinstance(payload.get("message"), str):
+            return payload["message"]
+    return text
+
+async def _send(websocket: WebSocket, text: str) -> bool:
+    """Send a frame, giving up on clients that stop reading"""
+    try:
+        await asyncio.wait_for(websocket.send_text(text), config.WS_SEND_TIMEOUT)
+        return True
+    except asyncio.TimeoutError:
+        await websocket.close(code=CLOSE_TRY_AGAIN, reason="Client is not reading responses")
+        return False
+
+async def serve_chat_socket(websocket: WebSocket, chat_handler: ChatHandler) -> None:
+    global _open_connections
+
+    # Closing before accept() would reach the client as an HTTP 403 instead of the close code
+    await websocket.accept()
+    if _open_connections >= config.WS_MAX_CONNECTIONS:
+        await websocket.close(code=CLOSE_TRY_AGAIN, reason="Too many connections")
+        return
+
+    conversation_id = websocket.query_params.get("conversation_id")
+    if conversation_id and not chat_handler.has_conversation(conversation_id):
+        await websocket.close(code=CLOSE_UNKNOWN_CONVERSATION, reason="Unknown conversation")
+        return
+
+    client = client_id(websocket)
+    _open_connections += 1
+    try:
+        while True:
+            receive = websocket.receive()
+            if config.WS_IDLE_TIMEOUT:
+                try:
+                    frame = await asyncio.wait_for(receive, config.WS_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await websocket.close(reason="Idle timeout")
+                    return
+            else:
+                frame = await receive
+            if frame["type"] == "websocket.disconnect":
+                return
+
+            text = frame.get("text")
+            if text is None:
+                text = (frame.get("bytes") or b"").decode("utf-8", errors="replace")
+            if len(text) > config.WS_MAX_MESSAGE_CHARS:
+                if not await _send(websocket, json.dumps({"error": "Message too long"})):
+                    return
+                continue
+
+            with tracing.span("WS /ws/chat", conversation_id=conversation_id) as span:
+                message = UserMessage.model_construct(message=_parse_message(text), conversation_id=conversation_id)
+                try:
+                    response = await ADMISSION.run(
+                        client, is_priority(chat_handler, message), chat_handler.handle_message, message
+                    )
+                except HTTPException as e:
+                    payload = json.dumps({"error": e.detail, "retry_after": int(e.headers["Retry-After"])})
+                except Exception as e:
+                    payload = json.dumps({"error": str(e)})
+                else:
+                    conversation_id = response.conversation_id
+                    span.set("conversation_id", conversation_id)
+                    payload = serialization.CHAT_RESPONSE.dump_json(response).decode("utf-8")
+            if not await _send(websocket, payload):
+                return
+    finally:
+        _open_connections -= 1
@@ -0,0 +1,267 @@
+"""
+Load test for multi-turn /chat flows.
+
+Synthetic users walk through complete conversations (city, location, intent,
+reservation, time slot, confirmation) and the read endpoints a client would
+call along the way. Flows are drawn from a Zipfian mix, so the most common
+flow dominates the way it does in real traffic.
+
+In-process over ASGI:
+    python benchmarks/chat_load.py --users 200 --concurrency 20
+
+Over real HTTP against a server started with run.py:
+    python benchmarks/chat_load.py --url http://localhost:8000
+    python benchmarks/chat_load.py --spawn-server
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from benchmarks.stats import (
+    summarize_latencies, environment_info, save_results, load_results, print_latency_table
+)
+
+# A step is either a chat turn, sent while the conversation is in the named
+# template state, or a GET of a read endpoint: (kind, label, payload)
+Step = Tuple[str, str, str]
+
+def _chat(state: str, message: str) -> Step:
+    return ("chat", state, message)
+
+def _get(route: str, path: str) -> Step:
+    return ("get", route, path)
+
+_OPENING = [
+    _chat("initial", "Hi"),
+    _get("/cities", "/cities"),
+    _chat("city_collection", "Bangalore"),
+    _get("/locations/{city}", "/locations/Bangalore"),
+    _chat("location_collection", "Indiranagar"),
+]
+
+# Ordered from most to least common; the Zipfian weights follow this order
+FLOWS: Dict[str, List[Step]] = {
+    "reservation": _OPENING + [
+        _chat("intent_identification", "I want to book a table"),
+        _chat("reservation", "4"),
+        _get("/time-slots/{city}/{location}", "/time-slots/Bangalore/Indiranagar"),
+        _chat("time_slot_verification", "7:30 PM"),
+        _chat("confirmation", "yes, confirm"),
+    ],
+    "menu": _OPENING + [
+        _get("/menu/categories", "/menu/categories"),
+        _chat("intent_identification", "Can I see the menu?"),
+        _chat("menu_browsing", "veg starters"),
+        _chat("clarification", "Tell me about the paneer"),
+        _chat("modification", "No spice please"),
+        _chat("confirmation", "yes"),
+    ],
+    "abandoned_after_city": _OPENING[:3],
+    "reservation_with_changes": _OPENING + [
+        _chat("intent_identification", "what can you do?"),
+        _chat("intent_identification", "book a table"),
+        _chat("reservation", "a few of us"),
+        _chat("reservation", "6"),
+        _chat("time_slot_verification", "8:00 PM"),
+        _chat("confirmation", "no"),
+        _chat("modification", "Make it 9:00 PM"),
+        _chat("confirmation", "confirm"),
+    ],
+    "outlet_lookup": _OPENING[:2] + [
+        _get("/outlet/{city}/{location}", "/outlet/Bangalore/Indiranagar"),
+        _get("/contact/{city}/{location}", "/contact/Bangalore/Indiranagar"),
+    ],
+}
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+class LoadResults:
+    def __init__(self):
+        self.endpoint_latencies: Dict[str, List[float]] = defaultdict(list)
+        self.state_latencies: Dict[str, List[float]] = defaultdict(list)
+        self.endpoint_errors: Dict[str, int] = defaultdict(int)
+        self.state_errors: Dict[str, int] = defaultdict(int)
+        self.flows: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, state: Optional[str], seconds: float, ok: bool) -> None:
+        self.endpoint_latencies[endpoint].append(seconds)
+        if not ok:
+            self.endpoint_errors[endpoint] += 1
+        if state:
+            self.state_latencies[state].append(seconds)
+            if not ok:
+                self.state_errors[state] += 1
+
+async def run_user(client: httpx.AsyncClient, flow_name: str, results: LoadResults,
+                   think_time: float) -> None:
+    """Walk one synthetic user through a flow"""
+    results.flows[flow_name] += 1
+    conversation_id = None
+    for kind, label, payload in FLOWS[flow_name]:
+        start = time.perf_counter()
+        try:
+            if kind == "chat":
+                endpoint = "POST /chat"
+                response = await client.post(
+                    "/chat", json={"message": payload, "conversation_id": conversation_id}
+                )
+                ok = response.status_code == 200
+                if ok:
+                    conversation_id = response.json()["conversation_id"]
+            else:
+                endpoint = f"GET {label}"
+                response = await client.get(payload)
+                # 404 is a valid answer for outlets with no processed data
+                ok = response.status_code in (200, 404)
+        except httpx.HTTPError:
+            ok = False
+        results.record(endpoint, label if kind == "chat" else None, time.perf_counter() - start, ok)
+        if kind == "chat" and not ok:
+            return
+        if think_time:
+            await asyncio.sleep(random.expovariate(1 / think_time))
+
+async def run_load(client: httpx.AsyncClient, users: int, concurrency: int,
+                   zipf_exponent: float, think_time: float, seed: int) -> Tuple[LoadResults, float]:
+    rng = random.Random(seed)
+    flow_names = list(FLOWS)
+    weights = zipf_weights(len(flow_names), zipf_exponent)
+    assignments = rng.choices(flow_names, weights=weights, k=users)
+
+    results = LoadResults()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(flow_name: str):
+        async with semaphore:
+            await run_user(client, flow_name, results, think_time)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(flow_name) for flow_name in assignments))
+    return results, time.perf_counter() - start
+
+async def run_in_process(args) -> Tuple[LoadResults, float]:
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_load(
+                client, args.users, args.concurrency, args.zipf, args.think_time, args.seed
+            )
+
+async def run_over_http(args, url: str) -> Tuple[LoadResults, float]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        return await run_load(
+            client, args.users, args.concurrency, args.zipf, args.think_time, args.seed
+        )
+
+def spawn_server(port: int, extra_args: List[str]) -> subprocess.Popen:
+    """Start run.py and wait until it answers"""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(project_root, "run.py"), "--host", "127.0.0.1",
+         "--port", str(port)] + extra_args,
+        cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/cities", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("run.py did not start within 30 seconds")
+
+def build_report(args, mode: str, results: LoadResults, elapsed: float) -> Dict:
+    total = sum(len(v) for v in results.endpoint_latencies.values())
+    return {
+        "benchmark": "chat_load",
+        "mode": mode,
+        "config": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "zipf_exponent": args.zipf,
+            "think_time": args.think_time,
+            "seed": args.seed
+        },
+        "environment": environment_info(),
+        "elapsed_s": elapsed,
+        "requests": total,
+        "errors": sum(results.endpoint_errors.values()),
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "flows": dict(results.flows),
+        "endpoints": {
+            name: summarize_latencies(values, results.endpoint_errors[name])
+            for name, values in results.endpoint_latencies.items()
+        },
+        "states": {
+            name: summarize_latencies(values, results.state_errors[name])
+            for name, values in results.state_latencies.items()
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test multi-turn /chat flows')
+    parser.add_argument('--users', type=int, default=200, help='Number of synthetic users (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=20,
+                        help='Users in flight at once (default: 20)')
+    parser.add_argument('--zipf', type=float, default=1.2,
+                        help='Zipf exponent for the flow mix; 0 makes it uniform (default: 1.2)')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Mean pause between a user\'s turns in seconds (default: 0)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the flow mix')
+    parser.add_argument('--url', default=None, help='Benchmark a running server over HTTP')
+    parser.add_argument('--spawn-server', action='store_true',
+                        help='Start run.py on --port and benchmark it over HTTP')
+    parser.add_argument('--port', type=int, default=8765, help='Port for --spawn-server')
+    parser.add_argument('--server-args', default='',
+                        help='Extra run.py arguments for --spawn-server, e.g. "--workers 4"')
+    parser.add_argument('--output', default='bench_results/chat_load.json',
+                        help='Where to save the JSON results')
+    parser.add_argument('--baseline', default=None,
+                        help='Earlier results JSON to compare p95 latencies against')
+
+    args = parser.parse_args()
+
+    server = None
+    try:
+        if args.spawn_server:
+            server = spawn_server(args.port, args.server_args.split())
+            mode, run = "http", run_over_http(args, f"http://127.0.0.1:{args.port}")
+        elif args.url:
+            mode, run = "http", run_over_http(args, args.url)
+        else:
+            mode, run = "asgi", run_in_process(args)
+        results, elapsed = asyncio.run(run)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = build_report(args, mode, results, elapsed)
+    save_results(args.output, report)
+
+    baseline = load_results(args.baseline) if args.baseline else {}
+    print(f"{report['requests']} requests from {args.users} users in {elapsed:.2f}s "
+          f"({report['throughput_rps']:.1f} req/s, {report['errors']} errors) over {mode}")
+    print_latency_table("Per endpoint:", report["endpoints"], baseline.get("endpoints"))
+    print_latency_table("Per template state (POST /chat):", report["states"], baseline.get("states"))
+    print(f"\nResults saved to {args.output}")
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    exit(main())
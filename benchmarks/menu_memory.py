@@ -0,0 +1,100 @@
+"""
+Memory per menu item: pydantic MenuItem models against compact MenuItemRecords.
+
+A synthetic menu is encoded as JSON, as it would be after PDF processing,
+then loaded both ways. The memory still held once the parsed JSON has been
+dropped is measured with tracemalloc. Strings in the JSON are separate
+objects per item, so the records benefit from interning just as they would
+on real data.
+
+    python benchmarks/menu_memory.py --items 100000
+"""
+
+from typing import Callable, Dict, List
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.models.menu import MenuItem
+from app.models.records import MenuItemRecord
+from benchmarks.stats import environment_info, save_results
+from benchmarks.synthetic import generate_menu_categories
+
+def _pydantic_items(menu: Dict[str, Dict]) -> List[MenuItem]:
+    return [
+        MenuItem(category=category, **item)
+        for category, data in menu.items()
+        for item in data["items"]
+    ]
+
+def _record_items(menu: Dict[str, Dict]) -> List[MenuItemRecord]:
+    return [
+        MenuItemRecord.from_dict(category, item)
+        for category, data in menu.items()
+        for item in data["items"]
+    ]
+
+def measure_retained(menu_json: str, build: Callable[[Dict[str, Dict]], List]) -> Dict[str, float]:
+    """Bytes still allocated after building from freshly parsed JSON and dropping the JSON"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        menu = json.loads(menu_json)
+        items = build(menu)
+        elapsed = time.perf_counter() - start
+        del menu
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "items": len(items),
+        "build_s": elapsed,
+        "retained_bytes": retained,
+        "bytes_per_item": retained / len(items),
+        "peak_bytes": peak
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare memory per menu item for pydantic models and compact records')
+    parser.add_argument('--items', type=int, default=100000, help='Menu items to load (default: 100000)')
+    parser.add_argument('--output', default='bench_results/menu_memory.json', help='Where to save the JSON results')
+
+    args = parser.parse_args()
+
+    menu_json = json.dumps(
+        generate_menu_categories(args.items),
+        default=lambda value: value.model_dump()
+    )
+    results = {
+        "pydantic": measure_retained(menu_json, _pydantic_items),
+        "records": measure_retained(menu_json, _record_items)
+    }
+    factor = results["pydantic"]["bytes_per_item"] / results["records"]["bytes_per_item"]
+
+    print(f"{'representation':<16} {'items':>8} {'bytes/item':>12} {'retained MiB':>13} {'build s':>9}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['items']:>8} {result['bytes_per_item']:>12.0f} "
+              f"{result['retained_bytes'] / 2**20:>13.1f} {result['build_s']:>9.2f}")
+    print(f"\nRecords use {factor:.1f}x less memory per item")
+
+    save_results(args.output, {
+        "benchmark": "menu_memory",
+        "environment": environment_info(),
+        "items": args.items,
+        "results": results,
+        "reduction_factor": factor
+    })
+    print(f"Results saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
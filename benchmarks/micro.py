@@ -0,0 +1,300 @@
+"""
+Scaling micro-benchmarks for the knowledge, menu, FAQ and PDF parsing code.
+
+Each operation runs against synthetic data at several multiples of today's
+data size and records the median time per call and the peak memory it
+allocates. With --baseline, any operation that got slower than the
+threshold exits non-zero, so the suite can gate CI:
+
+    python benchmarks/micro.py --output bench_results/micro.json
+    python benchmarks/micro.py --baseline bench_results/micro.json --threshold 0.25
+"""
+
+from typing import Callable, Dict, List, Tuple
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.models.faq import FAQCategory
+from app.models.menu import SpiceLevel
+from app.services.faq_processor import FAQProcessor
+from app.services.knowledge_processor import KnowledgeProcessor
+from app.services.knowledge_store import KnowledgeStore
+from app.services.menu_processor import MenuProcessor
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.stats import environment_info, save_results, load_results
+from benchmarks.synthetic import (
+    BASE_FAQ_COUNT, BASE_MENU_ITEM_COUNT, generate_faqs, generate_menu_categories,
+    populate_knowledge_processor, generate_menu_text, generate_faq_text, generate_timeslot_text
+)
+
+# An operation builds its data for a scale once and returns the call to time
+Operation = Callable[[int], Callable[[], object]]
+
+def _faq_processor(scale: int) -> FAQProcessor:
+    processor = FAQProcessor()
+    processor.faqs = generate_faqs(BASE_FAQ_COUNT * scale)
+    return processor
+
+def _menu_processor(scale: int) -> MenuProcessor:
+    processor = MenuProcessor()
+    processor.menu_categories = generate_menu_categories(BASE_MENU_ITEM_COUNT * scale)
+    return processor
+
+def _knowledge_processor(scale: int) -> KnowledgeProcessor:
+    return populate_knowledge_processor(KnowledgeProcessor(), scale)
+
+class SQLiteFixtures:
+    """SQLite knowledge databases built from the same synthetic data, one per scale"""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="formi-bench-")
+        self.stores: Dict[int, KnowledgeStore] = {}
+
+    def store(self, scale: int) -> KnowledgeStore:
+        if scale not in self.stores:
+            memory_store = KnowledgeStore(_knowledge_processor(scale), MenuProcessor(), _faq_processor(scale))
+            db_path = os.path.join(self.directory, f"knowledge-{scale}.db")
+            memory_store.write_sqlite(db_path)
+            self.stores[scale] = KnowledgeStore.build(backend="sqlite", db_path=db_path)
+        return self.stores[scale]
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def _last_location(knowledge_processor: KnowledgeProcessor) -> Tuple[str, str]:
+    city = knowledge_processor.get_available_cities()[-1]
+    return city, knowledge_processor.get_locations_in_city(city)[-1]
+
+def build_operations(sqlite: SQLiteFixtures) -> Dict[str, Operation]:
+    def faq_search(scale):
+        processor = _faq_processor(scale)
+        return lambda: processor.search_faqs("parking")
+
+    def faq_search_category(scale):
+        processor = _faq_processor(scale)
+        return lambda: processor.search_faqs("parking", FAQCategory.FACILITIES)
+
+    def faq_match(scale):
+        processor = _faq_processor(scale)
+        return lambda: processor.match_question("Do you have parking facilities?")
+
+    def faq_by_id(scale):
+        processor = _faq_processor(scale)
+        faq_id = processor.faqs[-1].id
+        return lambda: processor.get_faq_by_id(faq_id)
+
+    def menu_by_category(scale):
+        processor = _menu_processor(scale)
+        return lambda: processor.get_menu_by_category("Category 1")
+
+    def menu_by_dietary(scale):
+        processor = _menu_processor(scale)
+        return lambda: processor.get_menu_by_dietary_preference(is_veg=True, gluten_free=True)
+
+    def menu_chef_specials(scale):
+        processor = _menu_processor(scale)
+        return processor.get_chef_specials
+
+    def menu_by_spice(scale):
+        processor = _menu_processor(scale)
+        return lambda: processor.get_items_by_spice_level(SpiceLevel.SPICY)
+
+    def knowledge_locations(scale):
+        processor = _knowledge_processor(scale)
+        city, _ = _last_location(processor)
+        return lambda: processor.get_locations_in_city(city)
+
+    def knowledge_outlet(scale):
+        processor = _knowledge_processor(scale)
+        city, location = _last_location(processor)
+        return lambda: processor.get_outlet(city, location)
+
+    def knowledge_menu_search(scale):
+        processor = _knowledge_processor(scale)
+        return lambda: processor.search_menu_items("paneer")
+
+    def knowledge_verify_slot(scale):
+        processor = _knowledge_processor(scale)
+        _, location = _last_location(processor)
+        return lambda: processor.verify_time_slot(location, "8:00 PM")
+
+    def sqlite_faq_search(scale):
+        processor = sqlite.store(scale).faq_processor
+        return lambda: processor.search_faqs("parking")
+
+    def sqlite_faq_match(scale):
+        processor = sqlite.store(scale).faq_processor
+        return lambda: processor.match_question("Do you have parking facilities?")
+
+    def sqlite_locations(scale):
+        processor = sqlite.store(scale).knowledge_processor
+        city, _ = _last_location(processor)
+        return lambda: processor.get_locations_in_city(city)
+
+    def sqlite_outlet(scale):
+        processor = sqlite.store(scale).knowledge_processor
+        city, location = _last_location(processor)
+        return lambda: processor.get_outlet(city, location)
+
+    def sqlite_menu_search(scale):
+        processor = sqlite.store(scale).knowledge_processor
+        return lambda: processor.search_menu_items("paneer")
+
+    def pdf_menu(scale):
+        processor = PDFProcessor(pdf_dir=os.path.join(sqlite.directory, "pdfs"))
+        text = generate_menu_text(BASE_MENU_ITEM_COUNT * scale)
+        return lambda: processor.parse_menu_text(text, {"categories": [], "items": []})
+
+    def pdf_faq(scale):
+        processor = PDFProcessor(pdf_dir=os.path.join(sqlite.directory, "pdfs"))
+        text = generate_faq_text(BASE_FAQ_COUNT * scale)
+        return lambda: processor.parse_faq_text(text, {"faqs": [], "categories": set()})
+
+    def pdf_timeslots(scale):
+        processor = PDFProcessor(pdf_dir=os.path.join(sqlite.directory, "pdfs"))
+        text = generate_timeslot_text(12 * scale)
+        return lambda: processor.parse_timeslot_text(text, {
+            "weekday": {"lunch": [], "dinner": []},
+            "weekend": {"lunch": [], "dinner": []},
+            "special_days": {}
+        })
+
+    return {
+        "faq.search_faqs": faq_search,
+        "faq.search_faqs[category]": faq_search_category,
+        "faq.match_question": faq_match,
+        "faq.get_faq_by_id": faq_by_id,
+        "menu.get_menu_by_category": menu_by_category,
+        "menu.get_menu_by_dietary_preference": menu_by_dietary,
+        "menu.get_chef_specials": menu_chef_specials,
+        "menu.get_items_by_spice_level": menu_by_spice,
+        "knowledge.get_locations_in_city": knowledge_locations,
+        "knowledge.get_outlet": knowledge_outlet,
+        "knowledge.search_menu_items": knowledge_menu_search,
+        "knowledge.verify_time_slot": knowledge_verify_slot,
+        "sqlite.faq.search_faqs": sqlite_faq_search,
+        "sqlite.faq.match_question": sqlite_faq_match,
+        "sqlite.knowledge.get_locations_in_city": sqlite_locations,
+        "sqlite.knowledge.get_outlet": sqlite_outlet,
+        "sqlite.knowledge.search_menu_items": sqlite_menu_search,
+        "pdf.parse_menu_text": pdf_menu,
+        "pdf.parse_faq_text": pdf_faq,
+        "pdf.parse_timeslot_text": pdf_timeslots,
+    }
+
+def measure(call: Callable[[], object], min_time: float, repeats: int) -> Dict[str, float]:
+    """Median seconds per call over several timed batches, plus peak traced memory"""
+    # Size batches so each one runs for roughly min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        timings.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_us": statistics.median(timings) * 1e6,
+        "min_us": min(timings) * 1e6,
+        "peak_kib": peak / 1024
+    }
+
+def find_regressions(results: Dict[str, Dict[str, Dict]], baseline: Dict[str, Dict[str, Dict]],
+                     threshold: float, min_delta_us: float) -> List[str]:
+    """Operations whose median time grew by more than the threshold"""
+    regressions = []
+    for name, sizes in results.items():
+        for size, current in sizes.items():
+            previous = baseline.get(name, {}).get(size)
+            if not previous:
+                continue
+            delta = current["median_us"] - previous["median_us"]
+            if delta > min_delta_us and delta > previous["median_us"] * threshold:
+                regressions.append(
+                    f"{name} @ {size}: {previous['median_us']:.1f}us -> {current['median_us']:.1f}us "
+                    f"(+{delta / previous['median_us'] * 100:.0f}%)"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling micro-benchmarks with synthetic data')
+    parser.add_argument('--sizes', default='1,10,100,1000',
+                        help='Comma-separated multiples of today\'s data size (default: 1,10,100,1000)')
+    parser.add_argument('--only', default=None,
+                        help='Only run operations whose name starts with this prefix, e.g. faq.')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='Minimum seconds per timed batch (default: 0.05)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed batches per operation (default: 5)')
+    parser.add_argument('--output', default='bench_results/micro.json', help='Where to save the JSON results')
+    parser.add_argument('--baseline', default=None, help='Earlier results JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed relative slowdown against the baseline (default: 0.25)')
+    parser.add_argument('--min-delta-us', type=float, default=2.0,
+                        help='Ignore slowdowns smaller than this many microseconds (default: 2)')
+
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    sqlite = SQLiteFixtures()
+    operations = build_operations(sqlite)
+    results: Dict[str, Dict[str, Dict]] = {}
+    try:
+        print(f"{'operation':<42} {'size':>6} {'median us':>12} {'peak KiB':>10}")
+        for name, operation in operations.items():
+            if args.only and not name.startswith(args.only):
+                continue
+            results[name] = {}
+            for size in sizes:
+                result = measure(operation(size), args.min_time, args.repeats)
+                results[name][f"{size}x"] = result
+                print(f"{name:<42} {size:>5}x {result['median_us']:>12.1f} {result['peak_kib']:>10.1f}")
+    finally:
+        sqlite.cleanup()
+
+    save_results(args.output, {
+        "benchmark": "micro",
+        "environment": environment_info(),
+        "sizes": sizes,
+        "results": results
+    })
+    print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(
+            results, load_results(args.baseline)["results"], args.threshold, args.min_delta_us
+        )
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,191 @@
+"""
+Replay recorded chat transcripts through ChatHandler.handle_message.
+
+Transcripts are JSONL, one turn per line, in conversation order:
+
+    {"conversation_id": "conv_1", "message": "Hi", "response": "Welcome ...",
+     "template": "initial", "next_template": "city_collection"}
+
+Conversations are replayed interleaved, with --concurrency sessions live at
+once, as fast as the handler allows. Every response and state transition is
+diffed against the recording, and throughput and per-state latency are
+reported. A non-zero exit means behaviour changed.
+
+    python benchmarks/replay_transcripts.py transcripts.jsonl --concurrency 500
+
+Transcripts can also be recorded from the synthetic load-test flows to serve
+as a golden file for later builds:
+
+    python benchmarks/replay_transcripts.py golden.jsonl --record-synthetic 1000
+"""
+
+from typing import Dict, Iterator, List, Optional
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict, defaultdict, deque
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.services.chat_handler import ChatHandler, UserMessage
+from app.services.knowledge_store import KnowledgeStore
+from benchmarks.stats import summarize_latencies, environment_info, save_results, print_latency_table
+
+def read_transcripts(path: str) -> "OrderedDict[str, List[Dict]]":
+    """Group transcript turns by conversation, keeping turn order"""
+    conversations: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                turn = json.loads(line)
+                conversations.setdefault(turn["conversation_id"], []).append(turn)
+    return conversations
+
+def interleave(conversations: "OrderedDict[str, List[Dict]]", concurrency: int) -> Iterator[tuple]:
+    """Yield (recorded id, turn) with up to `concurrency` conversations in progress"""
+    pending = deque(conversations.items())
+    active = deque()
+    while pending or active:
+        while pending and len(active) < concurrency:
+            conversation_id, turns = pending.popleft()
+            active.append((conversation_id, iter(turns)))
+        conversation_id, turns = active.popleft()
+        turn = next(turns, None)
+        if turn is None:
+            continue
+        yield conversation_id, turn
+        active.append((conversation_id, turns))
+
+def replay(chat_handler: ChatHandler, conversations: "OrderedDict[str, List[Dict]]",
+           concurrency: int, max_diffs: int) -> Dict:
+    # Recorded ids are remapped: each replayed conversation gets a fresh id
+    replay_ids: Dict[str, str] = {}
+    state_latencies: Dict[str, List[float]] = defaultdict(list)
+    diffs: List[Dict] = []
+    mismatched_turns = 0
+    turns = 0
+
+    start = time.perf_counter()
+    for recorded_id, turn in interleave(conversations, concurrency):
+        conversation_id = replay_ids.get(recorded_id)
+        template = (
+            chat_handler.conversations[conversation_id]["current_template"]
+            if conversation_id else "initial"
+        )
+
+        turn_start = time.perf_counter()
+        response = chat_handler.handle_message(
+            UserMessage(message=turn["message"], conversation_id=conversation_id)
+        )
+        state_latencies[template].append(time.perf_counter() - turn_start)
+
+        replay_ids[recorded_id] = response.conversation_id
+        next_template = chat_handler.conversations[response.conversation_id]["current_template"]
+        turns += 1
+
+        actual = {"response": response.response, "template": template, "next_template": next_template}
+        changed = {
+            field: {"recorded": turn.get(field), "replayed": value}
+            for field, value in actual.items()
+            if field in turn and turn[field] != value
+        }
+        if changed:
+            mismatched_turns += 1
+            if len(diffs) < max_diffs:
+                diffs.append({"conversation_id": recorded_id, "message": turn["message"], "changes": changed})
+    elapsed = time.perf_counter() - start
+
+    return {
+        "conversations": len(conversations),
+        "turns": turns,
+        "elapsed_s": elapsed,
+        "turns_per_second": turns / elapsed if elapsed else 0.0,
+        "mismatched_turns": mismatched_turns,
+        "diffs": diffs,
+        "states": {state: summarize_latencies(values) for state, values in state_latencies.items()}
+    }
+
+def record_synthetic(path: str, sessions: int, seed: int) -> int:
+    """Record transcripts of the load-test flows through a fresh ChatHandler"""
+    from benchmarks.chat_load import FLOWS, zipf_weights
+
+    chat_handler = ChatHandler(KnowledgeStore.build())
+    rng = random.Random(seed)
+    flow_names = list(FLOWS)
+    assignments = rng.choices(flow_names, weights=zipf_weights(len(flow_names), 1.2), k=sessions)
+
+    turns = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for flow_name in assignments:
+            conversation_id: Optional[str] = None
+            for kind, state, message in FLOWS[flow_name]:
+                if kind != "chat":
+                    continue
+                template = (
+                    chat_handler.conversations[conversation_id]["current_template"]
+                    if conversation_id else "initial"
+                )
+                response = chat_handler.handle_message(
+                    UserMessage(message=message, conversation_id=conversation_id)
+                )
+                conversation_id = response.conversation_id
+                f.write(json.dumps({
+                    "conversation_id": conversation_id,
+                    "message": message,
+                    "response": response.response,
+                    "template": template,
+                    "next_template": chat_handler.conversations[conversation_id]["current_template"]
+                }) + "\n")
+                turns += 1
+    return turns
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay chat transcripts for throughput and behaviour regressions')
+    parser.add_argument('transcripts', help='JSONL transcript file')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='Conversations in progress at once (default: 100)')
+    parser.add_argument('--max-diffs', type=int, default=20,
+                        help='Mismatches to keep and print in detail (default: 20)')
+    parser.add_argument('--output', default='bench_results/replay.json', help='Where to save the JSON results')
+    parser.add_argument('--record-synthetic', type=int, metavar='SESSIONS', default=None,
+                        help='Write transcripts of this many synthetic sessions instead of replaying')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for --record-synthetic')
+
+    args = parser.parse_args()
+
+    if args.record_synthetic:
+        turns = record_synthetic(args.transcripts, args.record_synthetic, args.seed)
+        print(f"Recorded {turns} turns from {args.record_synthetic} sessions to {args.transcripts}")
+        return 0
+
+    conversations = read_transcripts(args.transcripts)
+    chat_handler = ChatHandler(KnowledgeStore.build())
+    report = replay(chat_handler, conversations, args.concurrency, args.max_diffs)
+    report.update({
+        "benchmark": "replay",
+        "transcripts": args.transcripts,
+        "concurrency": args.concurrency,
+        "environment": environment_info()
+    })
+    save_results(args.output, report)
+
+    print(f"Replayed {report['turns']} turns from {report['conversations']} conversations "
+          f"in {report['elapsed_s']:.2f}s ({report['turns_per_second']:.0f} turns/s)")
+    print_latency_table("Per template state:", report["states"])
+    if report["mismatched_turns"]:
+        print(f"\n{report['mismatched_turns']} turn(s) differ from the recording:")
+        for diff in report["diffs"]:
+            print(f"  [{diff['conversation_id']}] {diff['message']!r}")
+            for field, change in diff["changes"].items():
+                print(f"    {field}: {change['recorded']!r} -> {change['replayed']!r}")
+    else:
+        print("\nAll responses and state transitions match the recording")
+    print(f"\nResults saved to {args.output}")
+    return 1 if report["mismatched_turns"] else 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,165 @@
+"""
+Response serialization benchmark: FastAPI's default path against fast_response.
+
+For each endpoint, the payload it returns is built from synthetic data at
+several multiples of today's size and encoded two ways:
+
+    default  validate against the response model, jsonable_encoder, json.dumps
+    fast     the precompiled TypeAdapter in app.serialization, via pydantic-core
+
+With --endpoints, every endpoint is also called through the ASGI app with
+FORMI_FAST_RESPONSES on and off, to show the gain per whole request.
+
+    python benchmarks/serialization.py --sizes 1,100,1000 --endpoints
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+from app import config, serialization
+from app.models.knowledge_base import OutletInfo, PhoneContact
+from app.models.menu import MenuItem
+from app.services.chat_handler import ChatResponse
+from app.services.knowledge_processor import KnowledgeProcessor
+from benchmarks.micro import measure
+from benchmarks.stats import environment_info, save_results
+from benchmarks.synthetic import generate_menu_categories, populate_knowledge_processor
+
+# (endpoint label, path to request, response model, payload, adapter), built per scale
+Case = Tuple[str, Optional[str], Any, Any, TypeAdapter]
+
+def _first_outlet(knowledge_processor: KnowledgeProcessor) -> Tuple[str, str]:
+    city = knowledge_processor.get_available_cities()[0]
+    return city, knowledge_processor.get_locations_in_city(city)[0]
+
+def build_cases(knowledge_processor: KnowledgeProcessor, scale: int) -> List[Case]:
+    city, location = _first_outlet(knowledge_processor)
+    category = next(iter(knowledge_processor.knowledge_base.menu_items))
+    menu_items = [
+        MenuItem(category=category_name, **item)
+        for category_name, data in generate_menu_categories(3 * scale).items()
+        for item in data["items"]
+    ]
+    chat_response = ChatResponse(
+        response="Which outlet would you like to visit?",
+        conversation_id="conv_1",
+        requires_location=True,
+        available_cities=knowledge_processor.get_available_cities(),
+        available_locations={city: knowledge_processor.get_locations_in_city(city)},
+        menu_items=knowledge_processor.search_menu_items("a")
+    )
+    return [
+        ("POST /chat", "/chat", ChatResponse, chat_response, serialization.CHAT_RESPONSE),
+        ("GET /cities", "/cities", List[str],
+         knowledge_processor.get_available_cities(), serialization.STRING_LIST),
+        ("GET /outlet/{city}/{location}", f"/outlet/{city}/{location}", OutletInfo,
+         knowledge_processor.get_outlet(city, location), serialization.OUTLET_INFO),
+        ("GET /contact/{city}/{location}", f"/contact/{city}/{location}", PhoneContact,
+         knowledge_processor.get_phone_contact(city, location), serialization.PHONE_CONTACT),
+        ("GET /menu/items/{category}", f"/menu/items/{category}", List[str],
+         knowledge_processor.get_menu_items_in_category(category), serialization.STRING_LIST),
+        # Not served by an endpoint yet; encoded as a route returning it would be
+        ("List[MenuItem]", None, List[MenuItem], menu_items, serialization.MENU_ITEMS),
+    ]
+
+def _run_coroutine(coroutine) -> Any:
+    """Run a coroutine that never suspends, without an event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+def default_encoder(response_type: Any) -> Callable[[Any], bytes]:
+    """FastAPI's response path for a route whose response model is response_type"""
+    field = create_response_field(name="response", type_=response_type)
+    return lambda payload: JSONResponse(
+        _run_coroutine(serialize_response(field=field, response_content=payload))
+    ).body
+
+def bench_encoding(knowledge_processor: KnowledgeProcessor, sizes: List[int],
+                   min_time: float, repeats: int) -> Dict[str, Dict[str, Dict]]:
+    results: Dict[str, Dict[str, Dict]] = {}
+    print(f"{'payload':<34} {'size':>6} {'default us':>12} {'fast us':>10} {'speedup':>8}")
+    for size in sizes:
+        populate_knowledge_processor(knowledge_processor, size)
+        for label, _, response_type, payload, adapter in build_cases(knowledge_processor, size):
+            encode_default = default_encoder(response_type)
+            default = measure(lambda: encode_default(payload), min_time, repeats)
+            fast = measure(lambda: adapter.dump_json(payload), min_time, repeats)
+            speedup = default["median_us"] / fast["median_us"]
+            results.setdefault(label, {})[f"{size}x"] = {
+                "default": default, "fast": fast, "speedup": speedup
+            }
+            print(f"{label:<34} {size:>5}x {default['median_us']:>12.1f} "
+                  f"{fast['median_us']:>10.1f} {speedup:>7.1f}x")
+    return results
+
+def bench_endpoints(client, knowledge_processor: KnowledgeProcessor, sizes: List[int],
+                    min_time: float, repeats: int) -> Dict[str, Dict[str, Dict]]:
+    results: Dict[str, Dict[str, Dict]] = {}
+    print(f"\n{'endpoint':<34} {'size':>6} {'default us':>12} {'fast us':>10} {'speedup':>8}")
+    for size in sizes:
+        populate_knowledge_processor(knowledge_processor, size)
+        for label, path, _, _, _ in build_cases(knowledge_processor, size):
+            if path is None:
+                continue
+            if label.startswith("POST"):
+                call = lambda: client.post(path, json={"message": "Hi"})
+            else:
+                call = lambda: client.get(path)
+            timings = {}
+            for mode, fast_responses in (("default", False), ("fast", True)):
+                config.FAST_RESPONSES = fast_responses
+                assert call().status_code == 200, f"{label} failed"
+                timings[mode] = measure(call, min_time, repeats)
+            speedup = timings["default"]["median_us"] / timings["fast"]["median_us"]
+            results.setdefault(label, {})[f"{size}x"] = dict(timings, speedup=speedup)
+            print(f"{label:<34} {size:>5}x {timings['default']['median_us']:>12.1f} "
+                  f"{timings['fast']['median_us']:>10.1f} {speedup:>7.1f}x")
+    config.FAST_RESPONSES = True
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare default and fast response serialization per endpoint')
+    parser.add_argument('--sizes', default='1,10,100,1000',
+                        help='Comma-separated multiples of today\'s data size (default: 1,10,100,1000)')
+    parser.add_argument('--endpoints', action='store_true',
+                        help='Also time whole requests through the ASGI app')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='Minimum seconds per timed batch (default: 0.05)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed batches per payload (default: 5)')
+    parser.add_argument('--output', default='bench_results/serialization.json', help='Where to save the JSON results')
+
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        knowledge_processor = app.state.knowledge_store.knowledge_processor
+        report = {
+            "benchmark": "serialization",
+            "environment": environment_info(),
+            "sizes": sizes,
+            "encoding": bench_encoding(knowledge_processor, sizes, args.min_time, args.repeats)
+        }
+        if args.endpoints:
+            report["endpoints"] = bench_endpoints(client, knowledge_processor, sizes, args.min_time, args.repeats)
+
+    save_results(args.output, report)
+    print(f"\nResults saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
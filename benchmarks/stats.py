@@ -0,0 +1,65 @@
+"""
+Shared result helpers for the BBQ Nation Chatbot benchmarks
+"""
+
+from typing import Dict, List
+import json
+import math
+import os
+import platform
+import sys
+from datetime import datetime
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+def summarize_latencies(latencies: List[float], errors: int = 0) -> Dict[str, float]:
+    """Summarize latencies in seconds as milliseconds"""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "mean_ms": (sum(values) / count * 1000) if count else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] * 1000) if count else 0.0
+    }
+
+def environment_info() -> Dict[str, str]:
+    """Describe the machine a result was recorded on"""
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "recorded_at": datetime.now().isoformat()
+    }
+
+def save_results(path: str, results: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+def load_results(path: str) -> Dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+def print_latency_table(title: str, rows: Dict[str, Dict[str, float]],
+                        baseline: Dict[str, Dict[str, float]] = None) -> None:
+    """Print a latency table, with the p95 change against a baseline run if given"""
+    print(f"\n{title}")
+    print(f"  {'name':<40} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+          + ("  p95 vs baseline" if baseline else ""))
+    for name, row in sorted(rows.items()):
+        line = (f"  {name:<40} {row['count']:>7} {row['errors']:>5} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+        previous = (baseline or {}).get(name)
+        if previous and previous.get("p95_ms"):
+            change = (row["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"  {change:+.1f}%"
+        print(line)
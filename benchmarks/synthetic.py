@@ -0,0 +1,194 @@
+"""
+Synthetic data generators for the BBQ Nation Chatbot benchmarks.
+
+Every generator is deterministic for a given seed and scales linearly with
+its size argument, so results at 10x, 100x and 1000x today's data can be
+compared run to run.
+"""
+
+from typing import Dict, List, Tuple
+import random
+
+from app.models.faq import FAQ, FAQCategory
+from app.models.knowledge_base import OutletInfo, PhoneContact
+from app.models.menu import SpiceLevel, CookingMethod, DietaryInfo
+from app.services.knowledge_processor import KnowledgeProcessor
+
+# Roughly today's data: the hard-coded FAQs, MenuProcessor's menu and the
+# outlets in KnowledgeProcessor
+BASE_FAQ_COUNT = 10
+BASE_MENU_ITEM_COUNT = 3
+BASE_CITY_COUNT = 2
+BASE_LOCATIONS_PER_CITY = 2
+
+WORDS = [
+    "jain", "halal", "veg", "buffet", "grill", "parking", "valet", "birthday",
+    "booking", "table", "lunch", "dinner", "weekend", "dessert", "kulfi", "paneer",
+    "chicken", "mutton", "prawns", "fish", "mocktail", "beer", "wine", "kids",
+    "price", "discount", "offer", "coupon", "payment", "upi", "card", "cash",
+    "wheelchair", "lift", "baby", "chair", "private", "dining", "party", "group",
+    "timing", "open", "close", "holiday", "festival", "spicy", "mild", "gluten"
+]
+
+DISH_WORDS = [
+    "Tandoori", "Malai", "Achari", "Hariyali", "Peri Peri", "Cajun", "Lemon",
+    "Garlic", "Pepper", "Kashmiri", "Afghani", "Chilli", "Mint", "Smoked"
+]
+DISH_BASES = [
+    "Paneer", "Mushroom", "Chicken", "Prawns", "Fish", "Mutton", "Pineapple",
+    "Corn", "Potato", "Broccoli", "Cottage Cheese", "Lamb Chops", "Wings"
+]
+DISH_STYLES = ["Tikka", "Kebab", "Skewers", "Seekh", "Roast", "Curry", "Grill", "Fry"]
+
+CITY_NAMES = ["Bangalore", "New Delhi", "Mumbai", "Chennai", "Hyderabad", "Pune", "Kolkata", "Jaipur"]
+AREA_NAMES = ["Indiranagar", "JP Nagar", "Koramangala", "Whitefield", "Connaught Place",
+              "Vasant Kunj", "Janakpuri", "Saket", "Andheri", "Powai", "Bandra", "Velachery"]
+
+TIME_SLOTS = [
+    "11:30 AM", "12:00 PM", "12:30 PM", "1:00 PM", "1:30 PM", "2:00 PM",
+    "7:00 PM", "7:30 PM", "8:00 PM", "8:30 PM", "9:00 PM", "9:30 PM"
+]
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+def _dish_name(index: int) -> str:
+    modifier = DISH_WORDS[index % len(DISH_WORDS)]
+    base = DISH_BASES[(index // len(DISH_WORDS)) % len(DISH_BASES)]
+    style = DISH_STYLES[(index // (len(DISH_WORDS) * len(DISH_BASES))) % len(DISH_STYLES)]
+    return f"{modifier} {base} {style} {index}"
+
+def _location_name(index: int) -> str:
+    return f"{AREA_NAMES[index % len(AREA_NAMES)]} {index // len(AREA_NAMES) + 1}"
+
+def _city_name(index: int) -> str:
+    return f"{CITY_NAMES[index % len(CITY_NAMES)]} {index // len(CITY_NAMES) + 1}"
+
+def generate_faqs(count: int, seed: int = 0) -> List[FAQ]:
+    """FAQ corpus with random questions, answers and keywords"""
+    rng = random.Random(seed)
+    categories = list(FAQCategory)
+    faqs = []
+    for index in range(count):
+        category = categories[index % len(categories)]
+        faqs.append(FAQ(
+            id=f"{category.value}-{index}",
+            question=f"Do you have {_sentence(rng, 5)}?",
+            answer=f"Yes, {_sentence(rng, 25)}.",
+            category=category,
+            keywords=rng.sample(WORDS, 4),
+            related_questions=[f"What about {_sentence(rng, 3)}?"]
+        ))
+    return faqs
+
+def generate_menu_categories(item_count: int, items_per_category: int = 20,
+                             seed: int = 0) -> Dict[str, Dict]:
+    """Menu in MenuProcessor.menu_categories format"""
+    rng = random.Random(seed)
+    spice_levels = list(SpiceLevel)
+    cooking_methods = list(CookingMethod)
+    categories: Dict[str, Dict] = {}
+    for index in range(item_count):
+        category_name = f"Category {index // items_per_category + 1}"
+        category = categories.setdefault(category_name, {
+            "description": _sentence(rng, 8),
+            "available_times": ["lunch", "dinner"],
+            "items": []
+        })
+        is_veg = rng.random() < 0.5
+        category["items"].append({
+            "name": _dish_name(index),
+            "sub_category": "Vegetarian Grill" if is_veg else "Non-Vegetarian Grill",
+            "price": float(rng.randrange(199, 999)),
+            "spice_level": rng.choice(spice_levels),
+            "cooking_method": rng.choice(cooking_methods),
+            "dietary_info": DietaryInfo(
+                is_veg=is_veg,
+                is_jain=is_veg and rng.random() < 0.3,
+                gluten_free=rng.random() < 0.2
+            ),
+            "preparation_time": rng.randrange(10, 40),
+            "ingredients": rng.sample(WORDS, 4),
+            "accompaniments": ["mint chutney"],
+            "chef_special": rng.random() < 0.1
+        })
+    return categories
+
+def generate_outlets(city_count: int, locations_per_city: int, seed: int = 0) -> Tuple[
+        Dict[str, List[str]], Dict[str, Dict[str, OutletInfo]], Dict[str, Dict[str, PhoneContact]]]:
+    """Cities with their locations, outlet information and phone contacts"""
+    rng = random.Random(seed)
+    cities: Dict[str, List[str]] = {}
+    outlets: Dict[str, Dict[str, OutletInfo]] = {}
+    contacts: Dict[str, Dict[str, PhoneContact]] = {}
+    for city_index in range(city_count):
+        city = _city_name(city_index)
+        locations = [_location_name(city_index * locations_per_city + i) for i in range(locations_per_city)]
+        cities[city] = locations
+        outlets[city] = {}
+        contacts[city] = {}
+        for location in locations:
+            number = f"+91 {rng.randrange(7000000000, 9999999999)}"
+            contact = PhoneContact(
+                outlet_name=location, city=city, primary_number=number,
+                secondary_number=None, booking_number=number, support_number=None
+            )
+            contacts[city][location] = contact
+            outlets[city][location] = OutletInfo(
+                name=location,
+                city=city,
+                address=f"{rng.randrange(1, 999)}, {location}, {city}",
+                facilities={"bar": rng.random() < 0.5, "valet_parking": rng.random() < 0.5},
+                phone_contact=contact
+            )
+    return cities, outlets, contacts
+
+def populate_knowledge_processor(knowledge_processor: KnowledgeProcessor, scale: int,
+                                 seed: int = 0) -> KnowledgeProcessor:
+    """Fill a KnowledgeProcessor with scale times today's outlets and menu"""
+    cities, outlets, contacts = generate_outlets(
+        BASE_CITY_COUNT * scale, BASE_LOCATIONS_PER_CITY, seed
+    )
+    knowledge_processor.cities = cities
+    knowledge_processor.set_outlets(outlets, contacts)
+    knowledge_processor.knowledge_base.menu_items = {
+        category: [item["name"] for item in data["items"]]
+        for category, data in generate_menu_categories(BASE_MENU_ITEM_COUNT * scale, seed=seed).items()
+    }
+    return knowledge_processor
+
+def generate_menu_text(item_count: int, items_per_category: int = 20, seed: int = 0) -> str:
+    """Extracted menu PDF text in the layout PDFProcessor.parse_menu_text expects"""
+    rng = random.Random(seed)
+    lines = []
+    for index in range(item_count):
+        if index % items_per_category == 0:
+            lines.append(f"CATEGORY {index // items_per_category + 1}")
+        lines.append(f"{_dish_name(index)}: {_sentence(rng, 12)}")
+    return "\n".join(lines)
+
+def generate_faq_text(count: int, seed: int = 0) -> str:
+    """Extracted FAQ PDF text in the layout PDFProcessor.parse_faq_text expects"""
+    rng = random.Random(seed)
+    categories = [category.value for category in FAQCategory]
+    lines = []
+    for index in range(count):
+        if index % 10 == 0:
+            lines.append(f"[{categories[(index // 10) % len(categories)]}]")
+        lines.append(f"Q {index + 1} Do you have {_sentence(rng, 5)}?")
+        lines.append(f"Response {_sentence(rng, 15)}")
+        lines.append(f"{_sentence(rng, 15)} Tagging Enquiry")
+    return "\n".join(lines)
+
+def generate_timeslot_text(slots_per_meal: int, special_days: int = 5) -> str:
+    """Extracted time slot PDF text in the layout PDFProcessor.parse_timeslot_text expects"""
+    lines = []
+    for section in ("Weekday", "Weekend"):
+        lines.append(section)
+        for meal in ("Lunch", "Dinner"):
+            lines.append(meal)
+            lines.extend(TIME_SLOTS[i % len(TIME_SLOTS)] for i in range(slots_per_meal))
+    lines.append("Special Days")
+    lines.append("Dinner")
+    lines.extend(f"Festival {i}: 12:00 - 23:00" for i in range(special_days))
+    return "\n".join(lines)
@@ -1,19 +1,207 @@
 import uvicorn
 import argparse
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+
+def run_workers(args):
+    """Run several uvicorn workers under gunicorn sharing one knowledge store"""
+    from gunicorn.app.base import BaseApplication
+
+    class ChatbotApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # With preload_app the master runs this once before forking, so the
+            # knowledge data is built a single time and inherited by every worker
+            from app.services.knowledge_store import preload_knowledge_store
+            from app.main import app
+            preload_knowledge_store()
+            return app
+
+    ChatbotApplication({
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True
+    }).run()
+
+def serve_worker(name, socket_path):
+    """Serve the app on a Unix socket as one of the dispatcher's workers"""
+    from app import config
+    from app.dispatcher import CLIENT_HEADER
+    from app.main import app
+    # The dispatcher names the original client; the socket peer is always the dispatcher
+    config.CLIENT_ID_HEADER = CLIENT_HEADER
+    config.DISPATCH_WORKER = True
+    if config.SESSION_SNAPSHOT_PATH:
+        # Worker names are stable across restarts, so each worker gets its own sessions back
+        config.SESSION_SNAPSHOT_PATH = f"{config.SESSION_SNAPSHOT_PATH}.{name}"
+    uvicorn.run(app, uds=socket_path, log_level="warning")
+
+def serve_dispatcher(sockets, host, port):
+    """Serve the dispatcher in front of the worker sockets"""
+    from app.dispatcher import Dispatcher
+    uvicorn.run(Dispatcher(sockets), host=host, port=port)
+
+def _exit_on_sigterm(signum, frame):
+    raise SystemExit(0)
+
+def run_dispatcher(args):
+    """Run worker processes behind a dispatcher that routes each conversation to its owner"""
+    from app.services.knowledge_store import preload_knowledge_store
+    # Built before forking, so every worker shares one copy of the knowledge data
+    preload_knowledge_store()
+    
+    socket_dir = tempfile.mkdtemp(prefix="formi-workers-")
+    sockets = {
+        f"worker-{index}": os.path.join(socket_dir, f"worker-{index}.sock")
+        for index in range(args.workers)
+    }
+    context = multiprocessing.get_context("fork")
+    
+    def start_worker(name):
+        worker = context.Process(target=serve_worker, args=(name, sockets[name]), name=name)
+        worker.start()
+        return worker
+    
+    workers = {name: start_worker(name) for name in sockets}
+    dispatcher = context.Process(target=serve_dispatcher, args=(sockets, args.host, args.port), name="dispatcher")
+    dispatcher.start()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    
+    try:
+        # This process only supervises. A worker that dies is forked again from
+        # the preloaded knowledge data and serves on the same socket; its
+        # sessions are lost, and the dispatcher answers 502 until it is up
+        while dispatcher.is_alive():
+            dispatcher.join(1.0)
+            for name, worker in workers.items():
+                if not worker.is_alive() and dispatcher.is_alive():
+                    print(f"{name} exited with code {worker.exitcode}, restarting it")
+                    workers[name] = start_worker(name)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        processes = [dispatcher, *workers.values()]
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        shutil.rmtree(socket_dir, ignore_errors=True)
 
 def main():
     parser = argparse.ArgumentParser(description='Run BBQ Nation Chatbot API')
     parser.add_argument('--host', default='0.0.0.0', help='Host to run the server on')
     parser.add_argument('--port', type=int, default=8000, help='Port to run the server on')
     parser.add_argument('--reload', action='store_true', help='Enable auto-reload for development')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes; more than one runs under gunicorn '
+                             'with the knowledge data shared from the master')
+    parser.add_argument('--dispatch', action='store_true',
+                        help='Route each conversation to the worker that holds it, through a local dispatcher')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report per-module import time and per-service initialization time, then exit')
+    parser.add_argument('--knowledge-backend', choices=['memory', 'sqlite'], default=None,
+                        help='Where knowledge lookups are answered from (default: memory)')
+    parser.add_argument('--knowledge-db', default=None,
+                        help='SQLite knowledge database for the sqlite backend '
+                             '(default: data/processed/knowledge.db)')
+    parser.add_argument('--session-snapshot', default=None,
+                        help='File to save live sessions to on shutdown and restore them from on startup')
+    parser.add_argument('--admin-token', default=None,
+                        help='Token for admin features: /admin endpoints and profiling a request with an X-Profile header')
+    parser.add_argument('--profile-sample-rate', type=float, default=None,
+                        help='Fraction of requests to profile (default: none, or all with --profile-slow-ms)')
+    parser.add_argument('--profile-slow-ms', type=float, default=None,
+                        help='Only keep profiles of requests slower than this many milliseconds')
+    parser.add_argument('--profile-dir', default=None,
+                        help='Where request profiles are saved (default: data/profiles)')
+    parser.add_argument('--trace-path', default=None,
+                        help='Append trace spans of the chat pipeline to this JSON lines file')
+    parser.add_argument('--conversation-log-dir', default=None,
+                        help='Log every chat turn as JSON lines to rotated files in this directory')
+    parser.add_argument('--ws-max-connections', type=int, default=None,
+                        help='WebSocket chat connections accepted per worker (default: 10000)')
+    parser.add_argument('--ws-idle-timeout', type=float, default=None,
+                        help='Close WebSocket chats idle for this many seconds (default: never)')
+    parser.add_argument('--max-concurrency', type=int, default=None,
+                        help='Chat turns run at once; 0 disables admission queueing (default: 4)')
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help='Chat turns that may wait before new ones get 503 (default: 100)')
+    parser.add_argument('--queue-timeout', type=float, default=None,
+                        help='Seconds a chat turn may wait before it gets 503 (default: 5)')
+    parser.add_argument('--client-rate', type=float, default=None,
+                        help='Chat turns per second allowed per client; 0 disables (default: 0)')
+    parser.add_argument('--client-burst', type=float, default=None,
+                        help='Chat turns a client may send at once within its rate (default: 20)')
     
     args = parser.parse_args()
     
+    # Settings reach the app (and any reloader or worker process) through the environment
+    # Flags left out keep whatever FORMI_* variable is already set
+    if args.knowledge_backend:
+        os.environ['FORMI_KNOWLEDGE_BACKEND'] = args.knowledge_backend
+    if args.knowledge_db:
+        os.environ['FORMI_KNOWLEDGE_DB'] = args.knowledge_db
+    if args.profile_dir:
+        os.environ['FORMI_PROFILE_DIR'] = args.profile_dir
+    if args.admin_token:
+        os.environ['FORMI_ADMIN_TOKEN'] = args.admin_token
+    if args.profile_sample_rate is not None:
+        os.environ['FORMI_PROFILE_SAMPLE_RATE'] = str(args.profile_sample_rate)
+    if args.profile_slow_ms is not None:
+        os.environ['FORMI_PROFILE_SLOW_MS'] = str(args.profile_slow_ms)
+    if args.trace_path:
+        os.environ['FORMI_TRACE_PATH'] = args.trace_path
+    if args.conversation_log_dir:
+        os.environ['FORMI_CONVERSATION_LOG_DIR'] = args.conversation_log_dir
+    if args.ws_max_connections is not None:
+        os.environ['FORMI_WS_MAX_CONNECTIONS'] = str(args.ws_max_connections)
+    if args.ws_idle_timeout is not None:
+        os.environ['FORMI_WS_IDLE_TIMEOUT'] = str(args.ws_idle_timeout)
+    for flag, variable in (('max_concurrency', 'FORMI_ADMISSION_CONCURRENCY'),
+                           ('max_queue', 'FORMI_ADMISSION_QUEUE_SIZE'),
+                           ('queue_timeout', 'FORMI_ADMISSION_QUEUE_TIMEOUT'),
+                           ('client_rate', 'FORMI_CLIENT_RATE'),
+                           ('client_burst', 'FORMI_CLIENT_BURST')):
+        if getattr(args, flag) is not None:
+            os.environ[variable] = str(getattr(args, flag))
+    if args.session_snapshot:
+        if args.workers > 1 and not args.dispatch:
+            parser.error('--session-snapshot needs a single worker or --dispatch; each worker holds its own sessions')
+        os.environ['FORMI_SESSION_SNAPSHOT'] = args.session_snapshot
+    
+    if args.profile_startup:
+        from app.startup_profile import report_startup_profile
+        report_startup_profile()
+        return
+    
+    if args.workers > 1 and args.reload:
+        parser.error('--reload cannot be combined with --workers')
+    if args.dispatch and args.reload:
+        parser.error('--reload cannot be combined with --dispatch')
+    
     print(f"Starting BBQ Nation Chatbot API on {args.host}:{args.port}")
     print("Documentation available at:")
     print(f"- Swagger UI: http://{args.host}:{args.port}/docs")
     print(f"- ReDoc: http://{args.host}:{args.port}/redoc")
     
+    if args.dispatch:
+        run_dispatcher(args)
+        return
+    if args.workers > 1:
+        run_workers(args)
+        return
+    
     uvicorn.run(
         "app.main:app",
         host=args.host,
@@ -22,4 +210,4 @@ def main():
     )
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -0,0 +1,317 @@
+"""
+Analyze conversation logs written with --conversation-log-dir.
+
+Rotated log files are streamed in chunks through a process pool. Each chunk
+is reduced with vectorized pandas/numpy operations to small partial
+aggregates: one segment row per conversation in the chunk, plus per-state
+sums. The partials are merged as they arrive, so memory is bounded by the
+number of distinct conversations and the chunk size, not by the size of
+the logs. Reports:
+
+- funnel: conversations reaching each template state, and how many ended
+  there without a booking (drop-off)
+- turns to booking: turns up to the confirmed booking, for conversations
+  that made a reservation and confirmed it
+- intent distribution: where intent identification sent conversations
+- time per state: time users spent in each state before replying, and the
+  turn latency in it
+
+    python scripts/analyze_conversations.py data/conversations --workers 4
+"""
+
+import os
+import sys
+import argparse
+import glob
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+# Add the project root directory to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import numpy as np
+import pandas as pd
+
+# Template states in funnel order; each gets one bit in a conversation's states mask
+STATES = [
+    "initial", "city_collection", "location_collection", "intent_identification",
+    "menu_browsing", "clarification", "reservation", "time_slot_verification",
+    "modification", "confirmation"
+]
+OTHER_STATE = len(STATES)
+STATE_NAMES = STATES + ["other"]
+_RESERVATION_BIT = 1 << STATES.index("reservation")
+
+# Where intent identification leads, by next state
+INTENTS = {"menu_browsing": "menu", "reservation": "reservation", "intent_identification": "unrecognized"}
+
+SEGMENT_COLUMNS = ["conversation_id", "first_ts", "first_state", "last_ts", "last_state",
+                   "turns", "booking_turn", "states"]
+
+def _state_codes(values: pd.Series) -> np.ndarray:
+    codes = pd.Categorical(values, categories=STATES).codes.astype(np.int64)
+    codes[codes < 0] = OTHER_STATE
+    return codes
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    """Start index of each run of equal keys in a sorted array"""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+class Partial:
+    """Mergeable aggregates over any set of turns"""
+
+    def __init__(self):
+        self.turns = 0
+        # Per state: turns, summed latency, summed time before the reply and replies timed
+        self.state_turns = np.zeros(len(STATE_NAMES))
+        self.state_latency_ms = np.zeros(len(STATE_NAMES))
+        self.state_dwell_s = np.zeros(len(STATE_NAMES))
+        self.state_dwell_turns = np.zeros(len(STATE_NAMES))
+        self.intents: Dict[str, int] = {}
+        self.segments = pd.DataFrame(columns=SEGMENT_COLUMNS)
+
+    def add(self, other: "Partial") -> None:
+        self.turns += other.turns
+        self.state_turns += other.state_turns
+        self.state_latency_ms += other.state_latency_ms
+        self.state_dwell_s += other.state_dwell_s
+        self.state_dwell_turns += other.state_dwell_turns
+        for intent, count in other.intents.items():
+            self.intents[intent] = self.intents.get(intent, 0) + count
+        frames = [frame for frame in (self.segments, other.segments) if len(frame)]
+        self.segments = pd.concat(frames, ignore_index=True) if frames else self.segments
+
+def summarize_chunk(chunk: pd.DataFrame) -> Partial:
+    """Reduce a chunk of turns to per-state sums and one segment per conversation"""
+    partial = Partial()
+    chunk = chunk.sort_values(["conversation_id", "timestamp"], kind="stable")
+    conversations = chunk["conversation_id"].astype(str).to_numpy()
+    timestamps = chunk["timestamp"].to_numpy(dtype=float)
+    states = _state_codes(chunk["template"])
+    next_states = _state_codes(chunk["next_template"])
+    starts = _group_starts(conversations)
+    ends = np.r_[starts[1:], len(conversations)] - 1
+
+    partial.turns = len(chunk)
+    partial.state_turns = np.bincount(states, minlength=len(STATE_NAMES)).astype(float)
+    partial.state_latency_ms = np.bincount(
+        states, weights=chunk["latency_ms"].to_numpy(dtype=float), minlength=len(STATE_NAMES)
+    )
+
+    # A reply's dwell is the time since the previous turn of its conversation
+    first_in_group = np.zeros(len(conversations), dtype=bool)
+    first_in_group[starts] = True
+    dwell = np.diff(timestamps, prepend=np.nan)
+    timed = ~first_in_group
+    partial.state_dwell_s = np.bincount(states[timed], weights=dwell[timed], minlength=len(STATE_NAMES))
+    partial.state_dwell_turns = np.bincount(states[timed], minlength=len(STATE_NAMES)).astype(float)
+
+    intent_turns = chunk["next_template"][chunk["template"].to_numpy() == "intent_identification"]
+    partial.intents = {
+        INTENTS.get(next_state, next_state): int(count)
+        for next_state, count in intent_turns.value_counts().items()
+    }
+
+    # Turn number within the chunk's run of each conversation, and confirmed requests
+    position = np.arange(len(conversations)) - np.repeat(starts, np.diff(np.r_[starts, len(conversations)])) + 1
+    confirmed = (states == STATES.index("confirmation")) & (next_states == STATES.index("intent_identification"))
+    booking_position = np.where(confirmed, position, np.inf)
+    masks = (np.left_shift(1, states) | np.left_shift(1, next_states)).astype(np.int64)
+
+    partial.segments = pd.DataFrame({
+        "conversation_id": conversations[starts],
+        "first_ts": timestamps[starts],
+        "first_state": states[starts],
+        "last_ts": timestamps[ends],
+        "last_state": next_states[ends],
+        "turns": np.diff(np.r_[starts, len(conversations)]),
+        "booking_turn": np.minimum.reduceat(booking_position, starts),
+        "states": np.bitwise_or.reduceat(masks, starts)
+    })
+    return partial
+
+def compact(partial: Partial) -> None:
+    """Merge each conversation's segments, in time order, into one"""
+    segments = partial.segments.sort_values(["conversation_id", "first_ts", "last_ts"], kind="stable")
+    if segments["conversation_id"].is_unique:
+        partial.segments = segments.reset_index(drop=True)
+        return
+    conversations = segments["conversation_id"].to_numpy()
+    starts = _group_starts(conversations)
+    first_ts = segments["first_ts"].to_numpy(dtype=float)
+    last_ts = segments["last_ts"].to_numpy(dtype=float)
+    first_state = segments["first_state"].to_numpy(dtype=np.int64)
+    turns = segments["turns"].to_numpy(dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(conversations)])
+
+    # The gap between segments is the dwell of the later segment's first reply
+    joined = np.ones(len(conversations), dtype=bool)
+    joined[starts] = False
+    gaps = first_ts[1:] - last_ts[:-1]
+    partial.state_dwell_s += np.bincount(
+        first_state[joined], weights=gaps[joined[1:]], minlength=len(STATE_NAMES)
+    )
+    partial.state_dwell_turns += np.bincount(first_state[joined], minlength=len(STATE_NAMES))
+
+    # Turn numbers continue from earlier segments of the same conversation
+    cumulative = np.cumsum(turns)
+    before = cumulative - turns - np.repeat(cumulative[starts] - turns[starts], counts)
+    booking = segments["booking_turn"].to_numpy(dtype=float) + before
+    ends = np.r_[starts[1:], len(conversations)] - 1
+
+    partial.segments = pd.DataFrame({
+        "conversation_id": conversations[starts],
+        "first_ts": first_ts[starts],
+        "first_state": first_state[starts],
+        "last_ts": last_ts[ends],
+        "last_state": segments["last_state"].to_numpy(dtype=np.int64)[ends],
+        "turns": np.add.reduceat(turns, starts),
+        "booking_turn": np.minimum.reduceat(booking, starts),
+        "states": np.bitwise_or.reduceat(segments["states"].to_numpy(dtype=np.int64), starts)
+    })
+
+def summarize_file(path: str, chunk_size: int) -> Partial:
+    """Stream one log file in chunks and merge the chunk summaries"""
+    partial = Partial()
+    reader = pd.read_json(path, lines=True, chunksize=chunk_size, compression="infer",
+                          dtype={"conversation_id": str}, convert_dates=False,
+                          precise_float=True)
+    with reader:
+        for chunk in reader:
+            if len(chunk):
+                partial.add(summarize_chunk(chunk))
+    compact(partial)
+    return partial
+
+def _rotation_order(path: str) -> Tuple[str, str]:
+    # conversations.<pid>.<rotation time>.jsonl.gz; other names keep their given order
+    parts = os.path.basename(path).split(".")
+    return (parts[2] if len(parts) > 3 and parts[0] == "conversations" else "", path)
+
+def find_logs(paths: Iterable[str]) -> List[str]:
+    """Log files from paths, oldest first; directories give their rotated, compressed logs"""
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "conversations.*.jsonl.gz")))
+        else:
+            files.append(path)
+    return sorted(files, key=_rotation_order)
+
+def build_report(partial: Partial) -> Dict:
+    segments = partial.segments
+    masks = segments["states"].to_numpy(dtype=np.int64)
+    reserved = (masks & _RESERVATION_BIT) != 0
+    booking_turns = segments["booking_turn"].to_numpy(dtype=float)
+    booked = reserved & np.isfinite(booking_turns)
+    last_states = segments["last_state"].to_numpy(dtype=np.int64)
+
+    funnel = []
+    ended = np.bincount(last_states[~booked], minlength=len(STATE_NAMES))
+    for code, state in enumerate(STATE_NAMES):
+        reached = int(np.count_nonzero(masks & (1 << code)))
+        if not reached:
+            continue
+        funnel.append({
+            "state": state,
+            "conversations": reached,
+            "dropped": int(ended[code]),
+            "drop_off_rate": round(ended[code] / reached, 4)
+        })
+
+    intent_total = sum(partial.intents.values())
+    time_per_state = []
+    for code, state in enumerate(STATE_NAMES):
+        turns = partial.state_turns[code]
+        if not turns:
+            continue
+        replies = partial.state_dwell_turns[code]
+        time_per_state.append({
+            "state": state,
+            "turns": int(turns),
+            "total_time_s": round(float(partial.state_dwell_s[code]), 3),
+            "mean_time_s": round(float(partial.state_dwell_s[code] / replies), 3) if replies else None,
+            "mean_latency_ms": round(float(partial.state_latency_ms[code] / turns), 3)
+        })
+
+    return {
+        "turns": partial.turns,
+        "conversations": len(segments),
+        "bookings": int(booked.sum()),
+        "funnel": funnel,
+        "turns_to_booking": {
+            "mean": round(float(booking_turns[booked].mean()), 2) if booked.any() else None,
+            "median": float(np.median(booking_turns[booked])) if booked.any() else None
+        },
+        "intent_distribution": {
+            intent: {"turns": count, "share": round(count / intent_total, 4)}
+            for intent, count in sorted(partial.intents.items(), key=lambda item: -item[1])
+        },
+        "time_per_state": time_per_state
+    }
+
+def print_report(report: Dict) -> None:
+    print(f"{report['turns']} turns in {report['conversations']} conversations, "
+          f"{report['bookings']} bookings")
+    print(f"\n{'state':<24} {'conversations':>13} {'dropped':>8} {'drop-off':>9}")
+    for row in report["funnel"]:
+        print(f"{row['state']:<24} {row['conversations']:>13} {row['dropped']:>8} {row['drop_off_rate']:>8.1%}")
+    turns_to_booking = report["turns_to_booking"]
+    if turns_to_booking["mean"] is not None:
+        print(f"\nTurns to booking: mean {turns_to_booking['mean']}, median {turns_to_booking['median']}")
+    print(f"\n{'intent':<24} {'turns':>8} {'share':>8}")
+    for intent, row in report["intent_distribution"].items():
+        print(f"{intent:<24} {row['turns']:>8} {row['share']:>7.1%}")
+    print(f"\n{'state':<24} {'turns':>8} {'total s':>10} {'mean s':>8} {'latency ms':>11}")
+    for row in report["time_per_state"]:
+        mean = f"{row['mean_time_s']:.1f}" if row["mean_time_s"] is not None else "-"
+        print(f"{row['state']:<24} {row['turns']:>8} {row['total_time_s']:>10.1f} {mean:>8} "
+              f"{row['mean_latency_ms']:>11.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze BBQ Nation conversation logs')
+    parser.add_argument('paths', nargs='+',
+                      help='Log files, or directories whose rotated conversations.*.jsonl.gz files are read')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                      help='Processes reading log files in parallel (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                      help='Turns read per chunk (default: 100000)')
+    parser.add_argument('--output', default=None, help='Also save the report as JSON to this path')
+
+    args = parser.parse_args()
+
+    files = find_logs(args.paths)
+    if not files:
+        print("No conversation logs found")
+        return 1
+
+    # Files are summarized in parallel but merged oldest first: segments of a
+    # conversation can only be joined to the ones just before and after them
+    total = Partial()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pending = deque()
+        for path in files:
+            pending.append(pool.submit(summarize_file, path, args.chunk_size))
+            if len(pending) > 2 * args.workers:
+                total.add(pending.popleft().result())
+                compact(total)
+        while pending:
+            total.add(pending.popleft().result())
+            compact(total)
+
+    report = build_report(total)
+    report["files"] = len(files)
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
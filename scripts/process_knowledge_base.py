@@ -12,11 +12,22 @@ def main():
     parser = argparse.ArgumentParser(description='Process BBQ Nation knowledge base PDFs')
     parser.add_argument('--pdf-dir', default='data/pdfs',
                       help='Directory containing PDF files (default: data/pdfs)')
-    parser.add_argument('--type', choices=['menu', 'faq', 'timeslots', 'all'],
-                      default='all', help='Type of PDFs to process')
+    parser.add_argument('--type', choices=['menu', 'faq', 'faq-dedup', 'timeslots', 'all', 'sqlite'],
+                      default='all', help='Type of PDFs to process, faq-dedup to rebuild the '
+                                          'canonical FAQ set from already extracted FAQs, or sqlite '
+                                          'to build the SQLite knowledge database from processed data')
+    parser.add_argument('--db-path', default='data/processed/knowledge.db',
+                      help='SQLite knowledge database to write (default: data/processed/knowledge.db)')
     
     args = parser.parse_args()
     
+    if args.type == 'sqlite':
+        from app.services.knowledge_store import KnowledgeStore
+        store = KnowledgeStore.build(backend='memory')
+        store.write_sqlite(args.db_path)
+        print(f"Wrote knowledge database version {store.version} to {args.db_path}")
+        return 0
+    
     # Initialize processor
     processor = PDFProcessor(pdf_dir=args.pdf_dir)
     
@@ -29,6 +40,9 @@ def main():
         elif args.type == 'faq':
             result = processor.process_faq_pdfs()
             print(f"Processed {len(result['faqs'])} FAQs in {len(result['categories'])} categories")
+        elif args.type == 'faq-dedup':
+            result = processor.deduplicate_faqs()
+            print(f"Deduplicated {result['input_count']} FAQs to {len(result['faqs'])}")
         elif args.type == 'timeslots':
             result = processor.process_timeslot_pdfs()
             cities = result['locations'].keys()
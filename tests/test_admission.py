@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.admission import AdmissionController
+
+def _controller(**options):
+    settings = dict(concurrency=1, queue_size=4, queue_timeout=1.0, priority_share=0.5,
+                    client_rate=0, client_burst=0)
+    settings.update(options)
+    return AdmissionController(**settings)
+
+def test_token_bucket_rejects_after_burst_and_refills():
+    controller = _controller(concurrency=0, client_rate=1000, client_burst=2)
+
+    async def scenario():
+        await controller.acquire("a", False)
+        await controller.acquire("a", False)
+        with pytest.raises(HTTPException) as rejected:
+            await controller.acquire("a", False)
+        assert rejected.value.status_code == 429
+        assert rejected.value.headers["Retry-After"] == "1"
+        # Other clients have their own bucket
+        await controller.acquire("b", False)
+        await asyncio.sleep(0.01)
+        await controller.acquire("a", False)
+
+    asyncio.run(scenario())
+
+def test_full_queue_sheds_new_sessions_before_bookings():
+    controller = _controller()
+
+    async def scenario():
+        await controller.acquire("a", False)
+        normal = [asyncio.ensure_future(controller.acquire("a", False)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert controller.queued() == 2
+        # The normal share of the queue is full, the priority share is not
+        with pytest.raises(HTTPException) as rejected:
+            await controller.acquire("a", False)
+        assert rejected.value.status_code == 503
+        assert rejected.value.detail == "Server is busy"
+        priority = [asyncio.ensure_future(controller.acquire("a", True)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException):
+            await controller.acquire("a", True)
+        for future in normal + priority:
+            future.cancel()
+        await asyncio.gather(*normal, *priority, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+def test_released_slot_goes_to_priority_waiters_first():
+    controller = _controller(queue_size=8)
+    order = []
+
+    async def turn(name, priority):
+        async with controller.admit("a", priority):
+            order.append(name)
+
+    async def scenario():
+        await controller.acquire("a", False)
+        waiters = [
+            asyncio.ensure_future(turn("normal-1", False)),
+            asyncio.ensure_future(turn("priority", True)),
+            asyncio.ensure_future(turn("normal-2", False))
+        ]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*waiters)
+        assert controller.running == 0
+
+    asyncio.run(scenario())
+    assert order == ["priority", "normal-1", "normal-2"]
+
+def test_queued_turn_times_out():
+    controller = _controller(queue_timeout=0.01)
+
+    async def scenario():
+        await controller.acquire("a", False)
+        with pytest.raises(HTTPException) as rejected:
+            await controller.acquire("a", False)
+        assert rejected.value.status_code == 503
+        assert controller.queued() == 0
+
+    asyncio.run(scenario())
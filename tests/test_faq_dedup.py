@@ -0,0 +1,72 @@
+import json
+from app.models.faq import FAQ, FAQCategory
+from app.services.faq_dedup import (
+    MinHasher, build_vocabulary, clean_answer, deduplicate_faqs, is_agent_instruction, write_canonical_faqs
+)
+from app.services.faq_processor import FAQProcessor
+
+def test_clean_answer_strips_labels_salutation_tagging_and_page_chrome():
+    raw = ("ResponseMam/Sir , we serve goat for mutton Tagging Enquiry - Menu & Drinks"
+           "5/12/25, 2:19 PM Menu and Drinks : Barbeque Nation")
+    assert clean_answer(raw) == "We serve goat for mutton."
+
+def test_clean_answer_rejoins_broken_words():
+    answers = [
+        "Y es we serv e Halal food",
+        "Howev er we serve drinks as per menu",
+        "we serve unlimited buf fet.",
+        "We serv e two fla vor of ice cream that is V anilla and str awberry .",
+        "only Fish , Pr awn we ha ve in Sea food.",
+        "We serve mutton seekh k ebab for starters",
+        "Yes we serve drinks as per menu, we have food and we serve"
+    ]
+    vocabulary = build_vocabulary(answers)
+    cleaned = [clean_answer(answer, vocabulary) for answer in answers]
+    assert cleaned[0] == "Yes we serve Halal food."
+    assert cleaned[1] == "However we serve drinks as per menu."
+    assert cleaned[2] == "We serve unlimited buffet."
+    assert cleaned[3] == "We serve two flavor of ice cream that is Vanilla and strawberry."
+    assert cleaned[4] == "Only Fish, Prawn we have in Sea food."
+    assert cleaned[5] == "We serve mutton seekh kebab for starters."
+
+def test_agent_instructions_are_recognized():
+    assert is_agent_instruction("Surely I will assist with information:- Inform the menu as per altius / Menu details in KP.")
+    assert is_agent_instruction("Provide information as per altius update for alcoholic drinks")
+    assert not is_agent_instruction("Sorry to inform Pizza is not available in menu.")
+
+def test_cluster_groups_near_duplicates_only():
+    questions = [
+        "Q 1 Is Jain food available in BBQ nation?",
+        "Is Jain food available in Barbeque Nation?",
+        "Is  J ain food available in BBQ nation ?",
+        "What type of fish do Barbeque nation serve?",
+        "What type of prawns do barbeque nation serve?"
+    ]
+    assert MinHasher().cluster(questions) == [[0, 1, 2], [3], [4]]
+    assert MinHasher().cluster([]) == []
+
+def test_similarity_estimates_jaccard_of_shingles():
+    hasher = MinHasher()
+    signatures = hasher.signatures(["Do you have parking facilities?", "Do you have parking facilities"])
+    assert hasher.similarity(signatures[0], signatures[1]) == 1.0
+
+def test_curated_faqs_represent_their_clusters_and_instructions_are_flagged(tmp_path):
+    curated = [FAQ(id="menu-1", question="Is Jain food available in BBQ nation?", answer="Yes.",
+                   category=FAQCategory.MENU, keywords=["jain"])]
+    extracted = [
+        {"question": "Q 1 Is Jain food available in BBQ nation?", "answer": "ResponseYes , we have."},
+        {"question": "Q 4 What is the menu for today?",
+         "answer": "ResponseSurely , Inform the menu as per altius / Menu details in KP Tagging Enquiry - Menu"}
+    ]
+    faqs = deduplicate_faqs(extracted, curated)
+    assert [faq.id for faq in faqs][0] == "menu-1"
+    assert faqs[0].metadata["variants"] == "2"
+    assert faqs[1].metadata["review"] == "agent_instruction"
+
+    path = tmp_path / "faqs_canonical.json"
+    write_canonical_faqs(extracted, curated, str(path))
+    assert len(json.loads(path.read_text())["faqs"]) == 2
+    processor = FAQProcessor()
+    count = len(processor.faqs)
+    processor.load_processed_faqs(str(path))
+    assert len(processor.faqs) == count
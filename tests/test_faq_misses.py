@@ -0,0 +1,47 @@
+import pytest
+from app.faq_misses import FAQMissTracker, normalize_query
+from app.services.knowledge_store import get_knowledge_store
+
+QUESTIONS = [f"question number {number}" for number in range(300)]
+
+def _tracker(counts):
+    tracker = FAQMissTracker(width=256, depth=4, candidates=20)
+    for number, count in counts:
+        tracker.record(QUESTIONS[number], count)
+    return tracker
+
+def test_normalize_query_ignores_case_and_punctuation():
+    assert normalize_query("  Do you allow PETS?? ") == "do you allow pets"
+
+def test_estimates_never_undercount():
+    tracker = _tracker([(number, number % 7 + 1) for number in range(300)])
+    for number in range(300):
+        assert tracker.estimate(QUESTIONS[number]) >= number % 7 + 1
+
+def test_merged_trackers_match_a_single_tracker():
+    counts = [(number, 1) for number in range(300)] + [(5, 40), (17, 30), (250, 25)]
+    single = _tracker(counts)
+    first, second = _tracker(counts[0::2]), _tracker(counts[1::2])
+    first.merge(second)
+    assert first.total == single.total
+    assert first._rows == single._rows
+    assert first.top(3) == single.top(3)
+    assert [query for query, _ in first.top(3)] == [QUESTIONS[5], QUESTIONS[17], QUESTIONS[250]]
+
+def test_merge_rejects_sketches_of_another_shape():
+    with pytest.raises(ValueError):
+        FAQMissTracker(width=256).merge(FAQMissTracker(width=512))
+
+def test_sketch_round_trips_through_a_dict():
+    tracker = _tracker([(1, 3), (2, 5)])
+    restored = FAQMissTracker.from_dict(tracker.to_dict())
+    assert restored.top(2) == tracker.top(2)
+    assert restored.report(2) == tracker.report(2)
+    merged = FAQMissTracker.merged([tracker.to_dict(), tracker.to_dict()])
+    assert merged.estimate(QUESTIONS[2]) >= 10
+
+def test_vague_questions_are_not_answered_from_unrelated_faqs():
+    faq_processor = get_knowledge_store().faq_processor
+    assert faq_processor.match_question("where is the outlet?") == []
+    assert faq_processor.match_question("Do you allow pets?") == []
+    assert faq_processor.match_question("Is parking available?")[0].question == "Do you have parking facilities?"
@@ -0,0 +1,55 @@
+from app.dispatcher import new_conversation_id
+from app.hash_ring import HashRing
+from app.metrics import label_expositions
+
+KEYS = [f"conv_{number}" for number in range(20000)]
+
+def _owners(ring):
+    return {key: ring.node_for(key) for key in KEYS}
+
+def test_adding_a_node_moves_about_its_share_only_to_it():
+    ring = HashRing([f"worker-{index}" for index in range(4)])
+    before = _owners(ring)
+    ring.add("worker-4")
+    after = _owners(ring)
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == "worker-4" for key in moved)
+    assert 0.15 < len(moved) / len(KEYS) < 0.25
+
+def test_removing_a_node_moves_only_its_keys():
+    ring = HashRing([f"worker-{index}" for index in range(5)])
+    before = _owners(ring)
+    ring.remove("worker-2")
+    after = _owners(ring)
+    for key in KEYS:
+        if before[key] != "worker-2":
+            assert after[key] == before[key]
+        else:
+            assert after[key] != "worker-2"
+
+def test_rings_built_in_any_order_agree():
+    names = [f"worker-{index}" for index in range(4)]
+    assert _owners(HashRing(names)) == _owners(HashRing(reversed(names)))
+
+def test_new_conversation_ids_depend_on_the_client():
+    assert new_conversation_id("10.0.0.1", "1") == new_conversation_id("10.0.0.1", "1")
+    assert new_conversation_id("10.0.0.1", "1") != new_conversation_id("10.0.0.2", "1")
+    assert new_conversation_id("10.0.0.1") != new_conversation_id("10.0.0.1")
+
+def test_worker_metrics_are_grouped_by_family_and_labelled():
+    exposition = (
+        "# HELP requests_total Requests\n# TYPE requests_total counter\n"
+        'requests_total{route="/chat"} 3\n'
+        "# HELP sessions Sessions\n# TYPE sessions gauge\nsessions 2\n"
+    )
+    merged = label_expositions({"worker-0": exposition, "worker-1": exposition}, "worker")
+    assert merged.splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{worker="worker-0",route="/chat"} 3',
+        'requests_total{worker="worker-1",route="/chat"} 3',
+        "# HELP sessions Sessions",
+        "# TYPE sessions gauge",
+        'sessions{worker="worker-0"} 2',
+        'sessions{worker="worker-1"} 2'
+    ]
@@ -0,0 +1,63 @@
+import threading
+import time
+from app import config
+from app.idempotency import ResponseCache, cache_key, handle_message_encoded
+from app.services.chat_handler import ChatResponse, UserMessage
+
+class _CountingHandler:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def handle_message(self, message):
+        self.calls += 1
+        time.sleep(self.delay)
+        return ChatResponse(response=f"turn {self.calls}", conversation_id=message.conversation_id or "conv_1")
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+    cache.put(("conversation", "c", "1"), b"first")
+    assert cache.get(("conversation", "c", "1")) == b"first"
+    time.sleep(0.06)
+    assert cache.get(("conversation", "c", "1")) is None
+    assert len(cache) == 0
+
+def test_oldest_entries_are_evicted_beyond_max_entries():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    for message_id in "123":
+        cache.put(("conversation", "c", message_id), message_id.encode())
+    assert len(cache) == 2
+    assert cache.get(("conversation", "c", "1")) is None
+    assert cache.get(("conversation", "c", "3")) == b"3"
+
+def test_new_conversations_are_keyed_by_client():
+    message = UserMessage(message="hi", message_id="1")
+    assert cache_key(message, "10.0.0.1") != cache_key(message, "10.0.0.2")
+    continued = UserMessage(message="hi", conversation_id="conv_1", message_id="1")
+    assert cache_key(continued, "10.0.0.1") == cache_key(continued, "10.0.0.2")
+
+def test_concurrent_retries_run_the_turn_once(monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_TTL", 60)
+    handler = _CountingHandler(delay=0.05)
+    message = UserMessage(message="hi", message_id="concurrent-retry")
+    bodies = []
+    threads = [
+        threading.Thread(target=lambda: bodies.append(handle_message_encoded(handler, message, "client")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert handler.calls == 1
+    assert len(set(bodies)) == 1
+
+def test_waiting_retry_runs_the_turn_when_the_first_attempt_fails():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    key = ("client", "client", "1")
+    assert cache.claim(key) == (None, None)
+    body, pending = cache.claim(key)
+    assert body is None and pending is not None
+    cache.finish(key, None)
+    assert pending.is_set()
+    assert cache.claim(key) == (None, None)
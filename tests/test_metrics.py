@@ -0,0 +1,33 @@
+import threading
+from app import metrics
+
+def _run_threads(count, target):
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+def test_counter_sums_shards_of_live_and_exited_threads():
+    counter = metrics.Counter("test_counter_total", "test", ("kind",))
+    counter.inc(("a",))
+    _run_threads(50, lambda: counter.inc(("a",), 2))
+    _run_threads(10, lambda: counter.inc(("b",)))
+    assert counter.values() == {("a",): 101.0, ("b",): 10.0}
+
+def test_exited_thread_shards_are_folded():
+    counter = metrics.Counter("test_folded_total", "test")
+    _run_threads(2000, lambda: counter.inc())
+    assert len(counter._shards) == 0
+    assert counter.values() == {(): 2000.0}
+
+def test_histogram_merges_buckets_across_threads():
+    histogram = metrics.Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, ("x",))
+    _run_threads(3, lambda: histogram.observe(0.5, ("x",)))
+    _run_threads(2, lambda: histogram.observe(5.0, ("x",)))
+    counts, total = histogram.values()[("x",)]
+    assert counts == [1, 3, 2]
+    assert abs(total - 11.55) < 1e-9
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="x",le="1"} 4' in lines
+    assert 'test_seconds_count{route="x"} 6' in lines